@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: names/second for the precompiled filename_parser versus the
+original per-call re.sub chain from renamer.py.
+
+Usage: python benchmarks/bench_parser.py [--count 100000] [--seed 1]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import filename_parser  # noqa: E402
+from corpus import make_corpus  # noqa: E402
+
+def legacy_clean_filename(filename):
+    """The pre-tokenizer clean_filename() from renamer.py, kept for comparison."""
+    original_filename = filename
+    patterns = [
+        r"\[.*?\]",
+        r"\(.*?\)",
+        r"[-_.]?(1080p|720p|480p|2160p|4K|BluRay|WEBRip|WEB|x264|x265|HEVC|H.264|H.265|AAC|DDP5\.1|DTS|HDR|HDTV|DVDRip|BRRip)",
+        r"-[A-Za-z0-9]+$",
+    ]
+    for pattern in patterns:
+        filename = re.sub(pattern, "", filename, flags=re.IGNORECASE)
+    filename = re.sub(r"\s+", " ", filename).strip()
+    return filename, filename != original_filename
+
+
+def legacy_extract_info(filename):
+    """The pre-tokenizer extract_info() from renamer.py, minus its print calls."""
+    cleaned_filename, _ = legacy_clean_filename(filename)
+    tv_pattern = re.compile(
+        r'(?P<title>.+?)\s(?:-|\.|_)?\s?(S(?P<season>\d{1,2})E(?P<episode>\d{1,2})|\b(?P<season_alt>\d{1,2})x(?P<episode_alt>\d{1,2})\b)(?:\s-\s(?P<episode_title>.+?))?',
+        re.IGNORECASE
+    )
+    movie_pattern = re.compile(
+        r'(?P<title>.+?)(?:\s(?P<year>\d{4}))?\s?(?:\[\d{3,4}p\])?$',
+        re.IGNORECASE
+    )
+    tv_match = tv_pattern.search(cleaned_filename)
+    movie_match = movie_pattern.search(cleaned_filename)
+    if tv_match:
+        title = tv_match.group("title").strip()
+        season = tv_match.group("season") or tv_match.group("season_alt")
+        episode = tv_match.group("episode") or tv_match.group("episode_alt")
+        episode_title = tv_match.group("episode_title")
+        if episode_title:
+            episode_title = legacy_clean_filename(episode_title)[0]
+        if not title or title == "-":
+            title = "Unknown Show"
+        return title, None, season, episode, episode_title
+    if movie_match:
+        title = movie_match.group("title").strip()
+        year = movie_match.group("year")
+        return title, int(year) if year else None, None, None, None
+    return None, None, None, None, None
+
+
+def bench(fn, names):
+    start = time.perf_counter()
+    for name in names:
+        fn(name)
+    elapsed = time.perf_counter() - start
+    return len(names) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    names = make_corpus(args.count, args.seed)
+    rows = [
+        ("clean (legacy)", bench(legacy_clean_filename, names)),
+        ("clean (tokenizer)", bench(filename_parser.clean, names)),
+        ("extract_info (legacy)", bench(legacy_extract_info, names)),
+        ("parse (tokenizer)", bench(filename_parser.parse, names)),
+    ]
+    for label, rate in rows:
+        print(f"{label:<24} {rate:>12,.0f} names/s")
+
+    same_clean = sum(legacy_clean_filename(n) == filename_parser.clean(n) for n in names)
+    # Field-level agreement ignoring episode_title (the legacy lazy match captured only one character).
+    # Differences are expected: the legacy parser kept dots in scene names ("Breaking.Bad") and
+    # missed their episode markers and years; see tests/test_filename_parser.py for the expected results.
+    same_parse = sum(legacy_extract_info(n)[:4] == tuple(filename_parser.parse(n))[:4] for n in names)
+    print(f"clean() agreement:  {same_clean / len(names):.2%}")
+    print(f"parse() agreement:  {same_parse / len(names):.2%}")
+
+
+if __name__ == "__main__":
+    main()
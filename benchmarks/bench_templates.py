@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: records/second for compiled naming templates versus the hard-coded
+f-strings they replaced, over parsed records from the benchmark corpus.
+
+Usage: python benchmarks/bench_templates.py [--count 100000] [--seed 1]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import filename_parser  # noqa: E402
+from corpus import make_corpus  # noqa: E402
+from templates import NameTemplate, NamingScheme, fields_for  # noqa: E402
+
+
+def legacy_format(title, year, season, episode, episode_title, ext):
+    """The f-string naming from main.propose_name() before templates."""
+    if season:
+        season, episode = int(season), int(episode)
+        if episode_title:
+            return f"{title} - S{season:02d}E{episode:02d} - {episode_title}{ext}"
+        return f"{title} - S{season:02d}E{episode:02d}{ext}"
+    return f"{title} ({year}){ext}" if year else f"{title}{ext}"
+
+
+def bench(fn, records):
+    start = time.perf_counter()
+    for record in records:
+        fn(record)
+    elapsed = time.perf_counter() - start
+    return len(records) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    names = make_corpus(args.count, args.seed)
+    records = [(filename_parser.parse(name), ".mkv", name) for name in names]
+    records = [r for r in records if r[0].title]
+    naming = NamingScheme()
+    nested = NameTemplate("{Title}/Season {Season:02d}/{Title} - S{Season:02d}E{Episode:02d}"
+                          "< - {EpisodeTitle}>< [{Quality}]>{Extension}")
+    tv_values = [fields_for(*parsed, ext, name) for parsed, ext, name in records if parsed.season]
+
+    start = time.perf_counter()
+    compiled = [NameTemplate(naming.tv.pattern) for _ in range(1000)]
+    compile_us = (time.perf_counter() - start) / len(compiled) * 1e6
+
+    rows = [
+        ("f-strings (legacy)", bench(lambda r: legacy_format(*r[0], r[1]), records)),
+        ("NamingScheme.format", bench(lambda r: naming.format(*r[0], r[1], r[2]), records)),
+        ("render only (tv)", bench(naming.tv.format, tv_values)),
+        ("render only (nested)", bench(nested.format, tv_values)),
+    ]
+    print(f"{len(records):,} parsed records, template compile {compile_us:.0f} µs")
+    for label, rate in rows:
+        print(f"{label:<24} {rate:>12,.0f} records/s")
+
+    same = sum(legacy_format(*r[0], r[1]) == naming.format(*r[0], r[1]) for r in records)
+    print(f"default template agreement: {same / len(records):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup budget check: how long FileNom's own imports take, and how much a
+`main.py <dir> --offline --dry-run` run costs on top of a bare interpreter.
+Exits 1 when either is over budget; tests/test_startup.py enforces the same budgets
+under pytest.
+
+Usage: python benchmarks/check_startup.py [--runs 5] [--import-budget 50] [--run-budget 100]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Modules that must not be loaded by the CLI's import or a dry run
+HEAVY_MODULES = ("requests", "urllib3", "PyQt5", "watchdog", "concurrent.futures.process", "difflib")
+
+IMPORT_BUDGET_MS = 50.0   # `import main`
+RUN_BUDGET_MS = 100.0     # What `main.py <dir> --offline --dry-run` adds to interpreter startup
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def best_of(runs, command, **kwargs):
+    """Lowest wall time in seconds over several runs (noise only ever adds time)."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_profile(module):
+    """
+    Return ({direct import: cumulative µs}, {every import: cumulative µs}, total µs) for
+    `import module` under -X importtime, leaving out what the interpreter loads at startup.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=SRC_DIR,
+                            capture_output=True, text=True, check=True)
+    direct, subtree = {}, {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if depth == 0:
+            # importtime lists children before their parent, so a top-level line closes a subtree
+            if name == module:
+                return direct, subtree, cumulative
+            direct, subtree = {}, {}
+            continue
+        subtree[name] = cumulative
+        if depth == 2:
+            direct[name] = cumulative
+    return direct, subtree, 0
+
+
+def measure(runs):
+    """
+    Return (direct imports {name: µs}, heavy modules imported, `import main` ms,
+    interpreter startup ms, dry run ms) with the bytecode cache warm.
+    """
+    # Warm the bytecode cache so the numbers don't include compiling the sources
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    subprocess.run([sys.executable, "-c", "import main"], cwd=SRC_DIR, env=env, check=True)
+
+    direct, modules, import_us = import_profile("main")
+    heavy = [name for name in HEAVY_MODULES if name in modules]
+
+    with tempfile.TemporaryDirectory(prefix="filenom-startup-") as root:
+        for name in ("Show.Name.S01E01.720p.mkv", "Some Movie 2001 1080p.mkv"):
+            open(os.path.join(root, name), "w").close()
+        baseline = best_of(runs, [sys.executable, "-c", "pass"])
+        dry_run = best_of(runs, [sys.executable, "main.py", root, "--offline", "--dry-run"], cwd=SRC_DIR)
+    return direct, heavy, import_us / 1000, baseline * 1000, dry_run * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, help="Milliseconds for `import main`")
+    parser.add_argument("--run-budget", type=float, default=RUN_BUDGET_MS,
+                        help="Milliseconds a dry run may add to bare interpreter startup")
+    args = parser.parse_args()
+
+    direct, heavy, import_ms, baseline, dry_run = measure(args.runs)
+    overhead_ms = dry_run - baseline
+    print(f"import main           {import_ms:7.1f} ms  (budget {args.import_budget:g} ms)")
+    print(f"interpreter startup   {baseline:7.1f} ms")
+    print(f"--offline --dry-run   {dry_run:7.1f} ms  (+{overhead_ms:.1f} ms, budget {args.run_budget:g} ms)")
+    slowest = sorted((us, name) for name, us in direct.items())[-5:]
+    print("slowest imports:      " + ", ".join(f"{name} {us / 1000:.1f} ms" for us, name in reversed(slowest)))
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if import_ms > args.import_budget:
+        failures.append(f"import main took {import_ms:.1f} ms")
+    if overhead_ms > args.run_budget:
+        failures.append(f"dry run added {overhead_ms:.1f} ms")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Synthetic scene-style libraries for the benchmarks: file stems in memory, or a tree of
+(empty or sparse) video files on disk, from 1k to 1M files.
+
+Usage:
+    python benchmarks/corpus.py names --count 1000
+    python benchmarks/corpus.py tree /tmp/library --count 100000 [--size 0]
+"""
+import os
+import random
+import argparse
+
+SHOWS = ["The Office", "Breaking.Bad", "Game_of_Thrones", "Doctor Who", "Stranger Things", "The.Expanse"]
+MOVIES = ["Inception", "The Matrix", "Spirited Away", "Blade.Runner", "Heat", "Alien"]
+NOISE = ["1080p", "720p", "2160p", "BluRay", "WEBRip", "x264", "x265", "HEVC", "AAC", "DDP5.1", "HDR"]
+GROUPS = ["-YIFY", "-NTb", "-RARBG", "-FLUX", "", ""]
+TAGS = ["[eztv]", "[YTS]", "(YTS)", "[BluRay]", "", ""]
+EXTENSIONS = [".mkv", ".mkv", ".mp4", ".avi"]
+FILES_PER_DIR = 200
+
+
+def make_corpus(count, seed=1):
+    """Generate scene-style file stems (TV and movie, with tags, codecs and groups)."""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        tag = rng.choice(TAGS)
+        noise = " ".join(rng.sample(NOISE, rng.randint(0, 3)))
+        group = rng.choice(GROUPS)
+        if rng.random() < 0.6:
+            show = rng.choice(SHOWS)
+            ep = f"S{rng.randint(1, 12):02d}E{rng.randint(1, 24):02d}" if rng.random() < 0.8 else f"{rng.randint(1, 9)}x{rng.randint(1, 24):02d}"
+            names.append(f"{tag}{show} {ep} {noise}{group}".strip())
+        else:
+            movie = rng.choice(MOVIES)
+            year = f" {rng.randint(1950, 2024)}" if rng.random() < 0.7 else ""
+            names.append(f"{tag}{movie}{year} {noise}{group}".strip())
+    return names
+
+
+
+def make_tree(root, count, seed=1, files_per_dir=FILES_PER_DIR, size=0):
+    """
+    Create count video files under root, spread over download-style folders of at most
+    files_per_dir files. Files are empty, or sparse files of size bytes. Returns their paths.
+    """
+    rng = random.Random(seed)
+    paths = []
+    names = set()
+    for i, stem in enumerate(make_corpus(count, seed)):
+        directory = os.path.join(root, f"batch{i // files_per_dir:05d}")
+        if i % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+            names.clear()
+        name = stem + rng.choice(EXTENSIONS)
+        if name in names:
+            # Prefix keeps names unique when the corpus repeats a release in one folder
+            name = f"{i} {name}"
+        names.add(name)
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            if size:
+                f.truncate(size)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    names = sub.add_parser("names", help="Print file stems")
+    names.add_argument("--count", type=int, default=1000)
+    names.add_argument("--seed", type=int, default=1)
+    tree = sub.add_parser("tree", help="Create a library of files on disk")
+    tree.add_argument("root")
+    tree.add_argument("--count", type=int, default=10_000)
+    tree.add_argument("--seed", type=int, default=1)
+    tree.add_argument("--size", type=int, default=0, help="Sparse file size in bytes (default: empty files)")
+    args = parser.parse_args()
+
+    if args.command == "names":
+        print("\n".join(make_corpus(args.count, args.seed)))
+    else:
+        paths = make_tree(args.root, args.count, args.seed, size=args.size)
+        print(f"Created {len(paths):,} files under {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+FileNom benchmark suite: times the parse, preview and rename paths on a synthetic library
+against the local stub metadata server and saves the results as JSON for comparison
+between revisions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results/HEAD.json
+    python benchmarks/run_benchmarks.py --count 100000 --files 5000 --compare results/HEAD.json
+    python benchmarks/run_benchmarks.py --only clean_filename extract_info
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import db  # noqa: E402
+import journal  # noqa: E402
+import main as cli  # noqa: E402
+import renamer  # noqa: E402
+from artwork import ArtworkFetcher, PosterCache  # noqa: E402
+from cache import MetadataCache  # noqa: E402
+from corpus import make_corpus, make_tree  # noqa: E402
+from filename_parser import parse_many  # noqa: E402
+from hasher import HashIndex  # noqa: E402
+from imdb_fetcher import MetadataFetcher  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+from providers import OmdbProvider, TmdbProvider  # noqa: E402
+from resolver import BatchResolver  # noqa: E402
+from stub_server import StubMetadataServer  # noqa: E402
+from subtitles import OpenSubtitlesProvider, SubtitleCache, SubtitlePipeline  # noqa: E402
+from templates import NamingScheme  # noqa: E402
+
+
+class Skipped(Exception):
+    pass
+
+
+def timed(fn, items):
+    """Run fn over items and return (count, seconds)."""
+    start = time.perf_counter()
+    count = 0
+    for item in items:
+        fn(item)
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def bench_clean_filename(ctx):
+    return timed(renamer.clean_filename, ctx.names)
+
+
+def bench_extract_info(ctx):
+    return timed(renamer.extract_info, ctx.names)
+
+
+def bench_parse_pool(ctx):
+    """Bulk parse on a process pool (one worker per CPU), results consumed in order."""
+    with ParsePool() as pool:
+        start = time.perf_counter()
+        count = sum(1 for _ in pool.parse(ctx.names))
+        elapsed = time.perf_counter() - start
+    return count, elapsed, {"workers": pool.jobs, "batch_size": pool.batch_size}
+
+
+def bench_parse_many(ctx):
+    """The batch parse API the GUI, CLI and parse pool share, in chunks of 1,000 paths."""
+    paths = [name + ".mkv" for name in ctx.names]
+    start = time.perf_counter()
+    count = sum(len(parse_many(paths[i:i + 1000])) for i in range(0, len(paths), 1000))
+    return count, time.perf_counter() - start
+
+
+def bench_preview(ctx, label):
+    """Parse + resolve + name every file through the stub server, like a GUI preview or CLI dry run."""
+    paths = ctx.tree(label)
+    cache = MetadataCache(os.path.join(ctx.workdir, "cache.db"))
+    fetcher = MetadataFetcher(concurrency=ctx.args.jobs, providers=ctx.server.providers_config(), backoff=0.01)
+    providers = [OmdbProvider(fetcher, "bench", cache), TmdbProvider(fetcher, "bench", cache)]
+    resolver = BatchResolver(fetcher, cache, providers)
+    naming = NamingScheme()
+    try:
+        with ThreadPoolExecutor(max_workers=ctx.args.jobs) as pool:
+            start = time.perf_counter()
+            records = list(pool.map(lambda path: cli.process_file(path, resolver, naming), paths))
+            elapsed = time.perf_counter() - start
+    finally:
+        resolver.close()
+        fetcher.close()
+        cache.close()
+    resolved = sum(record["status"] == "pending" for record in records)
+    return len(records), elapsed, {"resolved": resolved}
+
+
+def bench_preview_cold(ctx):
+    cache_path = os.path.join(ctx.workdir, "cache.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(cache_path + suffix):
+            os.remove(cache_path + suffix)
+    return bench_preview(ctx, "preview")
+
+
+def bench_preview_warm(ctx):
+    return bench_preview(ctx, "preview")
+
+
+def bench_rename_file(ctx):
+    paths = ctx.tree("rename_file", fresh=True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return timed(renamer.rename_file, paths)
+
+
+def bench_rename_files(ctx):
+    paths = ctx.tree("rename_files", fresh=True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        results = list(renamer.rename_files(paths, jobs=ctx.args.jobs))
+        elapsed = time.perf_counter() - start
+    return len(paths), elapsed, {"renamed": sum(result.status == "renamed" for result in results)}
+
+
+def bench_plan_apply(ctx):
+    """Offline dry run writing a plan file, then --apply-plan: the apply step does no parsing or lookups."""
+    root = os.path.dirname(os.path.dirname(ctx.tree("plan_apply", fresh=True)[0]))
+    plan_path = os.path.join(ctx.workdir, "plan.jsonl")
+    # The apply step is a real run: keep its rename history and journal out of the user's
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull), \
+            mock.patch.object(db, "HISTORY_DB_PATH", os.path.join(ctx.workdir, "renaming_history.db")), \
+            mock.patch.object(journal, "JOURNAL_DB_PATH", os.path.join(ctx.workdir, "jobs.db")):
+        start = time.perf_counter()
+        cli.main([root, "--offline", "--dry-run", "--plan-out", plan_path, "--jobs", str(ctx.args.jobs)])
+        planned = time.perf_counter()
+        cli.main(["--apply-plan", plan_path, "--jobs", str(ctx.args.jobs)])
+        elapsed = time.perf_counter() - start
+    with open(plan_path) as f:
+        summary = json.loads(f.readlines()[-1])["summary"]
+    return summary["files"], elapsed, {"plan_seconds": round(planned - start, 4),
+                                       "apply_seconds": round(elapsed - (planned - start), 4),
+                                       "renames": summary["renames"], "collisions": summary["collisions"]}
+
+
+def bench_subtitles(ctx):
+    """Post-rename subtitle stage: hash, search and download (or reuse) one subtitle per file."""
+    paths = ctx.tree("subtitles", fresh=True)
+    fetcher = MetadataFetcher(concurrency=ctx.args.jobs, providers=ctx.server.providers_config(), backoff=0.01)
+    pipeline = SubtitlePipeline(OpenSubtitlesProvider(fetcher, "bench"),
+                                SubtitleCache(os.path.join(ctx.workdir, "subtitle_cache")),
+                                jobs=ctx.args.jobs, hash_index=HashIndex(os.path.join(ctx.workdir, "hashes.db")))
+    try:
+        start = time.perf_counter()
+        records = [future.result() for future in [pipeline.submit(path) for path in paths]]
+        elapsed = time.perf_counter() - start
+    finally:
+        pipeline.close()
+        fetcher.close()
+    statuses = [record["subtitle_status"] for record in records]
+    return len(records), elapsed, {status: statuses.count(status) for status in set(statuses)}
+
+
+def bench_artwork(ctx):
+    """Poster + thumbnail for every file: one search and download per title, shared by its episodes."""
+    paths = ctx.tree("artwork")
+    fetcher = MetadataFetcher(concurrency=ctx.args.jobs, providers=ctx.server.providers_config(), backoff=0.01)
+    posters = PosterCache(os.path.join(ctx.workdir, "posters"))
+    artwork = ArtworkFetcher(fetcher, "bench", MetadataCache(os.path.join(ctx.workdir, "artwork_cache.db")),
+                             posters, jobs=ctx.args.jobs)
+    downloads = ctx.server.requests.get("tmdb_images", 0)
+    try:
+        start = time.perf_counter()
+        thumbnails = [future.result() for future in [artwork.submit(path) for path in paths]]
+        elapsed = time.perf_counter() - start
+        titles = len({artwork.poster_key(path) for path in paths} - {None})
+        blobs = posters._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    finally:
+        artwork.close()
+        fetcher.close()
+    return len(paths), elapsed, {"titles": titles, "downloads": ctx.server.requests.get("tmdb_images", 0) - downloads,
+                                 "stored_posters": blobs, "thumbnails": sum(bool(path) for path in thumbnails)}
+
+
+# name -> (function, unit)
+SCENARIOS = {
+    "clean_filename": (bench_clean_filename, "names"),
+    "extract_info": (bench_extract_info, "names"),
+    "parse_pool": (bench_parse_pool, "names"),
+    "parse_many": (bench_parse_many, "names"),
+    "preview_cold": (bench_preview_cold, "files"),
+    "preview_warm": (bench_preview_warm, "files"),
+    "rename_file": (bench_rename_file, "files"),
+    "rename_files": (bench_rename_files, "files"),
+    "plan_apply": (bench_plan_apply, "files"),
+    "subtitles": (bench_subtitles, "files"),
+    "artwork": (bench_artwork, "files"),
+}
+
+
+class Context:
+    """Shared inputs: the in-memory corpus, on-disk trees and the stub server."""
+
+    def __init__(self, args, workdir, server):
+        self.args = args
+        self.workdir = workdir
+        self.server = server
+        self.names = make_corpus(args.count, args.seed)
+        self.trees = {}
+
+    def tree(self, label, fresh=False):
+        root = os.path.join(self.workdir, label)
+        if fresh and os.path.exists(root):
+            shutil.rmtree(root)
+        if fresh or label not in self.trees:
+            self.trees[label] = make_tree(root, self.args.files, self.args.seed)
+        return self.trees[label]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    names = args.only or list(SCENARIOS)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="filenom-bench-")
+    server = StubMetadataServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                not_found_rate=args.not_found_rate, seed=args.seed).start()
+    try:
+        ctx = Context(args, workdir, server)
+        for name in names:
+            fn, unit = SCENARIOS[name]
+            try:
+                outcome = fn(ctx)
+            except Skipped as e:
+                results[name] = {"skipped": str(e)}
+                print(f"{name:<16} skipped ({e})")
+                continue
+            items, seconds = outcome[:2]
+            result = {"items": items, "seconds": round(seconds, 4), "rate": round(items / seconds, 1), "unit": unit}
+            if len(outcome) > 2:
+                result.update(outcome[2])
+            results[name] = result
+            print(f"{name:<16} {result['rate']:>12,.0f} {unit}/s  ({items:,} in {seconds:.2f}s)")
+        results["_stub_requests"] = dict(server.requests)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+
+
+def compare(report, baseline_path):
+    """Print rate changes against an earlier report."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (revision {baseline.get('revision')})")
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name, {})
+        if "rate" not in result or "rate" not in old:
+            continue
+        change = (result["rate"] / old["rate"] - 1) * 100
+        print(f"{name:<16} {old['rate']:>12,.0f} -> {result['rate']:>12,.0f}  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="Names for the parser scenarios")
+    parser.add_argument("--files", type=int, default=2_000, help="Files on disk for the preview/rename scenarios")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", metavar="REPORT", help="Compare rates with an earlier JSON report")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
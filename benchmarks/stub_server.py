@@ -0,0 +1,219 @@
+"""
+Local stand-in for the OMDb and TMDb APIs, so benchmarks never touch the live services.
+
+Every title "exists": movies echo the queried title and year, and every season has
+EPISODES_PER_SEASON episodes. Latency, error rate (HTTP 503) and not-found rate are
+configurable. OMDb is served under /omdb, TMDb under /tmdb (poster images under
+/tmdb_images) and OpenSubtitles (subtitle search, download links and files) under
+/opensubtitles. Titles share POSTER_VARIANTS posters, so some posters are identical.
+
+Usage: python benchmarks/stub_server.py [--port 8765] [--latency 0.05] [--error-rate 0.01]
+"""
+import json
+import time
+import struct
+import random
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
+
+EPISODES_PER_SEASON = 24
+POSTER_VARIANTS = 64
+
+
+def poster_path(title):
+    return f"/poster{zlib.crc32(title.encode()) % POSTER_VARIANTS}.png"
+
+
+@lru_cache(maxsize=POSTER_VARIANTS)
+def poster_image(variant, width=342, height=513):
+    """A solid-colour PNG the size of a w342 TMDb poster."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = b"\x00" + bytes((variant * 4 % 256, 64, 128)) * width
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height)) + chunk(b"IEND", b""))
+
+
+class StubMetadataServer:
+    """Threaded stub server. Use as a context manager or call start()/stop()."""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, not_found_rate=0.0, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def providers_config(self):
+        """MetadataFetcher provider overrides pointing at this server, without rate limits."""
+        return {
+            "omdb": {"base_url": self.base_url + "/omdb", "rate": 1e6, "burst": 1e6},
+            "tmdb": {"base_url": self.base_url + "/tmdb", "rate": 1e6, "burst": 1e6},
+            "tmdb_images": {"base_url": self.base_url + "/tmdb_images", "rate": 1e6, "burst": 1e6},
+            "opensubtitles": {"base_url": self.base_url + "/opensubtitles", "rate": 1e6, "burst": 1e6},
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _roll(self):
+        with self.rng_lock:
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            return delay, self.rng.random() < self.error_rate, self.rng.random() < self.not_found_rate
+
+    def respond(self, path, query, body=None):
+        """Return (status, body) for a request. Bodies are JSON, except subtitle files and images (bytes)."""
+        delay, fail, missing = self._roll()
+        if delay:
+            time.sleep(delay)
+        provider = path.split("/")[1] if path.count("/") >= 1 else ""
+        with self.rng_lock:
+            self.requests[provider] = self.requests.get(provider, 0) + 1
+        if fail:
+            return 503, {"error": "stub failure"}
+        if provider == "omdb":
+            return 200, self.omdb(query, missing)
+        if provider == "tmdb":
+            return self.tmdb(path[len("/tmdb"):], query, missing)
+        if provider == "tmdb_images":
+            variant = path.rsplit("/poster", 1)[-1].split(".")[0]
+            return (200, poster_image(int(variant))) if variant.isdigit() else (404, {"status_message": "not found"})
+        if provider == "opensubtitles":
+            return self.opensubtitles(path[len("/opensubtitles"):], query, body, missing)
+        return 404, {"error": "unknown provider"}
+
+    @staticmethod
+    def omdb(query, missing):
+        title = query.get("t", [""])[0]
+        if missing or not title:
+            return {"Response": "False", "Error": "Movie not found!"}
+        if "Season" in query and "Episode" in query:
+            return {"Response": "True", "Title": f"Episode {int(query['Episode'][0])}"}
+        if "Season" in query:
+            episodes = [{"Episode": str(n), "Title": f"Episode {n}"} for n in range(1, EPISODES_PER_SEASON + 1)]
+            return {"Response": "True", "Title": title, "Episodes": episodes}
+        year = query.get("y", ["2000"])[0]
+        return {"Response": "True", "Title": title, "Year": year, "imdbID": f"tt{zlib.crc32(title.encode()):07d}"}
+
+    @staticmethod
+    def tmdb(path, query, missing):
+        if missing:
+            return 200, {"results": []} if path.startswith("/search") else {"episodes": []}
+        if path == "/search/movie":
+            year = query.get("year", ["2000"])[0]
+            title = query["query"][0]
+            return 200, {"results": [{"id": 1, "title": title, "release_date": f"{year}-01-01",
+                                      "poster_path": poster_path(title)}]}
+        if path == "/search/tv":
+            title = query["query"][0]
+            return 200, {"results": [{"id": zlib.crc32(title.encode()), "name": title, "poster_path": poster_path(title)}]}
+        if path.startswith("/tv/") and "/season/" in path:
+            episodes = [{"episode_number": n, "name": f"Episode {n}"} for n in range(1, EPISODES_PER_SEASON + 1)]
+            return 200, {"episodes": episodes}
+        if path.startswith("/movie/"):
+            return 200, {"id": 550, "title": "Fight Club"}
+        return 404, {"status_message": "not found"}
+
+    def opensubtitles(self, path, query, body, missing):
+        """
+        One subtitle per language, with a file id derived from the title/episode (or hash).
+        Only about half of all hashes are "known", so other files fall back to a title search.
+        """
+        if path == "/subtitles":
+            by_hash = "moviehash" in query
+            if missing or (by_hash and zlib.crc32(query["moviehash"][0].encode()) % 2):
+                return 200, {"data": []}
+            subject = query.get("moviehash", query.get("query", [""]))[0]
+            subject += "|" + query.get("season_number", [""])[0] + "|" + query.get("episode_number", [""])[0]
+            data = []
+            for language in query.get("languages", ["en"])[0].split(","):
+                file_id = zlib.crc32(f"{subject}|{language}".encode())
+                data.append({"attributes": {
+                    "language": language, "download_count": 100, "moviehash_match": by_hash,
+                    "release": subject, "files": [{"file_id": file_id, "file_name": f"{file_id}.srt"}],
+                }})
+            return 200, {"data": data}
+        if path == "/download":
+            return 200, {"link": f"{self.base_url}/opensubtitles/file/{body['file_id']}", "remaining": 100}
+        if path.startswith("/file/"):
+            return 200, f"1\n00:00:01,000 --> 00:00:02,000\nSubtitle {path[6:]}\n".encode()
+        return 404, {"status_message": "not found"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                self.reply(*server.respond(url.path, parse_qs(url.query)))
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                self.reply(*server.respond(url.path, parse_qs(url.query), body))
+
+            def reply(self, status, body):
+                binary = isinstance(body, bytes)
+                data = body if binary else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if binary else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="Fraction of lookups answered 'not found'")
+    args = parser.parse_args()
+
+    server = StubMetadataServer(args.port, args.latency, args.jitter, args.error_rate, args.not_found_rate)
+    print(f"Stub OMDb at {server.base_url}/omdb, TMDb at {server.base_url}/tmdb, "
+          f"OpenSubtitles at {server.base_url}/opensubtitles (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
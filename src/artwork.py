@@ -1 +1,298 @@
-# Artwork fetching 
+# Artwork fetching
+import os
+import glob
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import filename_parser
+from cache import make_key
+from providers import confident
+from stats import STATS
+
+POSTER_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "posters")
+
+POSTER_CACHE_MB = 200       # Posters and thumbnails kept on disk before the least recently used go
+POSTER_SIZE = "w342"        # TMDb image width fetched (roughly 20-60 KB per poster)
+THUMBNAIL_SIZE = (32, 48)   # Bounding box of the GUI's row thumbnails
+ARTWORK_JOBS = 4            # Concurrent poster lookups/downloads/thumbnails
+
+
+class PosterCache:
+    """
+    Size-capped poster store. Images live under objects/ by SHA-256, so one poster shared
+    by several titles is stored once, and an SQLite index maps each title key to its blob.
+    When posters and their thumbnails exceed max_bytes, the least recently used blobs are
+    evicted together with their thumbnails.
+    """
+
+    def __init__(self, root=POSTER_CACHE_DIR, max_bytes=POSTER_CACHE_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posters (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_posters_digest ON posters (digest);
+            CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs (last_used);
+        """)
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config, root=POSTER_CACHE_DIR):
+        return cls(root, config.get("poster_cache_mb", POSTER_CACHE_MB) * 1024 * 1024)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def thumbnail_path(self, digest, size):
+        return os.path.join(self.root, "thumbs", digest[:2], f"{digest}_{size[0]}x{size[1]}.png")
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def get(self, key):
+        """Return the digest of a title's poster (marking it used), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM posters WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(self.blob_path(row[0])):
+                return None
+            self._conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), row[0]))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, key, data):
+        """Store a downloaded poster for a title key and return its digest. Identical images are stored once."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                _write(path, data)
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, size, last_used) VALUES (?, ?, ?)",
+                (digest, len(data), time.time()),
+            )
+            self._total += len(data) * cursor.rowcount
+            self._conn.execute("INSERT OR REPLACE INTO posters (key, digest) VALUES (?, ?)", (key, digest))
+            self._conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            self._evict(keep=digest)
+            self._conn.commit()
+        return digest
+
+    def add_thumbnail(self, digest, path):
+        """Count a thumbnail written for a blob towards the size cap."""
+        size = os.path.getsize(path)
+        with self._lock:
+            cursor = self._conn.execute("UPDATE blobs SET size = size + ? WHERE digest = ?", (size, digest))
+            self._total += size * cursor.rowcount
+            self._evict(keep=digest)
+            self._conn.commit()
+
+    def _evict(self, keep):
+        """Drop least recently used blobs (never keep) until the cache fits in max_bytes."""
+        while self._total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT digest, size FROM blobs WHERE digest != ? ORDER BY last_used LIMIT 1", (keep,)
+            ).fetchone()
+            if row is None:
+                return
+            digest, size = row
+            for path in [self.blob_path(digest)] + glob.glob(self.thumbnail_path(digest, ("*", "*"))):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self._conn.execute("DELETE FROM posters WHERE digest = ?", (digest,))
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._total -= size
+            STATS.incr("artwork.evicted")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{threading.get_ident()}.part"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, path)
+
+
+def make_thumbnail(source, target, size=THUMBNAIL_SIZE):
+    """
+    Write a PNG of source scaled to fit size. The image is decoded at reduced size
+    (Pillow's draft mode, or Qt's scaled read) instead of in full and then shrunk.
+    Returns False if neither Pillow nor PyQt5 is installed or the image can't be read.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = f"{target}.{threading.get_ident()}.part"
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    if Image is not None:
+        try:
+            with Image.open(source) as image:
+                image.draft("RGB", size)
+                image.thumbnail(size)
+                image.save(partial, "PNG")
+        except OSError:
+            return False
+    else:
+        try:
+            from PyQt5.QtCore import QSize, Qt
+            from PyQt5.QtGui import QImageReader
+        except ImportError:
+            return False
+        reader = QImageReader(source)
+        if reader.size().isValid():
+            reader.setScaledSize(reader.size().scaled(QSize(*size), Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull() or not image.save(partial, "PNG"):
+            return False
+    os.replace(partial, target)
+    return True
+
+
+@lru_cache(maxsize=4096)
+def poster_title(name):
+    """
+    Return (title, year, is_tv) for a file name or path, or None if it doesn't parse.
+    Episodes share their show's poster, so they carry no year.
+    """
+    parsed = filename_parser.parse_path(name)
+    if not parsed.title:
+        return None
+    tv = parsed.season is not None
+    return parsed.title, None if tv else parsed.year, tv
+
+
+class ArtworkFetcher:
+    """
+    TMDb posters and their thumbnails. Everything is keyed by title (the show, for
+    episodes), so a season of files costs one search and one download, and concurrent
+    requests for a title share one Future. submit() runs on a bounded pool.
+    """
+
+    name = "tmdb"
+    images = "tmdb_images"        # Fetcher provider serving the image files
+    cache_prefix = "tmdb.poster"  # Search results share the metadata cache with the resolver's lookups
+
+    def __init__(self, fetcher, api_key, cache=None, posters=None, jobs=ARTWORK_JOBS,
+                 thumbnail_size=THUMBNAIL_SIZE):
+        self.fetcher = fetcher
+        self.api_key = api_key
+        self.cache = cache
+        self.posters = posters if posters is not None else PosterCache()
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="artwork")
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def poster_key(self, name):
+        """The cache key of a file's poster, or None if its name doesn't parse."""
+        title = poster_title(name)
+        if title is None:
+            return None
+        return make_key(self.cache_prefix, title[0], title[1]) + ("|tv" if title[2] else "")
+
+    def submit(self, name):
+        """Queue a file's thumbnail; the Future resolves to the thumbnail path, or None."""
+        key = self.poster_key(name)
+        if key is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self.pool.submit(self.thumbnail, key, *poster_title(name))
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+
+    def thumbnail(self, key, title, year=None, tv=False):
+        """Return the thumbnail path for a title, fetching its poster first if needed (None if it has none)."""
+        digest = self.poster(key, title, year, tv)
+        if digest is None:
+            return None
+        path = self.posters.thumbnail_path(digest, self.thumbnail_size)
+        if not os.path.exists(path):
+            with STATS.timer("thumbnail"):
+                if not make_thumbnail(self.posters.blob_path(digest), path, self.thumbnail_size):
+                    STATS.incr("artwork.no_thumbnail")
+                    return None
+            self.posters.add_thumbnail(digest, path)
+        return path
+
+    def poster(self, key, title, year=None, tv=False):
+        """Return the digest of a title's poster in the PosterCache, downloading it if needed."""
+        digest = self.posters.get(key)
+        if digest is not None:
+            STATS.incr("artwork.cached")
+            return digest
+        poster_path = self._poster_path(key, title, year, tv)
+        if not poster_path:
+            STATS.incr("artwork.none")
+            return None
+        with STATS.timer("artwork"):
+            response = self.fetcher.get(self.images, f"/{POSTER_SIZE}{poster_path}")
+        if response.status_code != 200 or not response.content:
+            STATS.incr("artwork.error")
+            return None
+        STATS.incr("artwork.downloaded")
+        return self.posters.put(key, response.content)
+
+    def _poster_path(self, key, title, year, tv):
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            params = {"query": title, "api_key": self.api_key}
+            if year:
+                params["year"] = year
+            data = self.fetcher.get_json(self.name, "/search/tv" if tv else "/search/movie", params=params)
+            if data is None:
+                return None
+            found = "first_air_date" if tv else "release_date"
+            match = next((item for item in data.get("results", [])[:5] if item.get("poster_path") and confident(
+                title, item.get("name" if tv else "title"), year, (item.get(found) or "")[:4] or None)), None)
+            data = {"poster_path": match and match["poster_path"]}
+            if self.cache is not None:
+                self.cache.put(key, data, negative=match is None)
+        return data["poster_path"]
+
+    def close(self, wait=True):
+        """
+        Wait for running fetches; queued ones that haven't started are dropped. With
+        wait=False (from the UI thread) this returns at once and a background thread
+        waits for them before closing the poster index.
+        """
+        if not wait:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            threading.Thread(target=self.close, name="artwork-close", daemon=True).start()
+            return
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.posters.close()
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from stats import STATS
+
+CACHE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metadata_cache.db")
+
+DEFAULT_TTL = 30 * 24 * 3600       # Positive hits: 30 days
+NEGATIVE_TTL = 6 * 3600            # "Response: False" results: 6 hours
+MAX_ENTRIES = 200_000              # Rows kept on disk before eviction
+MEMORY_SIZE = 4096                 # Entries kept in the in-memory LRU
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(title):
+    """Lower-case a title and collapse punctuation/whitespace so 'The.Office' == 'the office'."""
+    return _NON_ALNUM.sub(" ", str(title).lower()).strip()
+
+
+def make_key(provider, title, year=None, season=None, episode=None):
+    """Build the normalized cache key for a (title, year, season, episode, provider) lookup."""
+    parts = [
+        provider.lower(),
+        normalize_title(title),
+        str(int(year)) if year else "",
+        str(int(season)) if season not in (None, "") else "",
+        str(int(episode)) if episode not in (None, "") else "",
+    ]
+    return "|".join(parts)
+
+
+class MetadataCache:
+    """
+    SQLite-backed cache for metadata API responses with an in-memory LRU in front.
+    Negative answers (e.g. OMDb "Response: False") are cached with a shorter TTL.
+    """
+
+    def __init__(self, path=CACHE_DB_PATH, ttl=DEFAULT_TTL, negative_ttl=NEGATIVE_TTL,
+                 max_entries=MAX_ENTRIES, memory_size=MEMORY_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS metadata_cache (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                negative INTEGER NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_fetched ON metadata_cache (fetched_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config, path=CACHE_DB_PATH):
+        """Create a cache using the TTL and size settings from config.json, if present."""
+        return cls(
+            path=path,
+            ttl=config.get("cache_ttl", DEFAULT_TTL),
+            negative_ttl=config.get("cache_negative_ttl", NEGATIVE_TTL),
+            max_entries=config.get("cache_max_entries", MAX_ENTRIES),
+            memory_size=config.get("cache_memory_size", MEMORY_SIZE),
+        )
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    STATS.incr("cache.hit")
+                    return data
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM metadata_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                STATS.incr("cache.miss")
+                return None
+            STATS.incr("cache.hit")
+            STATS.incr("cache.hit.disk")
+            data = json.loads(row[0])
+            self._remember(key, data, row[1])
+            return data
+
+    def put(self, key, data, negative=False):
+        """Store a response. Negative entries expire after negative_ttl instead of ttl."""
+        now = time.time()
+        expires_at = now + (self.negative_ttl if negative else self.ttl)
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM metadata_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata_cache (key, data, negative, expires_at, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(data), int(negative), expires_at, now),
+            )
+            self._conn.commit()
+            if not exists:
+                self._count += 1
+            self._remember(key, data, expires_at)
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _remember(self, key, data, expires_at):
+        self._memory[key] = (data, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop expired rows, then the oldest 10% if still over the size limit."""
+        self._conn.execute("DELETE FROM metadata_cache WHERE expires_at <= ?", (time.time(),))
+        self._count = self._conn.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+        if self._count > self.max_entries:
+            excess = self._count - self.max_entries + max(1, self.max_entries // 10)
+            self._conn.execute(
+                "DELETE FROM metadata_cache WHERE key IN "
+                "(SELECT key FROM metadata_cache ORDER BY fetched_at LIMIT ?)",
+                (excess,),
+            )
+            self._count = self._conn.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+        self._conn.commit()
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM metadata_cache")
+            self._conn.commit()
+            self._count = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,225 @@
+import os
+import csv
+import gzip
+import sqlite3
+import threading
+from collections import namedtuple
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from cache import normalize_title
+
+CATALOG_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.db")
+
+MOVIE_KINDS = ("movie", "tvMovie", "video")
+TV_KINDS = ("tvSeries", "tvMiniSeries")
+MIN_SCORE = 0.85          # Minimum fuzzy score to accept a match
+CANDIDATES = 50           # Trigram candidates re-scored per fuzzy lookup
+RARE_GRAMS = 8            # Only the rarest query trigrams are used to pull candidates
+COMMON_GRAM_DOCS = 20_000 # Trigrams in more titles than this are treated as stopwords
+INSERT_BATCH = 50_000
+
+CatalogMatch = namedtuple("CatalogMatch", ["imdb_id", "title", "year", "kind", "score"])
+
+
+def _open(path):
+    """Open a plain or gzipped TSV/JSON dump as text."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _int(value):
+    return int(value) if value and value != "\\N" else None
+
+
+class TitleCatalog:
+    """
+    Offline title database imported from IMDb dumps (title.basics.tsv[.gz] and
+    optionally title.episode.tsv[.gz]). Exact title+year lookups hit a B-tree index;
+    fuzzy lookups pull candidates from an FTS5 trigram index and re-score them.
+    """
+
+    def __init__(self, path=CATALOG_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS titles (
+                id INTEGER PRIMARY KEY,
+                imdb_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                norm_title TEXT NOT NULL,
+                year INTEGER,
+                kind TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS episodes (
+                imdb_id TEXT PRIMARY KEY,
+                parent_id TEXT,
+                season INTEGER,
+                episode INTEGER,
+                title TEXT
+            );
+        """)
+        self.fuzzy = self._has_trigram(conn)
+        if self.fuzzy:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING fts5("
+                "norm_title, content='titles', content_rowid='id', tokenize='trigram')"
+            )
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS titles_vocab USING fts5vocab(titles_fts, 'row')")
+        conn.commit()
+
+    def _conn(self):
+        """One read connection per thread so lookups from worker pools don't serialize."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _has_trigram(conn):
+        """FTS5's trigram tokenizer needs SQLite 3.34+."""
+        try:
+            conn.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(x, tokenize='trigram')")
+            conn.execute("DROP TABLE temp.trigram_probe")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    @property
+    def available(self):
+        """True once a dump has been imported."""
+        return self._conn().execute("SELECT 1 FROM titles LIMIT 1").fetchone() is not None
+
+    def import_imdb(self, basics_path, episodes_path=None, kinds=MOVIE_KINDS + TV_KINDS):
+        """
+        Replace the catalog with an IMDb title.basics dump (and title.episode, for offline
+        episode titles). Returns the number of titles imported.
+        """
+        conn = self._conn()
+        conn.execute("DELETE FROM titles")
+        conn.execute("DELETE FROM episodes")
+        conn.execute("DROP INDEX IF EXISTS idx_titles_norm")
+        conn.execute("DROP INDEX IF EXISTS idx_episodes_parent")
+        kinds = set(kinds)
+        keep_episodes = episodes_path is not None
+
+        titles, episodes, count = [], [], 0
+        with _open(basics_path) as f:
+            reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+            next(reader, None)
+            for row in reader:
+                if len(row) < 6:
+                    continue
+                imdb_id, kind, title = row[0], row[1], row[2]
+                if kind in kinds:
+                    titles.append((imdb_id, title, normalize_title(title), _int(row[5]), kind))
+                elif keep_episodes and kind == "tvEpisode":
+                    episodes.append((imdb_id, title))
+                if len(titles) >= INSERT_BATCH:
+                    count += self._insert_titles(conn, titles)
+                if len(episodes) >= INSERT_BATCH:
+                    conn.executemany("INSERT OR REPLACE INTO episodes (imdb_id, title) VALUES (?, ?)", episodes)
+                    episodes = []
+        count += self._insert_titles(conn, titles)
+        conn.executemany("INSERT OR REPLACE INTO episodes (imdb_id, title) VALUES (?, ?)", episodes)
+
+        if keep_episodes:
+            with _open(episodes_path) as f:
+                reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+                next(reader, None)
+                batch = []
+                for row in reader:
+                    if len(row) < 4:
+                        continue
+                    batch.append((row[1], _int(row[2]), _int(row[3]), row[0]))
+                    if len(batch) >= INSERT_BATCH:
+                        conn.executemany("UPDATE episodes SET parent_id = ?, season = ?, episode = ? WHERE imdb_id = ?", batch)
+                        batch = []
+                conn.executemany("UPDATE episodes SET parent_id = ?, season = ?, episode = ? WHERE imdb_id = ?", batch)
+            conn.execute("DELETE FROM episodes WHERE parent_id IS NULL")
+
+        conn.execute("CREATE INDEX idx_titles_norm ON titles (norm_title, year)")
+        conn.execute("CREATE INDEX idx_episodes_parent ON episodes (parent_id, season, episode)")
+        if self.fuzzy:
+            conn.execute("INSERT INTO titles_fts (titles_fts) VALUES ('rebuild')")
+        conn.commit()
+        self.find.cache_clear()
+        return count
+
+    @staticmethod
+    def _insert_titles(conn, titles):
+        conn.executemany(
+            "INSERT INTO titles (imdb_id, title, norm_title, year, kind) VALUES (?, ?, ?, ?, ?)", titles
+        )
+        count = len(titles)
+        titles.clear()
+        return count
+
+    @lru_cache(maxsize=16384)
+    def find(self, title, year=None, kind=None):
+        """
+        Find the best match for a title (kind: "movie", "tv" or None for either).
+        Returns a CatalogMatch, or None if nothing scores at least MIN_SCORE.
+        """
+        norm = normalize_title(title)
+        if not norm:
+            return None
+        kinds = MOVIE_KINDS if kind == "movie" else TV_KINDS if kind == "tv" else MOVIE_KINDS + TV_KINDS
+        placeholders = ",".join("?" * len(kinds))
+        conn = self._conn()
+
+        rows = conn.execute(
+            f"SELECT imdb_id, title, norm_title, year, kind FROM titles "
+            f"WHERE norm_title = ? AND kind IN ({placeholders})",
+            (norm, *kinds),
+        ).fetchall()
+        if not rows and self.fuzzy and len(norm) >= 3:
+            rows = self._fuzzy_candidates(conn, norm, kinds, placeholders)
+
+        best = None
+        for imdb_id, match_title, match_norm, match_year, match_kind in rows:
+            score = 1.0 if match_norm == norm else SequenceMatcher(None, norm, match_norm).ratio()
+            if year and match_year:
+                score += 0.05 if match_year == year else -0.02 if abs(match_year - year) <= 1 else -0.3
+            if best is None or score > best.score:
+                best = CatalogMatch(imdb_id, match_title, match_year, match_kind, score)
+        return best if best is not None and best.score >= MIN_SCORE else None
+
+    @staticmethod
+    def _fuzzy_candidates(conn, norm, kinds, placeholders):
+        """Pull candidate rows sharing the query's rarest trigrams, best FTS rank first."""
+        grams = list({norm[i:i + 3] for i in range(len(norm) - 2)})
+        freq = dict(conn.execute(
+            f"SELECT term, doc FROM titles_vocab WHERE term IN ({','.join('?' * len(grams))})", grams
+        ).fetchall())
+        # Trigrams found in no title can't match; very common ones ("the") only add cost
+        rare = sorted((gram for gram in grams if 0 < freq.get(gram, 0) <= COMMON_GRAM_DOCS), key=freq.get)
+        rare = rare[:RARE_GRAMS]
+        if not rare:
+            return []
+        query = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in rare)
+        return conn.execute(
+            f"SELECT t.imdb_id, t.title, t.norm_title, t.year, t.kind FROM titles_fts "
+            f"JOIN titles t ON t.id = titles_fts.rowid "
+            f"WHERE titles_fts MATCH ? AND t.kind IN ({placeholders}) ORDER BY rank LIMIT ?",
+            (query, *kinds, CANDIDATES),
+        ).fetchall()
+
+    def episode_title(self, series_imdb_id, season, episode):
+        """Return an episode title from the imported title.episode data, or None."""
+        row = self._conn().execute(
+            "SELECT title FROM episodes WHERE parent_id = ? AND season = ? AND episode = ?",
+            (series_imdb_id, int(season), int(episode)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def has_episodes(self, series_imdb_id, season):
+        """True if the catalog holds episode titles for this series and season."""
+        return self._conn().execute(
+            "SELECT 1 FROM episodes WHERE parent_id = ? AND season = ? LIMIT 1",
+            (series_imdb_id, int(season)),
+        ).fetchone() is not None
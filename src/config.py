@@ -1,33 +1,211 @@
+# Settings (config.json)
 import json
 import os
-import requests
+import shutil
+import time
+import threading
+from collections.abc import Mapping
 
 CONFIG_FILE = "config.json"
-TMDB_API_BASE = "https://api.themoviedb.org/3"
-SIMKL_API_BASE = "https://api.simkl.com"
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+RELOAD_INTERVAL = 1.0   # Seconds between checks for changes to config.json
+
+# Known settings: name -> (type, default). A default of None means "the component's own
+# default" (e.g. MetadataCache's TTL); a null in the file counts as leaving the setting
+# out. Other keys in config.json are kept as they are.
+FIELDS = {
+    "omdb_api_key": (str, ""),
+    "tmdb_api_key": (str, ""),
+    "simkl_api_key": (str, ""),
+    "opensubtitles_api_key": (str, ""),
+    "fetch_concurrency": (int, None),
+    "providers": (dict, None),
+    "cache_ttl": (float, None),
+    "cache_negative_ttl": (float, None),
+    "cache_max_entries": (int, None),
+    "cache_memory_size": (int, None),
+    "tv_template": (str, None),
+    "movie_template": (str, None),
+    "artwork": (bool, True),
+    "poster_cache_mb": (float, None),
+}
+
+# Older spellings, renamed when the file is read (the GUI used to save "OMDB_API_KEY")
+LEGACY_NAMES = {"OMDB_API_KEY": "omdb_api_key"}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class Settings(Mapping):
+    """
+    An immutable snapshot of config.json. Known settings are typed attributes
+    (settings.tmdb_api_key, settings.cache_ttl); every key also reads like a dict, so
+    from_config() helpers take a Settings or a plain dict. Snapshots pickle, so worker
+    processes can be handed the same settings as the parent. With strict=False, invalid
+    values are dropped (so their defaults apply) instead of raising ConfigError.
+    """
+
+    def __init__(self, values=None, path=None, stamp=None, strict=True):
+        values = dict(values or {})
+        for old, new in LEGACY_NAMES.items():
+            if old in values:
+                values.setdefault(new, values[old])
+                del values[old]
+        for name in [name for name in values if name in FIELDS]:
+            if values[name] is None:
+                del values[name]   # null: not set, so .get(name, default) gives the default
+                continue
+            try:
+                values[name] = _checked(name, values[name])
+            except ConfigError:
+                if strict:
+                    raise
+                del values[name]
+        self._values = values
+        self.path = path
+        self.stamp = stamp   # (mtime_ns, size) of the file when it was read
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in FIELDS:
+            raise AttributeError(name)
+        return self._values.get(name, FIELDS[name][1])
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"Settings({self._values!r})"
+
+    def updated(self, **changes):
+        """A copy with some settings changed (None removes one)."""
+        values = dict(self._values, **changes)
+        return Settings({name: value for name, value in values.items() if value is not None}, self.path)
+
+
+def _checked(name, value):
+    kind = FIELDS[name][0]
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ConfigError(f"{CONFIG_FILE}: {name} must be {kind.__name__}, not {value!r}")
+    return value
+
+
+class ConfigStore:
+    """
+    Loads config.json once and hands out the cached Settings. The file's mtime and size are
+    checked at most every RELOAD_INTERVAL seconds and it is reloaded when they changed, so a running
+    GUI or --watch picks up edits while lookups never read the file. save() writes atomically.
+    """
+
+    def __init__(self, path=CONFIG_PATH):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._settings = None
+        self._next_check = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self._settings is not None and now < self._next_check:
+            return self._settings
+        with self._lock:
+            self._next_check = now + RELOAD_INTERVAL
+            stamp = _stamp(self.path)
+            if self._settings is None or stamp != self._settings.stamp:
+                try:
+                    self._settings = self._load(stamp)
+                except ConfigError as e:
+                    if self._settings is None:
+                        raise
+                    # Keep running on the last good settings until the file is fixed
+                    print(f"⚠️ {e}; keeping the previous settings")
+            return self._settings
+
+    def _load(self, stamp, strict=True):
+        if stamp is None:
+            return Settings(path=self.path)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                values = json.load(f)
+            if not isinstance(values, dict):
+                raise ValueError("it must hold a JSON object")
+        except ValueError as e:
+            if strict:
+                raise ConfigError(f"{CONFIG_FILE}: {e}")
+            values = {}
+        return Settings(values, self.path, stamp, strict)
+
+    def save(self, **changes):
+        """
+        Change some settings (None removes one), keeping everything else in the file,
+        and write it atomically. Returns the new Settings. If the file can't be read or
+        holds invalid values, it is first copied to config.json.bak and only what could
+        be read is kept, so the settings dialogs can still save.
+        """
+        with self._lock:
+            stamp = _stamp(self.path)
+            try:
+                current = self._load(stamp)
+            except ConfigError as e:
+                shutil.copy2(self.path, self.path + ".bak")
+                print(f"⚠️ {e}; the file was copied to {CONFIG_FILE}.bak before saving")
+                current = self._load(stamp, strict=False)
+            settings = current.updated(**changes)
+            partial = f"{self.path}.{os.getpid()}.tmp"
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump(dict(settings), f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, self.path)
+            self._settings = Settings(dict(settings), self.path, _stamp(self.path))
+            self._next_check = time.monotonic() + RELOAD_INTERVAL
+            return self._settings
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+_store = None
+
+
+def store():
+    """The process-wide ConfigStore for config.json (next to this module, like the databases)."""
+    global _store
+    if _store is None:
+        _store = ConfigStore()
+    return _store
+
 
 def load_config():
-    """Load API keys from config.json."""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return {"tmdb_api_key": "", "simkl_api_key": ""}
+    """Return the current Settings (cached; reloaded when config.json changes)."""
+    return store().get()
+
 
 def save_config(tmdb_key, simkl_key):
-    """Save API keys to config.json."""
-    config = {"tmdb_api_key": tmdb_key, "simkl_api_key": simkl_key}
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+    """Save the TMDb and SIMKL API keys, keeping the other settings."""
+    return store().save(tmdb_api_key=tmdb_key, simkl_api_key=simkl_key)
 
 def validate_tmdb_key(tmdb_key):
     """Validate the TMDb API key by making a test request."""
-    url = f"{TMDB_API_BASE}/movie/550?api_key={tmdb_key}"
-    response = requests.get(url)
-    return response.status_code == 200
+    from imdb_fetcher import get_fetcher
+    from providers import TmdbProvider
+    return TmdbProvider(get_fetcher(), tmdb_key).validate()
 
 def validate_simkl_key(simkl_key):
     """Validate the SIMKL API key by making a test request."""
-    headers = {"simkl-api-key": simkl_key}
-    response = requests.get(f"{SIMKL_API_BASE}/movies/trending", headers=headers)
-
-    return response.status_code == 200
+    from imdb_fetcher import get_fetcher
+    from providers import SimklProvider
+    return SimklProvider(get_fetcher(), simkl_key).validate()
@@ -1 +1,182 @@
-# Database handler 
+# Database handler
+import os
+import time
+import sqlite3
+import threading
+
+from planner import execute, plan_renames
+
+HISTORY_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "renaming_history.db")
+
+FLUSH_EVERY = 1000   # Rows buffered per executemany/commit
+
+
+class RenameHistory:
+    """
+    Rename history stored in SQLite (WAL mode). Renames are grouped into batches:
+    each batch buffers its rows in memory and writes them with executemany, so
+    logging costs one commit per FLUSH_EVERY renames rather than one per file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path = path or HISTORY_DB_PATH
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS renaming_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                old_filename TEXT NOT NULL,
+                new_filename TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS rename_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                label TEXT,
+                created_at REAL NOT NULL,
+                undone_at REAL
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(renaming_history)")}
+        if "batch_id" not in columns:
+            self._conn.execute("ALTER TABLE renaming_history ADD COLUMN batch_id INTEGER")
+        if "undone" not in columns:
+            self._conn.execute("ALTER TABLE renaming_history ADD COLUMN undone INTEGER NOT NULL DEFAULT 0")
+        self._conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_history_batch ON renaming_history (batch_id);
+            CREATE INDEX IF NOT EXISTS idx_history_old ON renaming_history (old_filename);
+            CREATE INDEX IF NOT EXISTS idx_history_new ON renaming_history (new_filename);
+        """)
+        self._conn.commit()
+
+    def batch(self, label=""):
+        """Start a new batch. Use as a context manager or call close() when done."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO rename_batches (label, created_at) VALUES (?, ?)", (label, time.time())
+            )
+            self._conn.commit()
+        return RenameBatch(self, cursor.lastrowid)
+
+    def _write(self, batch_id, rows):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO renaming_history (old_filename, new_filename, batch_id) VALUES (?, ?, ?)",
+                [(old, new, batch_id) for old, new in rows],
+            )
+            self._conn.commit()
+
+    def batches(self, limit=20, include_undone=False):
+        """Return recent batches as (id, label, created_at, undone_at, file_count), newest first."""
+        query = (
+            "SELECT b.id, b.label, b.created_at, b.undone_at, COUNT(h.id) FROM rename_batches b "
+            "LEFT JOIN renaming_history h ON h.batch_id = b.id "
+            + ("" if include_undone else "WHERE b.undone_at IS NULL ")
+            + "GROUP BY b.id ORDER BY b.id DESC LIMIT ?"
+        )
+        with self._lock:
+            return self._conn.execute(query, (limit,)).fetchall()
+
+    def entries(self, batch_id):
+        """Return the (id, old_filename, new_filename) rows of a batch in rename order."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, old_filename, new_filename FROM renaming_history "
+                "WHERE batch_id = ? AND undone = 0 ORDER BY id",
+                (batch_id,),
+            ).fetchall()
+
+    def contains(self, old_filename, new_filename):
+        """True if a rename from old_filename to new_filename is recorded and not undone."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM renaming_history WHERE old_filename = ? AND new_filename = ? AND undone = 0",
+                (str(old_filename), str(new_filename)),
+            ).fetchone() is not None
+
+    def last_batch_id(self):
+        """Return the newest batch that has not been undone, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM rename_batches WHERE undone_at IS NULL ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def undo_batch(self, batch_id=None, jobs=8):
+        """
+        Undo a batch (default: the most recent one) by renaming every file back.
+        The reverse renames go through the planner, so chains and swaps inside the batch
+        are undone safely. A file is skipped as a conflict if its renamed copy is gone or
+        its original name is taken.
+        Returns: (undone_count, [(old_filename, new_filename, reason), ...])
+        """
+        if batch_id is None:
+            batch_id = self.last_batch_id()
+            if batch_id is None:
+                return 0, []
+
+        entry_ids = {}
+        pairs = []
+        conflicts = []
+        for entry_id, old, new in self.entries(batch_id):
+            if not os.path.lexists(new):
+                conflicts.append((old, new, "renamed file no longer exists"))
+                continue
+            entry_ids[os.path.abspath(new)] = entry_id
+            pairs.append((new, old))
+
+        undone = []
+        for result in execute(plan_renames(pairs), jobs=jobs):
+            if result.status == "renamed":
+                undone.append((entry_ids[result.source],))
+            elif result.status == "conflict" and result.error == "target exists":
+                conflicts.append((result.target, result.source, "original name is taken"))
+            else:
+                conflicts.append((result.target, result.source, result.error or result.status))
+
+        with self._lock:
+            self._conn.executemany("UPDATE renaming_history SET undone = 1 WHERE id = ?", undone)
+            if not conflicts:
+                self._conn.execute("UPDATE rename_batches SET undone_at = ? WHERE id = ?", (time.time(), batch_id))
+            self._conn.commit()
+        return len(undone), conflicts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RenameBatch:
+    """A batch of renames being recorded. Thread-safe; rows are flushed in bulk."""
+
+    def __init__(self, history, batch_id):
+        self.history = history
+        self.id = batch_id
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def record(self, old_filename, new_filename):
+        """Buffer one completed rename (full paths)."""
+        with self._lock:
+            self._rows.append((str(old_filename), str(new_filename)))
+            if len(self._rows) < FLUSH_EVERY:
+                return
+            rows, self._rows = self._rows, []
+        self.history._write(self.id, rows)
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            self.history._write(self.id, rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
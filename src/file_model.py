@@ -0,0 +1,106 @@
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtGui import QColor
+
+# Status codes stored per row (one byte each) and the colour they render as
+STATUS_PENDING, STATUS_OK, STATUS_FAILED, STATUS_UNKNOWN = range(4)
+STATUS_COLORS = ("white", "green", "red", "orange")
+COLOR_STATUS = {color: code for code, color in enumerate(STATUS_COLORS)}
+
+COLUMN_ORIGINAL, COLUMN_PREVIEW = range(2)
+
+
+class FileTableModel(QAbstractTableModel):
+    """
+    Table of files backed by a columnar store: one list for original paths, one for
+    proposed names and a byte array for status. data() builds nothing until a cell is shown.
+    """
+
+    HEADERS = ("Original Files", "Renamed Preview")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paths = []
+        self.previews = []
+        self.statuses = array("B")
+        self._brushes = [QColor(color) for color in STATUS_COLORS]
+        self.thumbnails = None   # Optional workers.ThumbnailLoader for the preview column
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.paths[row] if index.column() == COLUMN_ORIGINAL else self.previews[row]
+        if role == Qt.ForegroundRole and index.column() == COLUMN_PREVIEW:
+            return self._brushes[self.statuses[row]]
+        if role == Qt.DecorationRole and index.column() == COLUMN_PREVIEW and self.thumbnails is not None:
+            return self.thumbnails.icon(self.previews[row])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def set_thumbnails(self, loader):
+        """Show poster thumbnails from a ThumbnailLoader in the preview column (None turns them off)."""
+        if self.thumbnails is not None:
+            self.thumbnails.changed.disconnect(self._thumbnails_changed)
+        self.thumbnails = loader
+        if loader is not None:
+            loader.changed.connect(self._thumbnails_changed)
+        self._thumbnails_changed()
+
+    def _thumbnails_changed(self):
+        # Views repaint only the visible cells, whatever the range
+        if self.paths:
+            self.dataChanged.emit(self.index(0, COLUMN_PREVIEW), self.index(len(self.paths) - 1, COLUMN_PREVIEW),
+                                  [Qt.DecorationRole])
+
+    def append_rows(self, rows):
+        """Append (path, preview_name, color) rows with a single insert notification."""
+        if not rows:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for path, preview, color in rows:
+            self.paths.append(path)
+            self.previews.append(preview)
+            self.statuses.append(COLOR_STATUS.get(color, STATUS_PENDING))
+        self.endInsertRows()
+
+    def update_row(self, row, path=None, preview=None, color=None):
+        """Update one row in place (e.g. after it has been renamed)."""
+        if path is not None:
+            self.paths[row] = path
+        if preview is not None:
+            self.previews[row] = preview
+        if color is not None:
+            self.statuses[row] = COLOR_STATUS.get(color, STATUS_PENDING)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def clear(self):
+        self.beginResetModel()
+        self.paths = []
+        self.previews = []
+        self.statuses = array("B")
+        self.endResetModel()
+
+
+def make_proxy(model, parent=None):
+    """Sort/filter proxy over a FileTableModel: filters on every column, case-insensitive."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setFilterKeyColumn(-1)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    # Re-sorting on every batch insert would be O(n log n) per batch
+    proxy.setDynamicSortFilter(False)
+    return proxy
@@ -0,0 +1,175 @@
+# Filename parser: the one parse engine shared by the CLI, the GUI and the parse pool
+import os
+import re
+from array import array
+from collections import namedtuple
+
+from scanner import VIDEO_EXTENSIONS
+
+# Release noise stripped in a single pass: [tags], (tags), resolution/codec/source tokens
+NOISE_PATTERN = re.compile(
+    r"\[.*?\]"
+    r"|\(.*?\)"
+    r"|[-_.]?(?:1080p|720p|480p|2160p|4K|BluRay|WEBRip|WEB|x264|x265|HEVC|H.264|H.265|AAC|DDP5\.1|DTS|HDR|HDTV|DVDRip|BRRip)",
+    re.IGNORECASE,
+)
+
+# Release group at the end (-YIFY, -NTb); applied after noise removal
+GROUP_SUFFIX_PATTERN = re.compile(r"-[A-Za-z0-9]+$")
+
+# TV shows (e.g. S02E05 or 02x05), optionally followed by " - Episode Title"
+TV_PATTERN = re.compile(
+    r'(?P<title>.+?)\s(?:-|\.|_)?\s?(S(?P<season>\d{1,2})E(?P<episode>\d{1,2})|\b(?P<season_alt>\d{1,2})x(?P<episode_alt>\d{1,2})\b)(?:\s-\s(?P<episode_title>.+))?',
+    re.IGNORECASE
+)
+
+# "Show 102": season 1, episode 02 (three digits, not followed by more digits). Only used
+# with a show-like context (see TV_SOURCE_PATTERN), so "Fahrenheit 451" stays a movie.
+NUMBERED_PATTERN = re.compile(
+    r'(?P<title>.+?)\s(?P<season>[1-9])(?P<episode>0[1-9]|[1-9]\d)(?=\s|$)(?:\s-\s(?P<episode_title>.+))?'
+)
+
+# Broadcast sources in a raw name; they mark "Show 102 HDTV" as an episode
+TV_SOURCE_PATTERN = re.compile(r"(?<![0-9a-z])(?:HDTV|PDTV|SDTV|DSR|TVRip)(?![0-9a-z])", re.IGNORECASE)
+
+# Movie year: the last 19xx/20xx word, so "2001 A Space Odyssey 1968" keeps its title
+YEAR_PATTERN = re.compile(r'.*\s((?:19|20)\d{2})(?=\s|$)')
+
+# "(1995)" in the raw name; clean() drops every (...) group, so the year is read first
+PAREN_YEAR_PATTERN = re.compile(r'\(((?:19|20)\d{2})\)')
+
+# Dots/underscores between letters or digits are word separators ("The.Office.S02E01")
+SEPARATOR_PATTERN = re.compile(r'(?<=[^\W_])[._](?=[^\W_])')
+
+# Resolution tag, kept for the {Quality} naming-template field
+QUALITY_PATTERN = re.compile(r"(?<![0-9a-z])(2160p|1080p|720p|480p|4K)(?![0-9a-z])", re.IGNORECASE)
+
+# title: str, year: int or None, season/episode: digit strings as written (e.g. "02") or None,
+# episode_title: str or None. Unpacks like the old extract_info() 5-tuple.
+ParsedName = namedtuple("ParsedName", ["title", "year", "season", "episode", "episode_title"])
+
+NO_MATCH = ParsedName(None, None, None, None, None)
+
+
+def clean(name):
+    """
+    Strip release noise from a name in one pass.
+    Returns: (cleaned_name, changed)
+    """
+    cleaned = NOISE_PATTERN.sub("", name)
+    cleaned = GROUP_SUFFIX_PATTERN.sub("", cleaned)
+    cleaned = " ".join(cleaned.split())
+    return cleaned, cleaned != name
+
+
+def quality(name):
+    """Return the resolution tag in a raw name (e.g. "1080p"), or None."""
+    match = QUALITY_PATTERN.search(name)
+    return match.group(1) if match else None
+
+
+def parse(name):
+    """
+    Parse a file stem into a ParsedName. TV matches leave year None;
+    movie matches leave season/episode None. Returns NO_MATCH if nothing matched.
+    """
+    cleaned = clean(name)[0]
+
+    tv_match = TV_PATTERN.search(cleaned)
+    if tv_match is None and ("." in cleaned or "_" in cleaned):
+        cleaned = SEPARATOR_PATTERN.sub(" ", cleaned)
+        tv_match = TV_PATTERN.search(cleaned)
+    if tv_match:
+        return ParsedName(
+            _show(tv_match.group("title")),
+            None,
+            tv_match.group("season") or tv_match.group("season_alt"),
+            tv_match.group("episode") or tv_match.group("episode_alt"),
+            tv_match.group("episode_title"),
+        )
+    if not cleaned:
+        return NO_MATCH
+
+    paren_year = PAREN_YEAR_PATTERN.search(name) if "(" in name else None
+    if paren_year:
+        return ParsedName(cleaned, int(paren_year.group(1)), None, None, None)
+
+    year_match = YEAR_PATTERN.match(cleaned)
+    if year_match:
+        title = cleaned[:year_match.start(1)].rstrip(" -")
+        return ParsedName(title, int(year_match.group(1)), None, None, None)
+
+    numbered = NUMBERED_PATTERN.match(cleaned)
+    if numbered and (numbered.group("episode_title") or TV_SOURCE_PATTERN.search(name)):
+        return ParsedName(_show(numbered.group("title")), None, numbered.group("season"),
+                          numbered.group("episode"), numbered.group("episode_title"))
+    return ParsedName(cleaned, None, None, None, None)
+
+
+def _show(title):
+    title = SEPARATOR_PATTERN.sub(" ", title).strip()
+    return "Unknown Show" if not title or title == "-" else title
+
+
+class ParsedBatch:
+    """
+    Parse results for a batch of paths, stored column-wise so a batch pickles as a few
+    lists instead of one object per file. Years are an array of unsigned shorts (0 = no
+    year); season/episode stay digit strings as written. Indexing or iterating yields
+    ParsedName tuples; paths[i] is the input path.
+    """
+
+    __slots__ = ("paths", "titles", "years", "seasons", "episodes", "episode_titles")
+
+    def __init__(self, paths, titles, years, seasons, episodes, episode_titles):
+        self.paths = paths
+        self.titles = titles
+        self.years = years
+        self.seasons = seasons
+        self.episodes = episodes
+        self.episode_titles = episode_titles
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        return ParsedName(self.titles[i], self.years[i] or None, self.seasons[i], self.episodes[i],
+                          self.episode_titles[i])
+
+    def __iter__(self):
+        for title, year, season, episode, episode_title in zip(
+                self.titles, self.years, self.seasons, self.episodes, self.episode_titles):
+            yield ParsedName(title, year or None, season, episode, episode_title)
+
+    def __getstate__(self):
+        return (self.paths, self.titles, self.years, self.seasons, self.episodes, self.episode_titles)
+
+    def __setstate__(self, state):
+        self.paths, self.titles, self.years, self.seasons, self.episodes, self.episode_titles = state
+
+
+def parse_path(path):
+    """parse() a path's file name, without its video extension (any other dot is part of the name)."""
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    return parse(stem if ext.lower() in VIDEO_EXTENSIONS else name)
+
+
+def parse_many(paths):
+    """
+    Parse the names of a list of paths into a ParsedBatch, like parse_path() on each.
+    This is the batch hot path: locals are bound once and results go straight into columns.
+    """
+    splitext, basename = os.path.splitext, os.path.basename
+    titles, seasons, episodes, episode_titles = [], [], [], []
+    years = array("H")
+    for path in paths:
+        name = basename(path)
+        stem, ext = splitext(name)
+        title, year, season, episode, episode_title = parse(stem if ext.lower() in VIDEO_EXTENSIONS else name)
+        titles.append(title)
+        years.append(year or 0)
+        seasons.append(season)
+        episodes.append(episode)
+        episode_titles.append(episode_title)
+    return ParsedBatch(paths, titles, years, seasons, episodes, episode_titles)
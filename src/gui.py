@@ -1,17 +1,22 @@
 import sys
 import os
-import json
-import requests
-import re
+from functools import cached_property
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QFileDialog, QListWidget, QPushButton, QVBoxLayout, QWidget,
-    QLabel, QHBoxLayout, QMessageBox, QLineEdit, QDialog, QFormLayout, QListWidgetItem
+    QApplication, QMainWindow, QFileDialog, QPushButton, QVBoxLayout, QWidget,
+    QHBoxLayout, QMessageBox, QLineEdit, QDialog, QFormLayout, QTableView, QHeaderView,
+    QAbstractItemView, QCheckBox
 )
-from PyQt5.QtGui import QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSize, QThreadPool
+from config import load_config, store
+from file_model import FileTableModel, make_proxy
+from filename_parser import parse_many, parse_path
+from planner import execute, plan_renames
+from scanner import VIDEO_EXTENSIONS, iter_video_files
+from stats import STATS
+from templates import NamingScheme
+from workers import BatchJob, ThumbnailLoader
 
 # Constants
-CONFIG_FILE = "config.json"
 DEFAULT_DIRECTORY = r"G:\My Drive\NZBGet"
 
 # Settings Dialog Class
@@ -43,30 +48,18 @@ class SettingsDialog(QDialog):
 
     def load_existing_key(self):
         """Load API Key from config if available."""
-        config = self.load_config()
-        if "OMDB_API_KEY" in config:
-            self.api_key_input.setText(config["OMDB_API_KEY"])
+        self.api_key_input.setText(load_config().omdb_api_key)
 
     def save_settings(self):
-        """Save API Key to config file."""
+        """Save API Key to config file, keeping the other settings."""
         api_key = self.api_key_input.text().strip()
         if api_key:
-            config = {"OMDB_API_KEY": api_key}
-            with open(CONFIG_FILE, "w") as f:
-                json.dump(config, f)
+            store().save(omdb_api_key=api_key)
             QMessageBox.information(self, "Saved", "OMDB API Key has been saved successfully.")
             self.accept()
         else:
             QMessageBox.warning(self, "Error", "Please enter a valid OMDB API key.")
 
-    @staticmethod
-    def load_config():
-        """Load configuration file."""
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
-        return {}
-
 # Main Application Class
 class FileNomApp(QMainWindow):
     def __init__(self):
@@ -78,6 +71,13 @@ class FileNomApp(QMainWindow):
         # Load API Key
         self.api_key = self.load_api_key()
 
+        # Background jobs (preview/rename) run on the Qt thread pool
+        self.thread_pool = QThreadPool.globalInstance()
+        self.jobs = set()
+
+        # Lookup services, the library index and rename history are opened on first use
+        # (see the cached properties below) so the window shows without waiting for them
+
         # Layouts
         self.central_widget = QWidget()
         self.layout = QVBoxLayout(self.central_widget)
@@ -86,45 +86,56 @@ class FileNomApp(QMainWindow):
         # Apply Dark Mode Styling
         self.setStyleSheet("""
             QWidget { background-color: #2b2b2b; color: white; }
-            QListWidget { background-color: #1e1e1e; color: white; }
+            QTableView { background-color: #1e1e1e; color: white; }
             QPushButton { background-color: #444; color: white; padding: 6px; }
             QPushButton:hover { background-color: #666; }
         """)
 
-        # File List Widgets (Dual Pane)
-        self.file_list_original = QListWidget()
-        self.file_list_preview = QListWidget()
-        self.file_list_original.setDragDropMode(QListWidget.InternalMove)
-        self.file_list_preview.setDragDropMode(QListWidget.InternalMove)
-
-        # Labels
-        self.label_original = QLabel("Original Files")
-        self.label_preview = QLabel("Renamed Preview")
+        # File Table (original path | renamed preview), virtualized over a columnar model
+        self.file_model = FileTableModel(self)
+        self.file_proxy = make_proxy(self.file_model, self)
+        self.file_view = QTableView()
+        self.file_view.setModel(self.file_proxy)
+        self.file_view.setSortingEnabled(True)
+        self.file_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.file_view.setWordWrap(False)
+        self.file_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.file_view.verticalHeader().setDefaultSectionSize(22)
+        self.file_view.verticalHeader().hide()
+        self.file_view.setIconSize(QSize(14, 21))
+        self.file_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        # Filter box
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter files…")
+        self.filter_input.textChanged.connect(self.file_proxy.setFilterFixedString)
 
         # Buttons
         self.add_files_btn = QPushButton("Add Files")
         self.add_folder_btn = QPushButton("Add Folder")
         self.rename_btn = QPushButton("Rename Files")
         self.clear_btn = QPushButton("Clear List")
+        self.undo_btn = QPushButton("Undo Last Rename")
         self.settings_btn = QPushButton("Settings")
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.incremental_check = QCheckBox("New/changed files only")
 
         # Layout Management
-        file_layout = QHBoxLayout()
-        file_layout.addWidget(self.label_original)
-        file_layout.addWidget(self.label_preview)
-
         list_layout = QHBoxLayout()
-        list_layout.addWidget(self.file_list_original)
-        list_layout.addWidget(self.file_list_preview)
+        list_layout.addWidget(self.file_view)
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.add_files_btn)
         btn_layout.addWidget(self.add_folder_btn)
         btn_layout.addWidget(self.rename_btn)
         btn_layout.addWidget(self.clear_btn)
+        btn_layout.addWidget(self.undo_btn)
         btn_layout.addWidget(self.settings_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(self.incremental_check)
 
-        self.layout.addLayout(file_layout)
+        self.layout.addWidget(self.filter_input)
         self.layout.addLayout(list_layout)
         self.layout.addLayout(btn_layout)
 
@@ -133,167 +144,262 @@ class FileNomApp(QMainWindow):
         self.add_folder_btn.clicked.connect(self.add_folder)
         self.rename_btn.clicked.connect(self.rename_files)
         self.clear_btn.clicked.connect(self.clear_list)
+        self.undo_btn.clicked.connect(self.undo_last_rename)
         self.settings_btn.clicked.connect(self.open_settings)
+        self.cancel_btn.clicked.connect(self.cancel_jobs)
 
         # Warn if API Key is missing
         if not self.api_key:
             QMessageBox.warning(self, "OMDB API Key Missing", "Please enter your OMDB API key in settings.")
 
+    @cached_property
+    def config(self):
+        return load_config()
+
+    @cached_property
+    def cache(self):
+        """Metadata cache (avoids repeat OMDB lookups for already-seen titles)."""
+        from cache import MetadataCache
+
+        return MetadataCache.from_config(self.config)
+
+    @cached_property
+    def fetcher(self):
+        from imdb_fetcher import get_fetcher
+
+        return get_fetcher(self.config)
+
+    @cached_property
+    def naming(self):
+        return NamingScheme.from_config(self.config)
+
+    @cached_property
+    def resolver(self):
+        from catalog import TitleCatalog
+        from providers import build_providers
+        from resolver import BatchResolver
+
+        providers = build_providers(self.fetcher, self.cache, self.config, self.api_key)
+        return BatchResolver(self.fetcher, self.cache, providers, TitleCatalog())
+
+    @cached_property
+    def index(self):
+        """Persistent file index so re-adding a folder only picks up new/changed files."""
+        from library_index import LibraryIndex
+
+        return LibraryIndex()
+
+    @cached_property
+    def history(self):
+        """Rename history (one batch per "Rename Files" click, undoable)."""
+        from db import RenameHistory
+
+        return RenameHistory()
+
+    @cached_property
+    def artwork(self):
+        """Poster thumbnails for the preview column; None without a TMDb key or with "artwork": false."""
+        tmdb_key = self.config.get("tmdb_api_key", "")
+        if not tmdb_key or not self.config.get("artwork", True):
+            return None
+        from artwork import ArtworkFetcher, PosterCache
+
+        return ArtworkFetcher(self.fetcher, tmdb_key, self.cache, PosterCache.from_config(self.config))
+
     def load_api_key(self):
         """Load API Key from config file."""
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r") as f:
-                config = json.load(f)
-                return config.get("OMDB_API_KEY", "")
-        return ""
+        return load_config().omdb_api_key
 
     def open_settings(self):
         """Open Settings Dialog."""
         dialog = SettingsDialog(self)
         dialog.exec_()
+        self.refresh_config()
+
+    def refresh_config(self):
+        """Pick up config.json changes (from the dialog or an editor): rebuild what depends on them."""
+        if "config" in self.__dict__ and load_config() is self.config:
+            return
         self.api_key = self.load_api_key()
+        for name in ("config", "naming", "artwork"):
+            self.__dict__.pop(name, None)
+        if self.file_model.thumbnails is not None:
+            # Posters may be downloading: don't block the UI thread waiting for them
+            self.file_model.thumbnails.artwork.close(wait=False)
+            self.file_model.set_thumbnails(None)
+        if "resolver" in self.__dict__:
+            from providers import build_providers
+
+            self.resolver.providers = build_providers(self.fetcher, self.cache, self.config, self.api_key)
+
+    def start_job(self, job, on_batch, label, on_finished=None):
+        """Run a BatchJob in the background, reporting progress in the status bar."""
+        job.signals.batch.connect(on_batch)
+        job.signals.progress.connect(
+            lambda done: self.statusBar().showMessage(f"{label}… {done} files · {STATS.summary()}")
+        )
+        job.signals.error.connect(lambda message: print(f"❌ {label} failed: {message}"))
+
+        def finished(cancelled):
+            self.jobs.discard(job)
+            self.cancel_btn.setEnabled(bool(self.jobs))
+            self.statusBar().showMessage(f"{label} cancelled" if cancelled else f"{label} done · {STATS.summary()}", 10000)
+            if on_finished is not None:
+                on_finished(cancelled)
+
+        job.signals.finished.connect(finished)
+        self.jobs.add(job)
+        self.cancel_btn.setEnabled(True)
+        self.thread_pool.start(job)
+
+    def cancel_jobs(self):
+        """Cancel all running preview/rename jobs."""
+        for job in list(self.jobs):
+            job.cancel()
 
     def rename_files(self):
         """Rename all files based on preview names."""
-        for i in range(self.file_list_original.count()):
-            original_path = self.file_list_original.item(i).text()
-            new_name = self.file_list_preview.item(i).text()
-            if original_path and new_name:
-                try:
-                    directory = os.path.dirname(original_path)
-                    new_full_path = os.path.join(directory, new_name)
-                    if os.path.exists(new_full_path):
-                        QMessageBox.warning(self, "File Exists", f"Skipping: {new_name} already exists.")
-                        continue
-                    os.rename(original_path, new_full_path)
-                    print(f"✅ Renamed: {original_path} → {new_full_path}")
-                except Exception as e:
-                    print(f"❌ Error renaming {original_path}: {e}")
+        model = self.file_model
+        rows = {}
+        pairs = []
+        for row, (original_path, new_name) in enumerate(zip(model.paths, model.previews)):
+            if original_path and new_name and new_name != os.path.basename(original_path):
+                rows[os.path.abspath(original_path)] = row
+                pairs.append((original_path, os.path.join(os.path.dirname(original_path), new_name)))
+        conflicts = []
+        history_batch = self.history.batch("GUI rename")
+
+        def plan_and_execute():
+            # Runs on the worker thread: plan the whole map, then move files in parallel
+            yield from execute(plan_renames(pairs), history=history_batch)
+
+        def on_batch(batch):
+            for result, _ in batch:
+                if result.status == "renamed":
+                    model.update_row(rows[result.source], path=result.target)
+                    self.index.mark_processed(result.source, {"new_name": os.path.basename(result.target)})
+                    print(f"✅ Renamed: {result.source} → {result.target}")
+                elif result.status in ("conflict", "error"):
+                    conflicts.append(f"{os.path.basename(result.source)}: {result.error}")
+
+        def on_finished(cancelled):
+            history_batch.close()
+            self.index.commit()
+            if conflicts:
+                QMessageBox.warning(self, "Some Files Skipped", f"Skipped {len(conflicts)} file(s):\n"
+                                    + "\n".join(conflicts[:20]))
+
+        self.start_job(BatchJob(plan_and_execute(), lambda result: result), on_batch, "Renaming", on_finished)
+
+    def undo_last_rename(self):
+        """Undo the most recent rename batch and point the affected rows back at the original files."""
+        batch_id = self.history.last_batch_id()
+        if batch_id is None:
+            QMessageBox.information(self, "Undo", "Nothing to undo.")
+            return
+        entries = self.history.entries(batch_id)
+        undone, conflicts = self.history.undo_batch(batch_id)
+
+        rows = {path: row for row, path in enumerate(self.file_model.paths)}
+        conflicted = {new for _, new, _ in conflicts}
+        for _, old, new in entries:
+            if new in rows and new not in conflicted:
+                self.file_model.update_row(rows[new], path=old)
+
+        message = f"Restored {undone} file(s)."
+        if conflicts:
+            message += f"\n{len(conflicts)} file(s) could not be restored:\n" + "\n".join(
+                f"{os.path.basename(new)}: {reason}" for _, new, reason in conflicts[:20])
+        QMessageBox.information(self, "Undo", message)
 
     def add_files(self):
         """Allow users to add files."""
-        files, _ = QFileDialog.getOpenFileNames(self, "Select Video Files", DEFAULT_DIRECTORY, "Video Files (*.mkv *.mp4 *.avi)")
-        for file in files:
-            self.add_to_list(file)
+        video_filter = "Video Files (" + " ".join("*" + ext for ext in VIDEO_EXTENSIONS) + ")"
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Video Files", DEFAULT_DIRECTORY, video_filter)
+        if files:
+            self.preview_in_background(files)
 
     def add_folder(self):
         """Allow users to add a folder."""
         folder = QFileDialog.getExistingDirectory(self, "Select Folder", DEFAULT_DIRECTORY)
         if folder:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.endswith(('.mkv', '.mp4', '.avi')):
-                        self.add_to_list(os.path.join(root, file))
+            if self.incremental_check.isChecked():
+                self.preview_in_background(self.index.scan(folder, VIDEO_EXTENSIONS))
+            else:
+                self.preview_in_background(iter_video_files(folder, VIDEO_EXTENSIONS))
+
+    def preview_in_background(self, paths):
+        """Walk/preview paths on a worker thread and add rows to the lists in batches."""
+        # Create the lookup services here on the GUI thread; the workers only use them
+        self.refresh_config()
+        resolver, _ = self.resolver, self.naming
+        if self.file_model.thumbnails is None and self.artwork is not None:
+            self.file_model.set_thumbnails(ThumbnailLoader(self.artwork, self))
+
+        def prefetch(chunk):
+            # One lookup per (show, season) / movie, then fill previews from the cache.
+            # Only a speed-up: if it fails, each file is still looked up on its own.
+            try:
+                resolver.prefetch(parse_many(chunk))
+            except Exception as e:
+                print(f"Error prefetching lookups: {e}")
+
+        job = BatchJob(paths, self.get_preview_filename, executor=self.fetcher.executor, before_chunk=prefetch)
+        self.start_job(job, self.add_batch, "Previewing")
 
-    def add_to_list(self, file_path):
-        """Adds files to the UI lists."""
-        original_item = QListWidgetItem(file_path)
-        self.file_list_original.addItem(original_item)
+    def add_batch(self, batch):
+        """Append a batch of (file_path, (preview_filename, color)) rows to the model."""
+        self.file_model.append_rows([(file_path, name, color) for file_path, (name, color) in batch])
+        for file_path, (name, color) in batch:
+            if color == "green" and name == os.path.basename(file_path):
+                # Already correctly named: nothing left to do for this file
+                self.index.mark_processed(file_path, {"new_name": name})
 
-        preview_filename, color = self.get_preview_filename(file_path)
-        preview_item = QListWidgetItem(preview_filename)
-        preview_item.setForeground(QColor(color))
-        self.file_list_preview.addItem(preview_item)
+    def add_to_list(self, file_path, preview=None):
+        """Adds a single file to the table."""
+        preview_filename, color = preview or self.get_preview_filename(file_path)
+        self.file_model.append_rows([(file_path, preview_filename, color)])
 
     def clear_list(self):
         """Clear all files from the UI."""
-        self.file_list_original.clear()
-        self.file_list_preview.clear()
-
-    def parse_filename(self, filename):
-        """Parse a filename to extract TV show or movie metadata."""
-        name, ext = os.path.splitext(filename)
-        name = re.sub(r'[._]', ' ', name)  # Replace dots and underscores with spaces
-
-        # TV show patterns
-        tv_patterns = [
-            (r"(.+?)[ ]S(\d{1,2})E(\d{1,2})", "SxxEyy"),  # e.g., "Show S01E02"
-            (r"(.+?)[ ](\d{1,2})x(\d{1,2})", "xxyy"),     # e.g., "Show 1x02"
-            (r"(.+?)[ ](\d{2,3})\D", "num")               # e.g., "Show 102"
-        ]
-        for pattern, pat_type in tv_patterns:
-            match = re.search(pattern, name, re.IGNORECASE)
-            if match:
-                show_name = match.group(1).strip()
-                if pat_type in ["SxxEyy", "xxyy"]:
-                    season = int(match.group(2))
-                    episode = int(match.group(3))
-                elif pat_type == "num":
-                    num_str = match.group(2)
-                    if len(num_str) == 2:
-                        season = 1
-                        episode = int(num_str)
-                    elif len(num_str) == 3:
-                        season = int(num_str[0])
-                        episode = int(num_str[1:])
-                return {"type": "tv", "show": show_name, "season": season, "episode": episode, "ext": ext}
-
-        # Movie patterns
-        movie_patterns = [
-            r"(.+?)\((\d{4})\)",      # e.g., "Movie (2020)"
-            r"(.+?)[ ](\d{4})[ ]"     # e.g., "Movie 2020 "
-        ]
-        for pattern in movie_patterns:
-            match = re.search(pattern, name, re.IGNORECASE)
-            if match:
-                title = match.group(1).strip()
-                year = int(match.group(2))
-                return {"type": "movie", "title": title, "year": year, "ext": ext}
-
-        # Unknown format
-        return {"type": "unknown", "filename": filename}
+        self.file_model.clear()
 
     def get_preview_filename(self, file_path):
-        """Generate a preview filename using OMDB API data."""
+        """
+        Generate a preview filename using OMDB API data. A file whose lookup or naming
+        fails is marked red instead of stopping the rest of the preview.
+        """
+        try:
+            return self._preview_filename(file_path)
+        except Exception as e:
+            STATS.incr("preview.error")
+            print(f"Error previewing {os.path.basename(file_path)}: {e}")
+            return os.path.basename(file_path), "red"
+
+    def _preview_filename(self, file_path):
         filename = os.path.basename(file_path)
-        parsed = self.parse_filename(filename)
-
-        if parsed["type"] == "tv":
-            show = parsed["show"]
-            season = parsed["season"]
-            episode = parsed["episode"]
-            ext = parsed["ext"]
-            params = {"t": show, "Season": season, "Episode": episode, "apikey": self.api_key}
-            try:
-                response = requests.get("http://www.omdbapi.com/", params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("Response") == "True":
-                        episode_title = data.get("Title", "Unknown")
-                        new_filename = f"{show} - S{season:02d}E{episode:02d} - {episode_title}{ext}"
-                        return new_filename, "green"
-                    else:
-                        return filename, "red"
-                else:
-                    return filename, "red"
-            except Exception as e:
-                print(f"Error querying OMDB API: {e}")
-                return filename, "red"
-
-        elif parsed["type"] == "movie":
-            title = parsed["title"]
-            year = parsed["year"]
-            ext = parsed["ext"]
-            params = {"t": title, "y": year, "apikey": self.api_key}
-            try:
-                response = requests.get("http://www.omdbapi.com/", params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("Response") == "True":
-                        official_title = data.get("Title", title)
-                        official_year = data.get("Year", year)
-                        new_filename = f"{official_title} ({official_year}){ext}"
-                        return new_filename, "green"
-                    else:
-                        return filename, "red"
-                else:
-                    return filename, "red"
-            except Exception as e:
-                print(f"Error querying OMDB API: {e}")
-                return filename, "red"
+        stem, ext = os.path.splitext(filename)
+        with STATS.timer("parse"):
+            title, year, season, episode, _ = parse_path(filename)
+
+        if season:
+            with STATS.timer("lookup"):
+                episode_title = self.resolver.episode_title(title, int(season), int(episode))
+            if episode_title:
+                return self.naming.format(title, None, season, episode, episode_title, ext, stem), "green"
+            return filename, "red"
+
+        elif title and year:
+            with STATS.timer("lookup"):
+                data = self.resolver.movie(title, year)
+            if data:
+                official_title = data.get("Title", title)
+                official_year = data.get("Year", year)
+                return self.naming.format(official_title, official_year, ext=ext, original=stem), "green"
+            return filename, "red"
 
         else:
-            return parsed["filename"], "orange"
+            return filename, "orange"
 
 # Main Execution
 if __name__ == "__main__":
@@ -1,14 +1,26 @@
 import sys
-import os
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QListWidget, QLabel, QMessageBox
-from renamer import rename_file
+from functools import cached_property
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QTableView, QHeaderView, QLabel, QMessageBox
+from PyQt5.QtCore import QThreadPool
+from db import RenameHistory
+from file_model import FileTableModel, COLUMN_PREVIEW
+from renamer import rename_files
+from scanner import iter_video_files
+from workers import BatchJob
 
 class FileRenamerGUI(QWidget):
     def __init__(self):
         super().__init__()
 
+        self.thread_pool = QThreadPool.globalInstance()
+        self.jobs = set()
         self.initUI()
 
+    @cached_property
+    def history(self):
+        """Rename history, opened on the first rename or undo rather than at startup."""
+        return RenameHistory()
+
     def initUI(self):
         self.setWindowTitle("FileNom - TV Show & Movie Renamer")
         self.setGeometry(100, 100, 600, 400)
@@ -18,8 +30,14 @@ class FileRenamerGUI(QWidget):
         self.label = QLabel("Select files to rename:")
         layout.addWidget(self.label)
 
-        self.file_list = QListWidget()
-        layout.addWidget(self.file_list)
+        self.file_model = FileTableModel(self)
+        self.file_view = QTableView()
+        self.file_view.setModel(self.file_model)
+        self.file_view.setColumnHidden(COLUMN_PREVIEW, True)
+        self.file_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.file_view.verticalHeader().hide()
+        self.file_view.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.file_view)
 
         self.add_files_btn = QPushButton("Add Files")
         self.add_files_btn.clicked.connect(self.add_files)
@@ -33,45 +51,93 @@ class FileRenamerGUI(QWidget):
         self.rename_btn.clicked.connect(self.rename_files)
         layout.addWidget(self.rename_btn)
 
+        self.undo_btn = QPushButton("Undo Last Rename")
+        self.undo_btn.clicked.connect(self.undo_last_rename)
+        layout.addWidget(self.undo_btn)
+
         self.clear_btn = QPushButton("Clear List")
         self.clear_btn.clicked.connect(self.clear_list)
         layout.addWidget(self.clear_btn)
 
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_job)
+        layout.addWidget(self.cancel_btn)
+
         self.setLayout(layout)
 
     def add_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Files", "", "Video Files (*.mp4 *.mkv *.avi *.mov)")
         if files:
-            for file in files:
-                self.file_list.addItem(file)
+            self.add_paths(files)
 
     def add_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
         if folder:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith(('.mp4', '.mkv', '.avi', '.mov')):
-                        self.file_list.addItem(os.path.join(root, file))
+            # Walk on a worker thread; paths arrive in batches
+            job = BatchJob(iter_video_files(folder), lambda path: path)
+            self.start_job(job, lambda batch: self.add_paths([path for path, _ in batch]), "Scanning")
+
+    def add_paths(self, paths):
+        self.file_model.append_rows([(path, "", None) for path in paths])
 
     def rename_files(self):
-        if self.file_list.count() == 0:
+        if self.file_model.rowCount() == 0:
             QMessageBox.warning(self, "No Files", "No files selected for renaming.")
             return
 
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            if item is not None:
-                file_path = item.text()
-                success = rename_file(file_path)
-                if success:
-                    print(f"✅ Renamed: {file_path} → {success}")
-                else:
-                    print(f"❌ Skipping renaming for: {file_path}")
+        file_paths = list(self.file_model.paths)
+        history_batch = self.history.batch("GUI rename")
 
-        QMessageBox.information(self, "Renaming Complete", "All selected files have been processed.")
+        def on_batch(batch):
+            for result, _ in batch:
+                if result.status == "renamed":
+                    print(f"✅ Renamed: {result.source} → {result.target}")
+                else:
+                    print(f"❌ Skipping renaming for: {result.source} ({result.error or result.status})")
+
+        def on_finished(cancelled):
+            history_batch.close()
+            if cancelled:
+                QMessageBox.information(self, "Renaming Cancelled", "Renaming was cancelled.")
+            else:
+                QMessageBox.information(self, "Renaming Complete", "All selected files have been processed.")
+
+        # Plan every rename up front, then run the moves in parallel (all off the UI thread)
+        results = rename_files(file_paths, history=history_batch)
+        self.start_job(BatchJob(results, lambda result: result), on_batch, "Renaming", on_finished)
+
+    def undo_last_rename(self):
+        undone, conflicts = self.history.undo_batch()
+        message = f"Restored {undone} file(s)."
+        if conflicts:
+            message += f"\n{len(conflicts)} file(s) could not be restored."
+        QMessageBox.information(self, "Undo", message)
+
+    def start_job(self, job, on_batch, label, on_finished=None):
+        """Run a BatchJob on the thread pool so the window stays responsive."""
+        job.signals.batch.connect(on_batch)
+        job.signals.progress.connect(lambda done: self.label.setText(f"{label}… {done} files"))
+        job.signals.error.connect(lambda message: print(f"❌ {label} failed: {message}"))
+
+        def finished(cancelled):
+            self.jobs.discard(job)
+            self.cancel_btn.setEnabled(bool(self.jobs))
+            self.label.setText("Select files to rename:")
+            if on_finished is not None:
+                on_finished(cancelled)
+
+        job.signals.finished.connect(finished)
+        self.jobs.add(job)
+        self.cancel_btn.setEnabled(True)
+        self.thread_pool.start(job)
+
+    def cancel_job(self):
+        for job in list(self.jobs):
+            job.cancel()
 
     def clear_list(self):
-        self.file_list.clear()
+        self.file_model.clear()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
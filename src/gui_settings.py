@@ -21,8 +21,8 @@ class APISettingsTab(QWidget):
 
         # Load saved API keys
         config = load_config()
-        self.tmdb_input.setText(config.get("tmdb_api_key", ""))
-        self.simkl_input.setText(config.get("simkl_api_key", ""))
+        self.tmdb_input.setText(config.tmdb_api_key)
+        self.simkl_input.setText(config.simkl_api_key)
 
         # Buttons
         self.save_button = QPushButton("Save API Keys")
@@ -0,0 +1,192 @@
+# Content-hash identification
+import os
+import sys
+import mmap
+import sqlite3
+import threading
+from array import array
+
+from cache import make_key
+from filename_parser import ParsedName
+from library_index import INDEX_DB_PATH
+
+HASH_CHUNK = 64 * 1024      # Bytes read from each end of the file
+HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def opensubtitles_hash(path):
+    """
+    OpenSubtitles-style hash: file size plus the 64-bit little-endian word sums of the
+    first and last 64 KB, as 16 hex digits. Only those 128 KB are read (through mmap).
+    Returns None for empty files.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            total = size
+            for start in (0, max(0, size - HASH_CHUNK)):
+                chunk = mm[start:start + HASH_CHUNK]
+                words = array("Q", chunk[:len(chunk) - len(chunk) % 8])
+                if sys.byteorder != "little":
+                    words.byteswap()
+                total += sum(words)
+    return "%016x" % (total & HASH_MASK)
+
+
+def _hash_file(path):
+    """Process-pool worker: returns (path, hash) or (path, None) if the file can't be read."""
+    try:
+        return path, opensubtitles_hash(path)
+    except OSError:
+        return path, None
+
+
+class HashIndex:
+    """
+    Persistent file-hash index keyed by (inode, size, mtime), stored next to the library
+    index. A file that keeps its identity (including across renames) is never re-read.
+    """
+
+    def __init__(self, path=INDEX_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (inode, size, mtime_ns)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, st):
+        """Return the stored hash for an os.stat() result, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM file_hashes WHERE inode = ? AND size = ? AND mtime_ns = ?",
+                (st.st_ino, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, rows):
+        """Store [(stat_result, hash), ...] in one transaction."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_hashes (inode, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                [(st.st_ino, st.st_size, st.st_mtime_ns, file_hash) for st, file_hash in rows],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class HashProvider:
+    """Looks up a (hash, size) pair. Subclasses return a ParsedName or None."""
+
+    name = "none"
+
+    def lookup(self, file_hash, size):
+        return None
+
+
+class OpenSubtitlesHashProvider(HashProvider):
+    """Identify files through the OpenSubtitles REST API's moviehash search."""
+
+    name = "opensubtitles"
+
+    def __init__(self, fetcher, api_key, cache=None, user_agent="FileNom v1.0"):
+        self.fetcher = fetcher
+        self.api_key = api_key
+        self.cache = cache
+        self.headers = {"Api-Key": api_key, "User-Agent": user_agent}
+
+    def lookup(self, file_hash, size):
+        key = make_key(self.name, file_hash)
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            data = self.fetcher.get_json(self.name, "/subtitles", params={"moviehash": file_hash},
+                                         headers=self.headers)
+            if data is None:
+                return None
+            if self.cache is not None:
+                self.cache.put(key, data, negative=not data.get("data"))
+
+        for item in data.get("data", []):
+            attributes = item.get("attributes", {})
+            # Hash hits are only trustworthy when the uploader's file matched exactly
+            if not attributes.get("moviehash_match"):
+                continue
+            details = attributes.get("feature_details") or {}
+            year = details.get("year") or None
+            if details.get("feature_type") == "Episode" and details.get("season_number") is not None:
+                return ParsedName(
+                    details.get("parent_title") or details.get("title"), year,
+                    str(details["season_number"]), str(details.get("episode_number") or 0),
+                    details.get("title") if details.get("parent_title") else None,
+                )
+            if details.get("title"):
+                return ParsedName(details["title"], year, None, None, None)
+        return None
+
+
+class HashIdentifier:
+    """
+    Identifies files by content hash. Hashes come from the HashIndex when the file's
+    (inode, size, mtime) is known; otherwise they are computed on a process pool so
+    large files on slow disks are read in parallel and only once.
+    """
+
+    def __init__(self, provider, index=None, jobs=4):
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+
+        self.provider = provider
+        self.index = index if index is not None else HashIndex()
+        self.pool = ProcessPoolExecutor(max_workers=max(1, jobs))
+
+    def hash_many(self, paths):
+        """Return {path: (hash, size)} for every readable path, hashing only unindexed files."""
+        results = {}
+        missing = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            file_hash = self.index.get(st)
+            if file_hash is not None:
+                results[path] = (file_hash, st.st_size)
+            else:
+                missing[path] = st
+
+        computed = []
+        for path, file_hash in self.pool.map(_hash_file, missing, chunksize=8):
+            if file_hash is not None:
+                results[path] = (file_hash, missing[path].st_size)
+                computed.append((missing[path], file_hash))
+        if computed:
+            self.index.put_many(computed)
+        return results
+
+    def file_hash(self, path):
+        """Return (hash, size) for one file, or None."""
+        return self.hash_many([path]).get(path)
+
+    def identify(self, path):
+        """Return a ParsedName for the file's content, or None if the provider doesn't know it."""
+        hashed = self.file_hash(path)
+        if hashed is None:
+            return None
+        return self.provider.lookup(*hashed)
+
+    def close(self):
+        self.pool.shutdown()
+        self.index.close()
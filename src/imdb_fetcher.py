@@ -1 +1,213 @@
-# IMDB/TMDb integration 
+# IMDB/TMDb integration
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from stats import STATS
+
+# requests (with urllib3, certifi, ...) takes ~100 ms to import, so it is imported on
+# first use inside the methods below rather than when this module loads.
+
+OMDB_API_BASE = "http://www.omdbapi.com"
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p"
+SIMKL_API_BASE = "https://api.simkl.com"
+OPENSUBTITLES_API_BASE = "https://api.opensubtitles.com/api/v1"
+
+# Per-provider defaults: base URL and token-bucket rate (requests/second) and burst size
+DEFAULT_PROVIDERS = {
+    "omdb": {"base_url": OMDB_API_BASE, "rate": 10.0, "burst": 10},
+    "tmdb": {"base_url": TMDB_API_BASE, "rate": 40.0, "burst": 40},
+    "tmdb_images": {"base_url": TMDB_IMAGE_BASE, "rate": 20.0, "burst": 20},
+    "simkl": {"base_url": SIMKL_API_BASE, "rate": 5.0, "burst": 5},
+    "opensubtitles": {"base_url": OPENSUBTITLES_API_BASE, "rate": 5.0, "burst": 5},
+}
+
+DEFAULT_CONCURRENCY = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 30.0   # Longest wait between retries; a longer Retry-After ends the retries
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_after_seconds(value, now=None):
+    """
+    Seconds to wait from a Retry-After header: delay-seconds or an HTTP date.
+    Returns None when the header is missing or can't be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None or when.tzinfo is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class MetadataFetcher:
+    """
+    Pooled, rate-limited HTTP client for the metadata providers.
+    One keep-alive session per provider, a bounded worker pool for concurrent lookups,
+    and retry with exponential backoff on 429/5xx and connection errors.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, providers=None, max_retries=3,
+                 backoff=0.5, timeout=10, max_backoff=MAX_BACKOFF):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.providers = {name: dict(settings) for name, settings in DEFAULT_PROVIDERS.items()}
+        for name, overrides in (providers or {}).items():
+            self.providers.setdefault(name, {"rate": 10.0, "burst": 10}).update(overrides)
+        self.buckets = {
+            name: TokenBucket(settings["rate"], settings.get("burst", settings["rate"]))
+            for name, settings in self.providers.items()
+        }
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetcher")
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a fetcher from config.json settings (fetch_concurrency, provider overrides)."""
+        return cls(
+            concurrency=config.get("fetch_concurrency", DEFAULT_CONCURRENCY),
+            providers=config.get("providers"),
+        )
+
+    def session(self, provider):
+        """Return the shared keep-alive session for a provider."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self.sessions_lock:
+            session = self.sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[provider] = session
+            return session
+
+    def get(self, provider, path="", params=None, headers=None):
+        """GET a provider endpoint with rate limiting and retries. Returns the final response."""
+        return self.request("GET", provider, path, params=params, headers=headers)
+
+    def request(self, method, provider, path="", params=None, headers=None, json=None):
+        """
+        Send a request to a provider endpoint (or an absolute URL it handed out, such as a
+        download link) with rate limiting and retries. Returns the final response.
+        """
+        import requests
+
+        if "://" in path:
+            url = path
+        else:
+            url = self.providers[provider]["base_url"].rstrip("/") + "/" + path.lstrip("/")
+        session = self.session(provider)
+        bucket = self.buckets[provider]
+        attempt = 0
+        while True:
+            bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, params=params, headers=headers, json=json,
+                                           timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                STATS.observe(f"http.{provider}", time.perf_counter() - start)
+                STATS.incr(f"http.{provider}.error")
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                STATS.observe(f"http.{provider}", time.perf_counter() - start)
+                STATS.incr(f"http.{provider}.status.{response.status_code}")
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    if retry_after > self.max_backoff:
+                        # Waiting that long would stall a worker: report the failure instead
+                        STATS.incr(f"http.{provider}.retry_after_too_long")
+                        return response
+                    STATS.incr(f"http.{provider}.retry")
+                    time.sleep(retry_after)
+                    attempt += 1
+                    continue
+            STATS.incr(f"http.{provider}.retry")
+            time.sleep(min(self.backoff * (2 ** attempt), self.max_backoff))
+            attempt += 1
+
+    def get_json(self, provider, path="", params=None, headers=None, method="GET", json=None):
+        """GET (or POST etc.) and decode JSON. Returns None on a non-200 response or network failure."""
+        import requests
+
+        try:
+            response = self.request(method, provider, path, params=params, headers=headers, json=json)
+        except requests.RequestException as e:
+            print(f"⚠️ {provider} request failed: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn on the fetcher's worker pool and return a Future."""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, iterable):
+        """Apply fn to every item on the worker pool, yielding results in input order."""
+        return self.executor.map(fn, iterable)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        with self.sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher(config=None):
+    """Return the process-wide shared fetcher, creating it on first use."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = MetadataFetcher.from_config(config or {})
+        return _default_fetcher
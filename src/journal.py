@@ -0,0 +1,271 @@
+# Resumable job journal
+import os
+import glob
+import json
+import time
+import sqlite3
+import threading
+
+from planner import TEMP_SUFFIX
+
+JOURNAL_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+
+CHECKPOINT_EVERY = 500     # Buffered file updates written per checkpoint
+CHECKPOINT_SECONDS = 5.0   # ...or at least this often while a run is making progress
+
+# Per-file stages. PARSED files (lookup failed or unresolved) and RESOLVED files
+# (new name known, not yet renamed) are picked up again by a resume; RENAMING
+# files were mid-rename when the run stopped and are reconciled against the disk.
+DISCOVERED = "discovered"
+PARSED = "parsed"
+RESOLVED = "resolved"
+RENAMING = "renaming"
+DONE = "done"
+
+# Record status -> stage once a file has been through parse/lookup or rename
+STAGE_FOR_STATUS = {
+    "pending": RESOLVED,
+    "unresolved": PARSED,
+    "error": PARSED,
+    "unparsed": DONE,
+    "unchanged": DONE,
+    "renamed": DONE,
+    "conflict": DONE,
+}
+
+
+class JobJournal:
+    """
+    Job journal stored in SQLite (WAL mode, synchronous=FULL). Each batch run is a job;
+    every file in it has a row recording how far it got, so an interrupted run can be
+    resumed instead of walked, resolved and renamed again from scratch.
+    """
+
+    def __init__(self, path=None):
+        self.path = path = path or JOURNAL_DB_PATH
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                label TEXT,
+                options TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_files (
+                job_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                new_path TEXT,
+                status TEXT,
+                error TEXT,
+                inode INTEGER,
+                size INTEGER,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_files_new ON job_files (job_id, new_path);
+            CREATE INDEX IF NOT EXISTS idx_job_files_stage ON job_files (job_id, stage);
+        """)
+        self._conn.commit()
+
+    def start(self, label, options):
+        """Create a job. options is a JSON-serializable dict of what the run needs to resume."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (label, options, created_at) VALUES (?, ?, ?)",
+                (label, json.dumps(options), time.time()),
+            )
+            self._conn.commit()
+        return Job(self, cursor.lastrowid, label, options)
+
+    def unfinished(self, job_id=None):
+        """Return an unfinished job (default: the most recent one), or None."""
+        query = "SELECT id, label, options FROM jobs WHERE finished_at IS NULL"
+        with self._lock:
+            if job_id is None:
+                row = self._conn.execute(query + " ORDER BY id DESC LIMIT 1").fetchone()
+            else:
+                row = self._conn.execute(query + " AND id = ?", (job_id,)).fetchone()
+        return Job(self, row[0], row[1], json.loads(row[2])) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Job:
+    """
+    One journaled run. File updates are buffered and written in batched checkpoints;
+    begin_renames() checkpoints before any file is moved, so a crash mid-rename leaves
+    RENAMING rows that recover() can check against the disk.
+    """
+
+    def __init__(self, journal, job_id, label, options):
+        self.journal = journal
+        self.id = job_id
+        self.label = label
+        self.options = options
+        self._pending = {}   # path -> row awaiting the next checkpoint
+        self._last_checkpoint = time.monotonic()
+
+    def update(self, path, stage, new_path=None, status=None, error=None):
+        """Buffer a file's stage; written at the next checkpoint."""
+        path = os.path.abspath(path)
+        with self.journal._lock:
+            self._pending[path] = (stage, new_path and os.path.abspath(new_path), status, error, None, None)
+            if (len(self._pending) >= CHECKPOINT_EVERY
+                    or time.monotonic() - self._last_checkpoint >= CHECKPOINT_SECONDS):
+                self.checkpoint()
+
+    def record(self, record):
+        """Buffer a main.process_file()/rename_chunk() record under the stage its status implies."""
+        stage = STAGE_FOR_STATUS.get(record["status"], PARSED)
+        self.update(record["path"], stage, record.get("new_path"), record["status"], record.get("error"))
+
+    def begin_renames(self, pairs):
+        """
+        Mark (source, target) pairs as RENAMING, with each source's inode and size, and
+        checkpoint. Call this before moving any of them.
+        """
+        with self.journal._lock:
+            for source, target in pairs:
+                source = os.path.abspath(source)
+                try:
+                    st = os.stat(source)
+                except OSError:
+                    continue
+                self._pending[source] = (RENAMING, os.path.abspath(target), "pending", None, st.st_ino, st.st_size)
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Write buffered updates in one transaction."""
+        with self.journal._lock:
+            rows, self._pending = self._pending, {}
+            self._last_checkpoint = time.monotonic()
+            if not rows:
+                return
+            now = time.time()
+            self.journal._conn.executemany(
+                "INSERT OR REPLACE INTO job_files "
+                "(job_id, path, stage, new_path, status, error, inode, size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self.id, path) + row + (now,) for path, row in rows.items()],
+            )
+            self.journal._conn.commit()
+
+    def state(self, path):
+        """
+        Return (stage, new_path) for a file, or None if this job hasn't seen it. A file
+        this job already renamed is reported as DONE under its new name too.
+        """
+        path = os.path.abspath(path)
+        with self.journal._lock:
+            row = self._pending.get(path)
+            if row is not None:
+                return row[0], row[1]
+            row = self.journal._conn.execute(
+                "SELECT stage, new_path FROM job_files WHERE job_id = ? AND path = ?", (self.id, path)
+            ).fetchone()
+            if row is None and self.journal._conn.execute(
+                "SELECT 1 FROM job_files WHERE job_id = ? AND new_path = ? AND status = 'renamed'",
+                (self.id, path),
+            ).fetchone():
+                return DONE, path
+        return tuple(row) if row else None
+
+    def recover(self):
+        """
+        Reconcile files left RENAMING by an interrupted run. A file is found by the inode
+        and size recorded before the move: at its target it counts as renamed; at its
+        source, or at a planner temp name (which is moved back), it goes back to RESOLVED
+        so the rename is planned again. Files found nowhere are marked as errors.
+        A move that stopped half way is finished: a second hard link left at the old
+        name (link, then unlink) or a cross-filesystem copy already complete at the
+        target has its old name removed.
+        Returns: [(source, target), ...] renames that completed before the interruption.
+        """
+        with self.journal._lock:
+            self.checkpoint()
+            rows = self.journal._conn.execute(
+                "SELECT path, new_path, inode, size FROM job_files WHERE job_id = ? AND stage = ?",
+                (self.id, RENAMING),
+            ).fetchall()
+        renamed = []
+        for source, target, inode, size in rows:
+            partial = target + TEMP_SUFFIX
+            if os.path.exists(partial):
+                # Cross-filesystem copy that never finished; the source is still intact
+                os.unlink(partial)
+            original = _find_original(source, inode, size)
+            if original is not None and (_second_link(original, target) or _is_copy(original, target)):
+                os.unlink(original)
+                original = None
+            if original is None and _is_file(target, None, size):
+                renamed.append((source, target))
+                self.update(source, DONE, target, "renamed")
+            elif original is not None:
+                if original != source:
+                    os.rename(original, source)
+                self.update(source, RESOLVED, target, "pending")
+            else:
+                self.update(source, DONE, target, "error", "file missing after interrupted rename")
+        self.checkpoint()
+        return renamed
+
+    def finish(self):
+        with self.journal._lock:
+            self.checkpoint()
+            self.journal._conn.execute("UPDATE jobs SET finished_at = ? WHERE id = ?", (time.time(), self.id))
+            self.journal._conn.commit()
+
+
+def _is_file(path, inode, size):
+    """True if path exists with this size (and inode, when given)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and (inode is None or st.st_ino == inode)
+
+
+def _find_original(source, inode, size):
+    """
+    The name the file being renamed still has: its source, or a temp name the planner
+    staged it under. None if it's at neither.
+    """
+    if _is_file(source, inode, size):
+        return source
+    if os.path.lexists(source):
+        return None
+    for temp in glob.glob(glob.escape(source) + ".*" + TEMP_SUFFIX):
+        if _is_file(temp, inode, size):
+            return temp
+    return None
+
+
+def _second_link(original, target):
+    """
+    True if original and target are two hard links to one file (the planner links the
+    file to its target, then unlinks the old name). A case-only rename on a
+    case-insensitive filesystem is the same file too, but with a single link.
+    """
+    try:
+        return os.path.samefile(original, target) and os.stat(original).st_nlink > 1
+    except OSError:
+        return False
+
+
+def _is_copy(original, target):
+    """
+    True if target is a complete copy of original. The planner's cross-filesystem move
+    copies the mtime and only puts the copy at the target once it is whole.
+    """
+    try:
+        src, dst = os.stat(original), os.stat(target)
+    except OSError:
+        return False
+    return (src.st_size, src.st_mtime_ns) == (dst.st_size, dst.st_mtime_ns)
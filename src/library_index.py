@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from scanner import VIDEO_EXTENSIONS
+
+INDEX_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_index.db")
+
+COMMIT_EVERY = 500   # Directories scanned between commits
+
+
+class LibraryIndex:
+    """
+    Persistent index of scanned files (path, size, mtime, inode, last resolved metadata).
+
+    scan() stats every directory but only lists directories whose mtime changed since the
+    last run; unchanged directories are descended through their stored subdirectory list.
+    A file is yielded while it is new, modified, or not yet marked processed. Files keep
+    their metadata across a rename (same inode, size and mtime), so FileNom's own renames
+    are not re-resolved. Files edited in place inside an unchanged directory are not
+    noticed, since their names are all that matter for renaming.
+    """
+
+    def __init__(self, path=INDEX_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                metadata TEXT,
+                processed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_dir ON files (dir);
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                subdirs TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+        self.stats = {}
+
+    def scan(self, root, extensions=VIDEO_EXTENSIONS):
+        """Yield paths under root that are new, changed, or still unprocessed."""
+        self.stats = {"dirs_listed": 0, "dirs_skipped": 0, "files_unchanged": 0, "files_pending": 0}
+        stack = [os.path.abspath(root)]
+        scanned = 0
+        while stack:
+            directory = stack.pop()
+            try:
+                dir_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._forget_dir(directory)
+                continue
+
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT mtime_ns, subdirs FROM dirs WHERE path = ?", (directory,)
+                ).fetchone()
+
+            if row is not None and row[0] == dir_mtime:
+                # Entries unchanged: reuse the stored subdirectory list, only revisit pending files
+                self.stats["dirs_skipped"] += 1
+                stack.extend(reversed(json.loads(row[1])))
+                with self._lock:
+                    pending = [r[0] for r in self._conn.execute(
+                        "SELECT path FROM files WHERE dir = ? AND metadata IS NULL", (directory,)
+                    )]
+                self.stats["files_pending"] += len(pending)
+                yield from pending
+            else:
+                self.stats["dirs_listed"] += 1
+                subdirs, pending = self._rescan_dir(directory, dir_mtime, extensions)
+                stack.extend(reversed(subdirs))
+                self.stats["files_pending"] += len(pending)
+                yield from pending
+
+            scanned += 1
+            if scanned % COMMIT_EVERY == 0:
+                self.commit()
+        self.commit()
+
+    def _rescan_dir(self, directory, dir_mtime, extensions):
+        """List a changed directory, reconcile its rows and return (subdirs, pending_paths)."""
+        subdirs = []
+        current = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(extensions) and entry.is_file():
+                            st = entry.stat()
+                            current[entry.path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+
+        with self._lock:
+            old_rows = {
+                r[0]: r[1:] for r in self._conn.execute(
+                    "SELECT path, size, mtime_ns, inode, metadata FROM files WHERE dir = ?", (directory,)
+                )
+            }
+            by_identity = {(size, mtime, inode): metadata for size, mtime, inode, metadata in old_rows.values()}
+
+            pending = []
+            upserts = []
+            for path, identity in current.items():
+                old = old_rows.get(path)
+                if old is not None and tuple(old[:3]) == identity:
+                    metadata = old[3]
+                else:
+                    # A renamed file keeps its inode, size and mtime: carry its metadata over
+                    metadata = by_identity.get(identity)
+                    upserts.append((path, directory, identity[0], identity[1], identity[2], metadata))
+                if metadata is None:
+                    pending.append(path)
+                else:
+                    self.stats["files_unchanged"] += 1
+
+            gone = [(path,) for path in old_rows if path not in current]
+            self._conn.executemany("DELETE FROM files WHERE path = ?", gone)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, dir, size, mtime_ns, inode, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                upserts,
+            )
+            old_subdirs = self._conn.execute("SELECT subdirs FROM dirs WHERE path = ?", (directory,)).fetchone()
+            for removed in set(json.loads(old_subdirs[0]) if old_subdirs else []) - set(subdirs):
+                self._forget_dir(removed)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, subdirs) VALUES (?, ?, ?)",
+                (directory, dir_mtime, json.dumps(subdirs)),
+            )
+        return subdirs, sorted(pending)
+
+    def _forget_dir(self, directory):
+        """Drop a vanished directory and everything indexed beneath it."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self._lock:
+            self._conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                               (directory, len(prefix), prefix))
+            self._conn.execute("DELETE FROM files WHERE dir = ? OR substr(dir, 1, ?) = ?",
+                               (directory, len(prefix), prefix))
+
+    def mark_processed(self, path, metadata):
+        """Store the resolved metadata for a file so later scans skip it."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET metadata = ?, processed_at = ? WHERE path = ?",
+                (json.dumps(metadata), time.time(), os.path.abspath(path)),
+            )
+
+    def get_metadata(self, path):
+        """Return the last resolved metadata for a file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM files WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -1 +1,541 @@
-# Main application file 
+# Main application file
+"""
+FileNom headless batch renamer.
+
+Streams video files from a directory walk through parse -> lookup -> rename and
+prints one JSON object per file, e.g.:
+
+    python main.py /mnt/media/tv --dry-run --jobs 16
+
+With --watch it then keeps running and renames new downloads as they finish:
+
+    python main.py /mnt/downloads --watch --settle 15
+
+A dry run can save its plan for review and apply it later without looking anything up again:
+
+    python main.py /mnt/media --dry-run --plan-out plan.jsonl
+    python main.py --apply-plan plan.jsonl
+"""
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+import filename_parser
+from config import ConfigError, load_config
+from db import RenameHistory
+from journal import DISCOVERED, DONE, RESOLVED, JobJournal
+from plan_file import PlanReader, PlanWriter, check_planned
+from planner import MoveResult, execute, plan_renames
+from scanner import iter_video_files
+from stats import STATS
+from templates import NamingScheme, TemplateError
+from watcher import SETTLE_SECONDS, DownloadWatcher
+
+RENAME_CHUNK = 500   # Files planned and renamed together
+
+# Options saved with each journaled run so --resume can repeat it
+JOB_OPTIONS = ("paths", "jobs", "max_files", "offline", "identify", "incremental", "watch", "settle", "apply_plan")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="filenom", description="Rename TV show and movie files without a GUI.")
+    parser.add_argument("paths", nargs="*", help="Files or directories to process")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be renamed without touching files")
+    parser.add_argument("--jobs", type=int, default=8, help="Concurrent lookups/renames (default: 8)")
+    parser.add_argument("--max-files", type=int, default=None, help="Stop after this many files")
+    parser.add_argument("--offline", action="store_true", help="Skip metadata lookups; rename from the cleaned filename only")
+    parser.add_argument("--omdb-key", default=None, help="OMDB API key (default: from config.json)")
+    parser.add_argument("--identify", choices=("name", "hash"), default="name",
+                        help="Identify files by filename (default) or by content hash via OpenSubtitles, "
+                             "falling back to the filename")
+    parser.add_argument("--opensubtitles-key", default=None,
+                        help="OpenSubtitles API key for --identify hash (default: from config.json)")
+    parser.add_argument("--subtitles", metavar="LANGS",
+                        help="After renaming, download subtitles for these languages (e.g. en,fr) from OpenSubtitles "
+                             "in the background; needs an OpenSubtitles API key")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process files that are new or changed since the last run (uses library_index.db)")
+    parser.add_argument("--watch", action="store_true",
+                        help="After the initial pass, keep watching the directories and rename new files as they arrive")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help=f"Seconds a file's size/mtime must stay unchanged before --watch processes it "
+                             f"(default: {SETTLE_SECONDS:g})")
+    parser.add_argument("--stats", choices=("json", "prometheus"),
+                        help="Print per-stage timings and counters to stderr at the end of the run")
+    parser.add_argument("--stats-file", metavar="PATH", help="Write the --stats output here instead of stderr")
+    parser.add_argument("--parse-only", action="store_true",
+                        help="Only parse names (no lookups or renames) and print one JSON line per file; large inputs "
+                             "are parsed on all CPU cores. A path of '-' reads names from stdin, one per line")
+    parser.add_argument("--parse-jobs", type=int, default=None,
+                        help="Processes for --parse-only (default: one per CPU)")
+    parser.add_argument("--import-catalog", nargs="+", metavar="TSV",
+                        help="Import an IMDb title.basics dump (and optionally title.episode) into the offline catalog and exit")
+    parser.add_argument("--resume", nargs="?", const="last", metavar="JOB_ID",
+                        help="Resume an interrupted run (default: the most recent one), skipping files it already "
+                             "finished and reusing names it already resolved")
+    parser.add_argument("--plan-out", metavar="PATH",
+                        help="With --dry-run, also write the rename plan to PATH as JSONL, ending with a summary "
+                             "(counts by status, collisions, unchanged), for review and a later --apply-plan")
+    parser.add_argument("--apply-plan", metavar="PATH",
+                        help="Carry out the renames in a plan written by --plan-out, without parsing or looking up "
+                             "anything again; files changed since the plan was made are skipped as stale")
+    parser.add_argument("--undo", nargs="?", const="last", metavar="BATCH_ID",
+                        help="Undo a previous rename batch (default: the most recent one) and exit")
+    return parser
+
+
+def iter_inputs(paths, max_files=None, onerror=None, index=None):
+    """
+    Yield input files (directories are walked lazily), stopping after max_files.
+    With an index, directories yield only new, changed or unprocessed files.
+    """
+    count = 0
+    for path in paths:
+        if not os.path.isdir(path):
+            files = [path]
+        elif index is not None:
+            files = index.scan(path)
+        else:
+            files = iter_video_files(path, onerror=onerror)
+        for file_path in files:
+            if max_files is not None and count >= max_files:
+                return
+            count += 1
+            yield file_path
+
+
+def propose_name(parsed, ext, resolver, naming, original=""):
+    """
+    Return (new_name, status) for a parsed file, looking up metadata unless offline.
+    new_name comes from the naming templates and may contain "/" directory separators.
+    """
+    title, year, season, episode, episode_title = parsed
+    status = "parsed"
+    if season:
+        if resolver is not None:
+            episode_title = resolver.episode_title(title, int(season), int(episode))
+            if not episode_title:
+                return None, "unresolved"
+            status = "resolved"
+    elif resolver is not None:
+        data = resolver.movie(title, year)
+        if not data:
+            return None, "unresolved"
+        title, year, status = data.get("Title", title), data.get("Year", year), "resolved"
+    return naming.format(title, year, season, episode, episode_title, ext, original), status
+
+
+def process_file(file_path, resolver, naming, identifier=None):
+    """
+    Run one file through parse -> lookup and return its JSON record. Files that need
+    renaming come back as "pending" and are renamed in planned chunks by rename_chunk().
+    With an identifier, the file's content hash is tried before its filename.
+    """
+    record = {"path": file_path}
+    directory, filename = os.path.split(file_path)
+    stem, ext = os.path.splitext(filename)
+
+    parsed = None
+    if identifier is not None:
+        with STATS.timer("identify"):
+            parsed = identifier.identify(file_path)
+    if parsed is not None:
+        record["identified_by"] = "hash"
+    else:
+        with STATS.timer("parse"):
+            parsed = filename_parser.parse(stem)
+    if not parsed.title:
+        record["status"] = "unparsed"
+        return record
+
+    try:
+        with STATS.timer("lookup"):
+            new_filename, status = propose_name(parsed, ext, resolver, naming, stem)
+    except Exception as e:
+        record.update(status="error", error=str(e))
+        return record
+    if new_filename is None:
+        record["status"] = status
+        return record
+
+    new_path = os.path.join(directory, new_filename)
+    record["new_path"] = new_path
+    record["status"] = "unchanged" if os.path.normpath(new_path) == os.path.normpath(file_path) else "pending"
+    return record
+
+
+def rename_chunk(records, dry_run, jobs, history_batch=None):
+    """
+    Plan and run the renames for a chunk of "pending" records (collisions, chains and
+    cycles are resolved across the whole chunk), updating each record's status in place.
+    """
+    by_source = {os.path.abspath(r["path"]): r for r in records}
+    plan = plan_renames((r["path"], r["new_path"]) for r in records)
+    if dry_run:
+        results = plan.skipped + [MoveResult(source, target, "would_rename", None) for source, target in plan.moves]
+    else:
+        results = execute(plan, jobs=jobs, history=history_batch)
+    for result in results:
+        record = by_source[result.source]
+        record["status"] = result.status
+        if result.error:
+            record["error"] = result.error
+
+
+def undo(batch_id, out=None):
+    """Undo a rename batch and print one JSON line per conflict (to out, default stdout)."""
+    out = out if out is not None else sys.stdout
+    history = RenameHistory()
+    undone, conflicts = history.undo_batch(None if batch_id == "last" else int(batch_id))
+    history.close()
+    for old, new, reason in conflicts:
+        print(json.dumps({"path": new, "original": old, "status": "conflict", "error": reason}), file=out)
+    print(json.dumps({"summary": {"restored": undone, "conflicts": len(conflicts)}}), file=sys.stderr)
+    return 1 if conflicts else 0
+
+
+def run(args, out=None):
+    out = out if out is not None else sys.stdout
+    # Every real run is journaled so it can be resumed; --resume reloads the run's options
+    journal = None
+    job = None
+    if args.resume:
+        journal = JobJournal()
+        job = journal.unfinished(None if args.resume == "last" else int(args.resume))
+        if job is None:
+            journal.close()
+            print("No interrupted run to resume.", file=sys.stderr)
+            return 2
+        vars(args).update(job.options)
+    elif not args.dry_run:
+        args.paths = [os.path.abspath(path) for path in args.paths]
+        if args.apply_plan:
+            args.apply_plan = os.path.abspath(args.apply_plan)
+        journal = JobJournal()
+        job = journal.start(run_label(args), {name: getattr(args, name) for name in JOB_OPTIONS})
+    elif args.plan_out:
+        # Plans are applied later, possibly from another directory
+        args.paths = [os.path.abspath(path) for path in args.paths]
+
+    try:
+        return run_job(args, job, out)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def run_label(args):
+    return "CLI: " + (f"apply plan {args.apply_plan}" if args.apply_plan else " ".join(args.paths))
+
+
+def run_job(args, job, out):
+    """Run a batch, journaling its progress in job (None for dry runs)."""
+    try:
+        config = load_config()
+        naming = NamingScheme.from_config(config)
+    except (ConfigError, TemplateError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    resolver = None
+    fetcher = None
+    if not args.offline and not args.apply_plan:
+        # Lookup, hashing and index modules are imported only when a run needs them,
+        # so --offline and --dry-run start without loading them
+        from cache import MetadataCache
+        from catalog import TitleCatalog
+        from imdb_fetcher import MetadataFetcher
+        from providers import build_providers
+        from resolver import BatchResolver
+
+        catalog = TitleCatalog()
+        fetcher = MetadataFetcher.from_config(dict(config, fetch_concurrency=args.jobs))
+        cache = MetadataCache.from_config(config)
+        providers = build_providers(fetcher, cache, config, args.omdb_key)
+        if not providers and not catalog.available:
+            print("No metadata API key: pass --omdb-key, set OMDb/TMDb/SIMKL keys in config.json, "
+                  "import a catalog, or use --offline.", file=sys.stderr)
+            fetcher.close()
+            return 2
+        resolver = BatchResolver(fetcher, cache, providers, catalog)
+
+    identifier = None
+    if args.identify == "hash" and not args.apply_plan:
+        opensubtitles_key = args.opensubtitles_key or config.get("opensubtitles_api_key", "")
+        if args.offline or not opensubtitles_key:
+            print("--identify hash needs an OpenSubtitles API key (--opensubtitles-key or config.json) "
+                  "and cannot be used with --offline.", file=sys.stderr)
+            return 2
+        from hasher import HashIdentifier, OpenSubtitlesHashProvider
+
+        provider = OpenSubtitlesHashProvider(fetcher, opensubtitles_key, resolver.cache)
+        identifier = HashIdentifier(provider, jobs=args.jobs)
+
+    subtitles = None
+    if args.subtitles:
+        opensubtitles_key = args.opensubtitles_key or config.get("opensubtitles_api_key", "")
+        if args.offline or args.dry_run or not opensubtitles_key:
+            print("--subtitles needs an OpenSubtitles API key (--opensubtitles-key or config.json) "
+                  "and cannot be used with --offline or --dry-run.", file=sys.stderr)
+            return 2
+        from subtitles import OpenSubtitlesProvider, SubtitlePipeline
+
+        subtitles = SubtitlePipeline(OpenSubtitlesProvider(fetcher, opensubtitles_key, resolver.cache),
+                                     languages=args.subtitles.split(","))
+
+    index = None
+    if args.incremental:
+        from library_index import LibraryIndex
+
+        index = LibraryIndex()
+    history = None if args.dry_run else RenameHistory()
+    plan_out = None
+    if args.plan_out:
+        plan_out = PlanWriter(args.plan_out, args.paths, {name: getattr(args, name) for name in JOB_OPTIONS})
+
+    def report_error(e):
+        print(json.dumps({"path": e.filename, "status": "error", "error": e.strerror}), file=out, flush=True)
+
+    counts = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, args.jobs))
+
+    # Subtitle fetches run behind the renames; results are printed in order as they finish
+    subtitle_futures = deque()
+
+    def report_subtitles(wait):
+        while subtitle_futures and (wait or subtitle_futures[0].done()):
+            record = subtitle_futures.popleft().result()
+            status = "subtitles." + record["subtitle_status"]
+            counts[status] = counts.get(status, 0) + 1
+            print(json.dumps(record, ensure_ascii=False), file=out, flush=True)
+
+    def lookup(file_path, state, planned):
+        """
+        Pool worker: reuse a new name the journal already resolved or the applied plan
+        holds, else parse and look up.
+        """
+        if state is not None and state[0] == RESOLVED:
+            return {"path": file_path, "new_path": state[1], "status": "pending", "resumed": True}
+        if planned is not None:
+            return check_planned(planned)
+        return process_file(file_path, resolver, naming, identifier)
+
+    def process(file_paths, label, plan=None):
+        """
+        Resolve and rename a stream of files as one history batch. Returns the new paths.
+        With a plan, file_paths are its rename records and nothing is looked up.
+        """
+        nonlocal config, naming
+        settings = load_config()
+        if settings is not config:
+            # config.json was edited while watching: later files use its new templates
+            try:
+                naming = NamingScheme.from_config(settings)
+            except TemplateError as e:
+                print(f"⚠️ {e}; keeping the previous templates", file=sys.stderr)
+            config = settings
+        history_batch = history.batch(label) if history else None
+        chunk = []
+        renamed = []
+
+        def flush():
+            pending = [record for record in chunk if record["status"] == "pending"]
+            if pending:
+                if job is not None:
+                    job.begin_renames((record["path"], record["new_path"]) for record in pending)
+                rename_chunk(pending, args.dry_run, args.jobs, history_batch)
+                if history_batch is not None:
+                    # History is written before the journal marks these files done (see recover_renames)
+                    history_batch.flush()
+            for record in chunk:
+                if job is not None:
+                    job.record(record)
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+                if record["status"] == "renamed":
+                    renamed.append(record["new_path"])
+                if subtitles is not None and record["status"] in ("renamed", "unchanged"):
+                    subtitle_futures.append(subtitles.submit(record.get("new_path", record["path"])))
+                if index is not None and record["status"] in ("renamed", "unchanged"):
+                    index.mark_processed(record["path"], record)
+                print(json.dumps(record, ensure_ascii=False), file=out, flush=True)
+            if plan_out is not None:
+                plan_out.write_many(chunk)
+            chunk.clear()
+            report_subtitles(wait=False)
+
+        def drain(limit):
+            while len(window) > limit:
+                chunk.append(window.popleft().result())
+                if len(chunk) >= RENAME_CHUNK:
+                    flush()
+
+        # Bounded window of in-flight lookups keeps memory flat and output in walk order
+        window = deque()
+        for file_path in file_paths:
+            planned = None
+            if plan is not None:
+                planned, file_path = file_path, file_path["path"]
+            state = job.state(file_path) if job is not None else None
+            if state is None:
+                if job is not None:
+                    job.update(file_path, DISCOVERED)
+            elif state[0] == DONE:
+                counts["already_done"] = counts.get("already_done", 0) + 1
+                continue
+            window.append(pool.submit(lookup, file_path, state, planned))
+            drain(args.jobs * 4)
+        drain(0)
+        flush()
+        if history_batch is not None:
+            history_batch.close()
+        if index is not None:
+            index.commit()
+        return renamed
+
+    label = run_label(args)
+    try:
+        if args.resume:
+            label = label.replace("CLI: ", f"CLI (resumed run {job.id}): ", 1)
+            recover_renames(job, history, label, counts, out)
+        if args.apply_plan:
+            apply_plan(args.apply_plan, process, label, counts)
+        else:
+            process(iter_inputs(args.paths, args.max_files, onerror=report_error, index=index), label)
+        if plan_out is not None:
+            plan_out.close()
+        if args.watch:
+            watch(args.paths, process, args.settle)
+        report_subtitles(wait=True)
+        if job is not None:
+            job.finish()
+    finally:
+        if job is not None:
+            job.checkpoint()
+        pool.shutdown()
+        if subtitles is not None:
+            subtitles.close()
+        if identifier is not None:
+            identifier.close()
+        if resolver is not None:
+            resolver.close()
+        if fetcher is not None:
+            fetcher.close()
+        if index is not None:
+            index.close()
+        if history is not None:
+            history.close()
+    print(json.dumps({"summary": counts}), file=sys.stderr)
+    if args.stats:
+        write_stats(args.stats, args.stats_file)
+    return 1 if counts.get("error") or counts.get("stale") else 0
+
+
+def apply_plan(path, process, label, counts):
+    """Rename the files a saved plan lists as renames; its other records are only counted, as "skipped"."""
+    skipped = {}
+    with PlanReader(path) as plan:
+        process(plan.renames(skipped), label, plan=plan)
+        if plan.summary is None:
+            print(f"⚠️ {path} has no summary line; the run that wrote it may have been interrupted",
+                  file=sys.stderr)
+    if skipped:
+        counts["skipped"] = counts.get("skipped", 0) + sum(skipped.values())
+
+
+def recover_renames(job, history, label, counts, out):
+    """
+    Settle the files an interrupted run was renaming. Renames that completed are reported
+    and added to the history if the crash beat the history flush; the rest are retried.
+    """
+    recovered = job.recover()
+    if not recovered:
+        return
+    with history.batch(label) as history_batch:
+        for source, target in recovered:
+            if not history.contains(source, target):
+                history_batch.record(source, target)
+            counts["renamed"] = counts.get("renamed", 0) + 1
+            print(json.dumps({"path": source, "new_path": target, "status": "renamed", "recovered": True},
+                             ensure_ascii=False), file=out, flush=True)
+
+
+def parse_only(args, out=None):
+    """Parse every input name on a process pool and print its fields as one JSON line."""
+    out = out if out is not None else sys.stdout
+    from parse_pool import ParsePool
+
+    def names():
+        for path in args.paths:
+            if path == "-":
+                yield from (line.rstrip("\r\n") for line in sys.stdin if line.strip())
+            else:
+                yield from iter_inputs([path])
+
+    counts = {"parsed": 0, "unparsed": 0}
+    with ParsePool(args.parse_jobs) as pool:
+        for path, parsed in pool.parse(islice(names(), args.max_files)):
+            record = dict(path=path, **parsed._asdict())
+            counts["parsed" if parsed.title else "unparsed"] += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(json.dumps({"summary": counts}), file=sys.stderr)
+    return 0
+
+
+def write_stats(fmt, path=None):
+    """Dump the run's stage timings and counters as JSON or Prometheus text."""
+    text = STATS.to_json() + "\n" if fmt == "json" else STATS.to_prometheus()
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    else:
+        sys.stderr.write(text)
+
+
+def watch(paths, process, settle):
+    """Process new files under paths as they finish downloading, until interrupted."""
+    directories = [path for path in paths if os.path.isdir(path)]
+    watcher = DownloadWatcher(directories, settle=settle).start()
+    print(json.dumps({"watching": directories, "backend": watcher.backend}), file=sys.stderr, flush=True)
+    try:
+        for batch in watcher.batches():
+            watcher.ignore(process(batch, "Watch: " + " ".join(directories)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.undo:
+        return undo(args.undo)
+    if args.import_catalog:
+        from catalog import TitleCatalog
+
+        count = TitleCatalog().import_imdb(*args.import_catalog[:2])
+        print(json.dumps({"summary": {"imported": count}}), file=sys.stderr)
+        return 0
+    if args.resume:
+        if args.dry_run:
+            parser.error("--resume cannot be combined with --dry-run")
+        return run(args)
+    if args.plan_out and not args.dry_run:
+        parser.error("--plan-out needs --dry-run")
+    if args.apply_plan:
+        if args.paths or args.plan_out or args.parse_only or args.watch or args.incremental or args.subtitles:
+            parser.error("--apply-plan takes no paths and cannot be combined with --plan-out, --parse-only, "
+                         "--watch, --incremental or --subtitles")
+        return run(args)
+    if not args.paths:
+        parser.error("at least one path is required")
+    if args.parse_only:
+        return parse_only(args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
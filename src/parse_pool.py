@@ -0,0 +1,92 @@
+# Multi-process parse stage
+import os
+import time
+from collections import deque
+from itertools import chain, islice
+
+from filename_parser import parse_many
+
+MIN_BATCH = 256
+MAX_BATCH = 65_536
+TARGET_BATCH_SECONDS = 0.05   # Worker time per batch: long enough to amortize IPC, short enough to balance
+SERIAL_LIMIT = 20_000         # Inputs up to this size are parsed in-process (no pool startup)
+
+
+def parse_batch(paths):
+    """filename_parser.parse_many() with its timing. Returns: (ParsedBatch, seconds spent parsing)"""
+    start = time.perf_counter()
+    batch = parse_many(paths)
+    return batch, time.perf_counter() - start
+
+
+def _parse_remote(paths):
+    """Pool worker: like parse_batch(), minus the paths the parent already holds."""
+    batch, seconds = parse_batch(paths)
+    batch.paths = None
+    return batch, seconds
+
+
+class ParsePool:
+    """
+    Parses large streams of paths on a process pool, in input order. Batches start at
+    MIN_BATCH paths and are resized from each batch's measured worker time so every batch
+    takes about TARGET_BATCH_SECONDS. Small inputs (or jobs=1) are parsed in-process.
+    """
+
+    def __init__(self, jobs=None):
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.batch_size = MIN_BATCH
+        self.pool = None
+
+    def batches(self, paths):
+        """Yield ParsedBatch results for an iterable of paths, in order."""
+        paths = iter(paths)
+        head = list(islice(paths, SERIAL_LIMIT))
+        if self.jobs == 1 or len(head) < SERIAL_LIMIT:
+            while head:
+                yield parse_batch(head)[0]
+                head = list(islice(paths, SERIAL_LIMIT))
+            return
+
+        if self.pool is None:
+            from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        paths = chain(head, paths)
+        window = deque()
+        while True:
+            # Keep two batches per worker in flight so workers never wait on the parent
+            while len(window) < self.jobs * 2:
+                chunk = list(islice(paths, self.batch_size))
+                if not chunk:
+                    break
+                window.append((chunk, self.pool.submit(_parse_remote, chunk)))
+            if not window:
+                return
+            chunk, future = window.popleft()
+            batch, seconds = future.result()
+            batch.paths = chunk
+            self._resize(len(chunk), seconds)
+            yield batch
+
+    def parse(self, paths):
+        """Yield (path, ParsedName) for every path, in order."""
+        for batch in self.batches(paths):
+            yield from zip(batch.paths, batch)
+
+    def _resize(self, count, seconds):
+        if count and seconds > 0:
+            size = int(count * TARGET_BATCH_SECONDS / seconds)
+            self.batch_size = min(MAX_BATCH, max(MIN_BATCH, size))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
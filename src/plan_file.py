@@ -0,0 +1,136 @@
+# Rename plan files
+import os
+import json
+import time
+
+PLAN_VERSION = 1
+
+# Record statuses that are renames to carry out when the plan is applied
+RENAME_STATUSES = ("would_rename", "pending")
+
+
+class PlanWriter:
+    """
+    Streams a rename plan to a JSONL file: a {"plan": {...}} header, one record per file
+    (as printed by main.py, plus the source's size and mtime for renames) and a
+    {"summary": {...}} footer written by close(). write_many() flushes each chunk, so a
+    50k-file plan never sits in memory and can be followed with tail -f; only the rename
+    targets are kept, to catch collisions between chunks the planner saw separately.
+    """
+
+    def __init__(self, path, paths=(), options=None):
+        self.path = path
+        self.counts = {}
+        self._targets = {}   # normcase(target) -> source, for every rename written so far
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({"plan": {"version": PLAN_VERSION, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                              "paths": list(paths), "options": options or {}}})
+
+    def write(self, record):
+        """Add one file's record. Renames are stamped with the source's size and mtime."""
+        if record["status"] in RENAME_STATUSES:
+            try:
+                st = os.stat(record["path"])
+            except OSError as e:
+                record = dict(record, status="error", error=e.strerror)
+            else:
+                key = os.path.normcase(os.path.abspath(record["new_path"]))
+                if key in self._targets:
+                    record = dict(record, status="conflict", error=f"duplicate target (also {self._targets[key]})")
+                else:
+                    self._targets[key] = record["path"]
+                    record = dict(record, status="would_rename", size=st.st_size, mtime_ns=st.st_mtime_ns)
+        self.counts[record["status"]] = self.counts.get(record["status"], 0) + 1
+        self._write(record)
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        self._file.flush()
+
+    def summary(self):
+        """Counts by status plus the totals reviewers look at first."""
+        counts = self.counts
+        renames = sum(counts.get(status, 0) for status in RENAME_STATUSES)
+        return {"files": sum(counts.values()), "renames": renames, "unchanged": counts.get("unchanged", 0),
+                "collisions": counts.get("conflict", 0), "by_status": dict(sorted(counts.items()))}
+
+    def close(self):
+        self._write({"summary": self.summary()})
+        self._file.close()
+
+    def _write(self, obj):
+        self._file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PlanReader:
+    """
+    Reads a plan written by PlanWriter. header is available at once; iterating yields the
+    file records in plan order, and summary is set once the footer has been read (it stays
+    None for a plan whose run was interrupted).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, encoding="utf-8")
+        first = self._file.readline()
+        try:
+            self.header = json.loads(first)["plan"]
+        except (ValueError, KeyError, TypeError):
+            self._file.close()
+            raise ValueError(f"{path} is not a FileNom rename plan")
+        if self.header.get("version", 0) > PLAN_VERSION:
+            self._file.close()
+            raise ValueError(f"{path} was written by a newer FileNom (plan version {self.header['version']})")
+        self.summary = None
+
+    def __iter__(self):
+        for line in self._file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "summary" in record:
+                self.summary = record["summary"]
+            else:
+                yield record
+
+    def renames(self, skipped=None):
+        """Yield only the records to rename; other statuses are counted in skipped (a dict), if given."""
+        for record in self:
+            if record["status"] in RENAME_STATUSES:
+                yield record
+            elif skipped is not None:
+                skipped[record["status"]] = skipped.get(record["status"], 0) + 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def check_planned(record):
+    """
+    Turn a planned rename back into a "pending" record, unless its source has changed
+    since the plan was made (then "stale") or disappeared ("error").
+    """
+    path = record["path"]
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return {"path": path, "new_path": record["new_path"], "status": "error", "error": e.strerror}
+    if (st.st_size, st.st_mtime_ns) != (record.get("size"), record.get("mtime_ns")):
+        return {"path": path, "new_path": record["new_path"], "status": "stale",
+                "error": "file changed since the plan was made"}
+    return {"path": path, "new_path": record["new_path"], "status": "pending", "planned": True}
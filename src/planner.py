@@ -0,0 +1,231 @@
+import os
+import errno
+import time
+import shutil
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from stats import STATS
+
+COPY_BUFFER = 16 * 1024 * 1024
+TEMP_SUFFIX = ".filenom-tmp"
+
+# os.link() errors meaning the filesystem has no hard links (a plain rename is used there)
+LINK_UNSUPPORTED = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS}
+
+# status: "renamed", "unchanged", "conflict" or "error"
+MoveResult = namedtuple("MoveResult", ["source", "target", "status", "error"])
+
+
+class RenamePlan:
+    """
+    A complete source -> target rename map, checked up front.
+
+    moves:     (source, target) pairs that can run.
+    staged:    sources that are themselves targets of another move (chains and cycles
+               such as A->B, B->A). They are first moved to a temp name in phase one.
+    skipped:   MoveResults for identity renames and conflicts (duplicate target,
+               target already exists) that will not run.
+    """
+
+    def __init__(self):
+        self.moves = []
+        self.staged = set()
+        self.skipped = []
+
+    def __len__(self):
+        return len(self.moves)
+
+
+def plan_renames(pairs):
+    """Build a RenamePlan from (source, target) path pairs."""
+    plan = RenamePlan()
+    claimed = {}
+    seen_sources = set()
+    candidates = []
+    for source, target in pairs:
+        source = os.path.abspath(source)
+        target = os.path.abspath(target)
+        if source == target:
+            plan.skipped.append(MoveResult(source, target, "unchanged", None))
+            continue
+        if os.path.normcase(source) in seen_sources:
+            plan.skipped.append(MoveResult(source, target, "conflict", "file listed twice"))
+            continue
+        seen_sources.add(os.path.normcase(source))
+        key = os.path.normcase(target)
+        if key in claimed:
+            plan.skipped.append(MoveResult(source, target, "conflict", f"duplicate target (also {claimed[key]})"))
+            continue
+        claimed[key] = source
+        candidates.append((source, target))
+
+    # A move may only take an existing target that another move vacates. Dropping a move
+    # leaves its source in place, which can block the move into it, so repeat until stable.
+    while True:
+        sources = {os.path.normcase(source) for source, _ in candidates}
+        kept = []
+        for source, target in candidates:
+            if (os.path.normcase(target) not in sources and os.path.lexists(target)
+                    and not _same_file(source, target)):
+                plan.skipped.append(MoveResult(source, target, "conflict", "target exists"))
+            else:
+                kept.append((source, target))
+        if len(kept) == len(candidates):
+            break
+        candidates = kept
+
+    # Only sources that another move needs out of the way are staged
+    targets = {os.path.normcase(target) for _, target in candidates}
+    plan.moves = candidates
+    plan.staged = {source for source, _ in candidates if os.path.normcase(source) in targets}
+    return plan
+
+
+def _same_file(a, b):
+    """True for case-only renames on case-insensitive filesystems."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def move_file(source, target):
+    """
+    Rename source to target, falling back to copy + fsync + unlink across filesystems.
+    Never replaces an existing target: raises FileExistsError instead.
+    """
+    target_dir = os.path.dirname(target)
+    if target_dir and not os.path.isdir(target_dir):
+        os.makedirs(target_dir, exist_ok=True)
+    start = time.perf_counter()
+    try:
+        _rename_no_replace(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            STATS.incr("rename.error")
+            raise
+        _copy_and_unlink(source, target)
+        STATS.observe("rename.copy", time.perf_counter() - start)
+    else:
+        STATS.observe("rename", time.perf_counter() - start)
+
+
+def _rename_no_replace(source, target):
+    """
+    os.rename() that fails with EEXIST rather than replacing target. On POSIX the file is
+    hard-linked to its new name (link never replaces) and then unlinked from the old one.
+    """
+    if os.name == "nt" or _same_file(source, target):
+        # Windows' rename never replaces; a case-only rename is the same file
+        os.rename(source, target)
+        return
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except OSError as e:
+        if e.errno not in LINK_UNSUPPORTED:
+            raise
+        # No hard links here (FAT, some network shares): check, then rename
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+        os.rename(source, target)
+        return
+    os.unlink(source)
+
+
+def _copy_and_unlink(source, target):
+    partial = target + TEMP_SUFFIX
+    # "x": never write into a file that is already there (e.g. a concurrent copy)
+    with open(partial, "xb") as fdst:
+        try:
+            with open(source, "rb") as fsrc:
+                shutil.copyfileobj(fsrc, fdst, COPY_BUFFER)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        except BaseException:
+            fdst.close()
+            os.unlink(partial)
+            raise
+    try:
+        shutil.copystat(source, partial)
+        _rename_no_replace(partial, target)
+    except BaseException:
+        os.unlink(partial)
+        raise
+    os.unlink(source)
+
+
+def execute(plan, jobs=8, history=None):
+    """
+    Run a plan on a thread pool, yielding a MoveResult per file as moves complete.
+    Phase one moves staged sources to temp names; phase two performs every final move.
+    Successful renames are recorded in history (a db.RenameBatch) if given.
+    """
+    yield from plan.skipped
+    if not plan.moves:
+        return
+
+    temp_names = {}
+    try:
+        yield from _execute(plan, jobs, history, temp_names)
+    finally:
+        # Staged files whose move did not happen go back under their own name, once every
+        # move has finished, even when the caller closes this generator early (GUI cancel)
+        for source, temp in temp_names.items():
+            if os.path.lexists(temp):
+                _restore(temp, source)
+
+
+def _execute(plan, jobs, history, temp_names):
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="rename") as pool:
+        # Phase one: move sources that block another move out of the way
+        futures = {}
+        for source in plan.staged:
+            temp = f"{source}.{os.urandom(4).hex()}{TEMP_SUFFIX}"
+            futures[pool.submit(os.rename, source, temp)] = (source, temp)
+        failed_staging = set()
+        for future in as_completed(futures):
+            source, temp = futures[future]
+            try:
+                future.result()
+                temp_names[source] = temp
+            except OSError:
+                failed_staging.add(os.path.normcase(source))
+
+        # Phase two: final moves. A move whose target could not be vacated is not attempted.
+        futures = {}
+        for source, target in plan.moves:
+            if os.path.normcase(target) in failed_staging:
+                yield MoveResult(source, target, "conflict", "target could not be vacated")
+                continue
+            if os.path.normcase(source) in failed_staging:
+                yield MoveResult(source, target, "error", "could not stage for rename")
+                continue
+            futures[pool.submit(_move_and_record, source, temp_names.get(source, source), target, history)] = (source, target)
+        for future in as_completed(futures):
+            source, target = futures[future]
+            try:
+                future.result()
+            except FileExistsError:
+                # Something appeared at the target after the plan was made
+                yield MoveResult(source, target, "conflict", "target exists")
+                continue
+            except OSError as e:
+                yield MoveResult(source, target, "error", str(e))
+                continue
+            yield MoveResult(source, target, "renamed", None)
+
+
+def _move_and_record(source, current, target, history):
+    """Worker: move one file and record it, even if the caller stops consuming results."""
+    move_file(current, target)
+    if history is not None:
+        history.record(source, target)
+
+
+def _restore(temp, source):
+    """Put a staged file back under its original name, unless another file now holds it."""
+    try:
+        _rename_no_replace(temp, source)
+    except OSError:
+        pass
@@ -0,0 +1,311 @@
+# Metadata providers
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from difflib import SequenceMatcher
+
+from cache import make_key, normalize_title
+
+MIN_CONFIDENCE = 0.85     # Title similarity needed to accept a provider's answer
+LATENCY_ALPHA = 0.3       # Weight of the newest sample in the latency moving average
+FAILURE_PENALTY = 5.0     # Seconds added to a provider's latency estimate when it fails
+MIN_HEDGE_DELAY = 0.25    # Never start a backup request sooner than this
+MAX_HEDGE_DELAY = 2.0     # ...or later than this
+
+
+def confident(query, found, year=None, found_year=None):
+    """True if a provider's title (and year, when both are known) matches the query."""
+    query, found = normalize_title(query), normalize_title(found or "")
+    if not found:
+        return False
+    if query != found and SequenceMatcher(None, query, found).ratio() < MIN_CONFIDENCE:
+        return False
+    try:
+        return not (year and found_year) or abs(int(year) - int(str(found_year)[:4])) <= 1
+    except ValueError:
+        return True
+
+
+class MetadataProvider:
+    """
+    One metadata source. Subclasses implement _movie, _season_listing and validate;
+    the public methods add caching and share one in-flight request per cache key.
+
+    movie() returns {"Title", "Year", "imdbID"} or None.
+    season_listing() returns {episode_number: episode_title} ({} if unknown).
+    """
+
+    name = ""
+
+    def __init__(self, fetcher, api_key, cache=None):
+        self.fetcher = fetcher
+        self.api_key = api_key
+        self.cache = cache
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def cached(self, cache_key, fetch):
+        """Return fetch()'s result via the cache; concurrent callers for one key share a request."""
+        if self.cache is not None:
+            data = self.cache.get(cache_key)
+            if data is not None and "result" in data:
+                return data["result"]
+
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[cache_key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            result, cacheable = fetch()
+            if cacheable and self.cache is not None:
+                self.cache.put(cache_key, {"result": result}, negative=not result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+
+    def movie(self, title, year=None):
+        return self.cached(make_key(self.name, title, year=year), lambda: self._movie(title, year))
+
+    def season_listing(self, show, season):
+        listing = self.cached(make_key(self.name, show, season=season), lambda: self._season_listing(show, int(season)))
+        # Episode numbers come back from the JSON cache as strings
+        return {int(episode): title for episode, title in (listing or {}).items()}
+
+    def episode_title(self, show, season, episode):
+        return self.season_listing(show, season).get(int(episode))
+
+    def _movie(self, title, year):
+        """Return (result, cacheable). cacheable is False for errors that may be transient."""
+        raise NotImplementedError
+
+    def _season_listing(self, show, season):
+        raise NotImplementedError
+
+    def validate(self):
+        """Make a test request with the API key. Returns True if it is accepted."""
+        raise NotImplementedError
+
+
+class OmdbProvider(MetadataProvider):
+    name = "omdb"
+
+    def query(self, params):
+        data = self.fetcher.get_json(self.name, params=dict(params, apikey=self.api_key))
+        if data is None:
+            return None, False
+        if data.get("Response") == "True":
+            return data, True
+        # Only cache genuine misses, not key/limit errors
+        return None, "not found" in data.get("Error", "").lower()
+
+    def _movie(self, title, year):
+        params = {"t": title}
+        if year:
+            params["y"] = year
+        data, cacheable = self.query(params)
+        if data is None:
+            return None, cacheable
+        return {"Title": data.get("Title", title), "Year": data.get("Year", year), "imdbID": data.get("imdbID")}, True
+
+    def _season_listing(self, show, season):
+        data, cacheable = self.query({"t": show, "Season": season})
+        if data is None:
+            return {}, cacheable
+        episodes = {}
+        for item in data.get("Episodes", []):
+            try:
+                episodes[int(item["Episode"])] = item.get("Title", "Unknown")
+            except (KeyError, ValueError):
+                continue
+        return episodes, True
+
+    def episode_title(self, show, season, episode):
+        title = super().episode_title(show, season, episode)
+        if title:
+            return title
+        # Season listings can be incomplete for new or special episodes
+        data = self.cached(
+            make_key(self.name, show, season=season, episode=episode),
+            lambda: self.query({"t": show, "Season": int(season), "Episode": int(episode)}),
+        )
+        return data.get("Title", "Unknown") if data else None
+
+    def validate(self):
+        response = self.fetcher.get(self.name, params={"apikey": self.api_key, "i": "tt0111161"})
+        return response.status_code == 200 and response.json().get("Response") == "True"
+
+
+class TmdbProvider(MetadataProvider):
+    name = "tmdb"
+
+    def query(self, path, **params):
+        response = self.fetcher.get(self.name, path, params=dict(params, api_key=self.api_key))
+        if response.status_code == 404:
+            return None, True
+        if response.status_code != 200:
+            return None, False
+        return response.json(), True
+
+    def _movie(self, title, year):
+        params = {"query": title}
+        if year:
+            params["year"] = year
+        data, cacheable = self.query("/search/movie", **params)
+        for item in (data or {}).get("results", [])[:5]:
+            found_year = (item.get("release_date") or "")[:4]
+            if confident(title, item.get("title"), year, found_year):
+                return {"Title": item["title"], "Year": found_year or year, "imdbID": None}, True
+        return None, cacheable
+
+    def _season_listing(self, show, season):
+        data, cacheable = self.query("/search/tv", query=show)
+        match = next((item for item in (data or {}).get("results", [])[:5]
+                      if confident(show, item.get("name"))), None)
+        if match is None:
+            return {}, cacheable
+        data, cacheable = self.query(f"/tv/{match['id']}/season/{season}")
+        episodes = {}
+        for item in (data or {}).get("episodes", []):
+            if item.get("episode_number") is not None:
+                episodes[int(item["episode_number"])] = item.get("name") or "Unknown"
+        return episodes, cacheable
+
+    def validate(self):
+        return self.fetcher.get(self.name, "/movie/550", params={"api_key": self.api_key}).status_code == 200
+
+
+class SimklProvider(MetadataProvider):
+    name = "simkl"
+
+    def query(self, path, **params):
+        response = self.fetcher.get(self.name, path, params=dict(params, client_id=self.api_key))
+        if response.status_code == 404:
+            return None, True
+        if response.status_code != 200:
+            return None, False
+        return response.json(), True
+
+    def _movie(self, title, year):
+        params = {"q": title}
+        if year:
+            params["year"] = year
+        data, cacheable = self.query("/search/movie", **params)
+        for item in (data or [])[:5]:
+            if confident(title, item.get("title"), year, item.get("year")):
+                return {"Title": item["title"], "Year": item.get("year") or year,
+                        "imdbID": item.get("ids", {}).get("imdb")}, True
+        return None, cacheable
+
+    def _season_listing(self, show, season):
+        data, cacheable = self.query("/search/tv", q=show)
+        match = next((item for item in (data or [])[:5] if confident(show, item.get("title"))), None)
+        if match is None:
+            return {}, cacheable
+        data, cacheable = self.query(f"/tv/episodes/{match['ids'].get('simkl_id') or match['ids'].get('simkl')}")
+        episodes = {}
+        for item in data or []:
+            if item.get("type") == "episode" and item.get("season") == season and item.get("episode") is not None:
+                episodes[int(item["episode"])] = item.get("title") or "Unknown"
+        return episodes, cacheable
+
+    def validate(self):
+        response = self.fetcher.get(self.name, "/movies/trending", headers={"simkl-api-key": self.api_key})
+        return response.status_code == 200
+
+
+PROVIDER_CLASSES = {"omdb": OmdbProvider, "tmdb": TmdbProvider, "simkl": SimklProvider}
+
+
+def build_providers(fetcher, cache, config, omdb_key=None):
+    """Create a provider for every service that has an API key in config.json."""
+    keys = {
+        "omdb": omdb_key or config.get("omdb_api_key", ""),
+        "tmdb": config.get("tmdb_api_key", ""),
+        "simkl": config.get("simkl_api_key", ""),
+    }
+    return [PROVIDER_CLASSES[name](fetcher, key, cache) for name, key in keys.items() if key]
+
+
+class LatencyTracker:
+    """Exponential moving average of each provider's response time; failures count as slow."""
+
+    def __init__(self):
+        self.latency = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, failed=False):
+        sample = seconds + (FAILURE_PENALTY if failed else 0.0)
+        with self.lock:
+            previous = self.latency.get(name)
+            self.latency[name] = sample if previous is None else previous + LATENCY_ALPHA * (sample - previous)
+
+    def estimate(self, name):
+        with self.lock:
+            return self.latency.get(name, 0.0)
+
+    def ranked(self, providers):
+        """Providers fastest first; unmeasured providers keep their configured order up front."""
+        return sorted(providers, key=lambda provider: self.estimate(provider.name))
+
+
+class ProviderRace:
+    """
+    Hedged requests across providers. The fastest provider is asked first; if it hasn't
+    answered within about twice its usual latency, or answers with nothing, the next one
+    is started too. The first non-empty answer wins and slower requests finish in the
+    background (filling the cache).
+    """
+
+    def __init__(self, providers, max_workers=16):
+        self.providers = list(providers)
+        self.tracker = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider")
+
+    def _timed(self, provider, method, args):
+        start = time.monotonic()
+        try:
+            result = getattr(provider, method)(*args)
+        except Exception:
+            self.tracker.record(provider.name, time.monotonic() - start, failed=True)
+            raise
+        self.tracker.record(provider.name, time.monotonic() - start, failed=not result)
+        return result
+
+    def hedge_delay(self, provider):
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, 2 * self.tracker.estimate(provider.name)))
+
+    def first(self, method, *args):
+        """Call provider.method(*args) on providers in latency order; return the first non-empty answer."""
+        waiting = self.tracker.ranked(self.providers)
+        running = {}
+        while waiting or running:
+            if waiting:
+                provider = waiting.pop(0)
+                running[self.executor.submit(self._timed, provider, method, args)] = provider
+                timeout = self.hedge_delay(provider) if waiting else None
+            else:
+                timeout = None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️ {provider.name} lookup failed: {e}")
+                    continue
+                if result:
+                    return result
+        return None
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,91 @@
+from cache import normalize_title
+from providers import ProviderRace
+
+
+class BatchResolver:
+    """
+    Resolves parsed files against the configured metadata providers with show-level
+    request coalescing. TV episodes are filled from one season listing per (show, season),
+    and concurrent requests for the same listing share a single in-flight call. With
+    several providers, each query is hedged across them (see providers.ProviderRace).
+    If an offline TitleCatalog is given it is tried first and the APIs are only the fallback.
+    """
+
+    def __init__(self, fetcher, cache, providers=(), catalog=None):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.race = ProviderRace(providers)
+        self.catalog = catalog if catalog is not None and catalog.available else None
+
+    @property
+    def providers(self):
+        return self.race.providers
+
+    @providers.setter
+    def providers(self, providers):
+        self.race.providers = list(providers)
+
+    def season_listing(self, show, season):
+        """Return {episode_number: episode_title} for a whole season, or {} if unknown."""
+        return self.race.first("season_listing", show, season) or {}
+
+    def offline_series(self, show, season):
+        """Return the catalog match for a show if the catalog has that season's episodes."""
+        if self.catalog is None:
+            return None
+        series = self.catalog.find(show, kind="tv")
+        if series is not None and self.catalog.has_episodes(series.imdb_id, season):
+            return series
+        return None
+
+    def episode_title(self, show, season, episode):
+        """Look up an episode title: offline catalog first, then the providers."""
+        series = self.offline_series(show, season)
+        if series is not None:
+            title = self.catalog.episode_title(series.imdb_id, season, episode)
+            if title:
+                return title
+
+        return self.race.first("episode_title", show, season, episode)
+
+    def movie(self, title, year=None):
+        """Look up a movie by title and optional year."""
+        if self.catalog is not None:
+            match = self.catalog.find(title, year, kind="movie")
+            if match is not None:
+                return {"Title": match.title, "Year": str(match.year or year or ""),
+                        "imdbID": match.imdb_id}
+        return self.race.first("movie", title, year)
+
+    def prefetch(self, parsed_items):
+        """
+        Fetch every distinct season listing and movie in parsed_items concurrently.
+        parsed_items are ParsedNames (e.g. a filename_parser.parse_many() batch); duplicates cost nothing.
+        Movies are only prefetched when their year is known.
+        """
+        groups = {}
+        offline = set()
+        for title, year, season, _, _ in parsed_items:
+            if season:
+                key = ("tv", normalize_title(title), int(season))
+                if key in groups or key in offline:
+                    continue
+                if self.offline_series(title, season) is not None:
+                    offline.add(key)
+                    continue
+                groups[key] = (self.season_listing, title, int(season))
+            elif title and year:
+                key = ("movie", normalize_title(title), year)
+                if key in groups or key in offline:
+                    continue
+                if self.catalog is not None and self.catalog.find(title, year, kind="movie"):
+                    offline.add(key)
+                    continue
+                groups[key] = (self.movie, title, year)
+        futures = [self.fetcher.submit(fn, *args) for fn, *args in groups.values()]
+        for future in futures:
+            future.result()
+        return len(groups)
+
+    def close(self):
+        self.race.close()
@@ -0,0 +1,40 @@
+import os
+import time
+
+from stats import STATS
+
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov')
+
+
+def iter_video_files(root, extensions=VIDEO_EXTENSIONS, onerror=None):
+    """
+    Yield video file paths under root using os.scandir, one directory at a time.
+    Nothing beyond the pending directory stack and one directory's listing is held in memory.
+    Like os.walk, unreadable directories are skipped and passed to onerror if given.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        start = time.perf_counter()
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(extensions) and entry.is_file():
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+        # Timed before yielding so the consumer's work isn't counted as walk time
+        STATS.observe("walk.dir", time.perf_counter() - start)
+        STATS.incr("walk.files", len(files))
+        yield from files
+        # Reverse so directories are visited in listing order
+        stack.extend(reversed(subdirs))
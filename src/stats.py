@@ -0,0 +1,154 @@
+# Pipeline instrumentation
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: 10µs .. 60s, roughly 2.5x apart
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative on export, like Prometheus)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding it."""
+        with self.lock:
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+                seen += count
+                if count and seen >= target:
+                    return min(bound, self.max)
+        return 0.0
+
+    def snapshot(self):
+        with self.lock:
+            count, total, peak = self.count, self.total, self.max
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "max": round(peak, 6),
+        }
+
+
+class Stats:
+    """
+    Process-wide stage timings and counters. Stages are dotted names such as "parse",
+    "walk.dir", "http.omdb" or "rename"; counters are plain names like "cache.hit".
+    Recording costs one perf_counter pair and a short lock, so it stays on in hot paths.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).observe(time.perf_counter() - start)
+
+    def incr(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started = time.time()
+
+    def snapshot(self):
+        with self.lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+        return {
+            "elapsed": round(time.time() - self.started, 3),
+            "stages": {stage: histograms[stage].snapshot() for stage in sorted(histograms)},
+            "counters": {name: counters[name] for name in sorted(counters)},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="filenom"):
+        """Render as Prometheus text exposition format."""
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        for stage, histogram in histograms:
+            with histogram.lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.total
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name, value in counters:
+            metric = f"{prefix}_{name.replace('.', '_')}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line summary for a status bar."""
+        with self.lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+        parts = []
+        for stage in ("walk.dir", "parse", "lookup", "rename"):
+            if stage in histograms and histograms[stage].count:
+                snap = histograms[stage].snapshot()
+                parts.append(f"{stage} {snap['count']}× {_ms(snap['mean'])}")
+        http = [(stage[5:], histograms[stage].snapshot()) for stage in sorted(histograms) if stage.startswith("http.")]
+        parts.extend(f"{name} {_ms(snap['mean'])}" for name, snap in http if snap["count"])
+        hits, misses = counters.get("cache.hit", 0), counters.get("cache.miss", 0)
+        if hits + misses:
+            parts.append(f"cache {hits / (hits + misses):.0%} hit")
+        return " · ".join(parts)
+
+
+def _ms(seconds):
+    return f"{seconds * 1e6:.0f}µs" if seconds < 1e-3 else f"{seconds * 1e3:.1f}ms"
+
+
+STATS = Stats()
@@ -1 +1,249 @@
-# Subtitle fetching 
+# Subtitle fetching
+import os
+import shutil
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import filename_parser
+from cache import make_key
+from hasher import HashIndex, opensubtitles_hash
+from stats import STATS
+
+SUBTITLE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "subtitle_cache")
+
+SUBTITLE_JOBS = 4          # Concurrent subtitle searches/downloads
+SUBTITLE_EXTENSIONS = (".srt", ".ass", ".ssa", ".sub", ".vtt")
+
+# file_id: the provider's id for the subtitle file; hash_match: found by the video's content hash
+SubtitleMatch = namedtuple("SubtitleMatch", ["provider", "file_id", "language", "release", "hash_match",
+                                             "downloads", "file_name"])
+
+
+class SubtitleCache:
+    """
+    Content-addressed subtitle store: files live under objects/ by SHA-256, and an SQLite
+    index maps each provider file id to its blob. A subtitle already fetched for an
+    earlier rip of the same title is copied from here instead of downloaded again.
+    """
+
+    def __init__(self, root=SUBTITLE_CACHE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS subtitle_files (
+                provider TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                PRIMARY KEY (provider, file_id)
+            )
+        """)
+        self._conn.commit()
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def get(self, provider, file_id):
+        """Return the cached blob path for a provider file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, ext FROM subtitle_files WHERE provider = ? AND file_id = ?", (provider, str(file_id))
+            ).fetchone()
+        if row is None:
+            return None
+        path = self.blob_path(*row)
+        return path if os.path.exists(path) else None
+
+    def put(self, provider, file_id, data, ext=".srt"):
+        """Store a downloaded subtitle and return its blob path. Identical content is stored once."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO subtitle_files (provider, file_id, digest, ext) VALUES (?, ?, ?, ?)",
+                (provider, str(file_id), digest, ext),
+            )
+            self._conn.commit()
+        return path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SubtitleProvider:
+    """A subtitle source. search() returns SubtitleMatches; download() returns the file's bytes."""
+
+    name = "none"
+
+    def search(self, file_hash, size, parsed, languages):
+        return []
+
+    def download(self, match):
+        return None
+
+
+class OpenSubtitlesProvider(SubtitleProvider):
+    """Subtitles from the OpenSubtitles REST API: search by moviehash, then by title/episode."""
+
+    name = "opensubtitles"
+    cache_prefix = "opensubtitles.subtitles"   # Search responses share the metadata cache with hasher's lookups
+
+    def __init__(self, fetcher, api_key, cache=None, user_agent="FileNom v1.0"):
+        self.fetcher = fetcher
+        self.api_key = api_key
+        self.cache = cache
+        self.headers = {"Api-Key": api_key, "User-Agent": user_agent}
+
+    def search(self, file_hash, size, parsed, languages):
+        languages = ",".join(sorted(languages))
+        matches = []
+        if file_hash:
+            matches = self._search(make_key(self.cache_prefix, file_hash) + "|" + languages,
+                                   {"moviehash": file_hash, "languages": languages})
+        found = {match.language for match in matches if match.hash_match}
+        if parsed is not None and parsed.title and not set(languages.split(",")) <= found:
+            params = {"query": parsed.title, "languages": languages}
+            if parsed.season:
+                params.update(season_number=int(parsed.season), episode_number=int(parsed.episode))
+            elif parsed.year:
+                params["year"] = parsed.year
+            key = make_key(self.cache_prefix, parsed.title, parsed.year, parsed.season, parsed.episode) + "|" + languages
+            matches += self._search(key, params)
+        return matches
+
+    def _search(self, key, params):
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            data = self.fetcher.get_json(self.name, "/subtitles", params=params, headers=self.headers)
+            if data is None:
+                return []
+            if self.cache is not None:
+                self.cache.put(key, data, negative=not data.get("data"))
+        matches = []
+        for item in data.get("data", []):
+            attributes = item.get("attributes", {})
+            for file in attributes.get("files", [])[:1]:
+                matches.append(SubtitleMatch(
+                    self.name, file["file_id"], attributes.get("language"), attributes.get("release", ""),
+                    bool(attributes.get("moviehash_match")), attributes.get("download_count", 0),
+                    file.get("file_name") or "",
+                ))
+        return matches
+
+    def download(self, match):
+        data = self.fetcher.get_json(self.name, "/download", method="POST", json={"file_id": match.file_id},
+                                     headers=self.headers)
+        if not data or not data.get("link"):
+            return None
+        response = self.fetcher.get(self.name, data["link"])
+        return response.content if response.status_code == 200 else None
+
+
+SUBTITLE_PROVIDERS = {"opensubtitles": OpenSubtitlesProvider}
+
+
+def best_matches(matches, languages):
+    """Pick one subtitle per language: hash matches first, then the most downloaded."""
+    best = {}
+    for match in matches:
+        if match.language not in languages:
+            continue
+        current = best.get(match.language)
+        if current is None or (match.hash_match, match.downloads) > (current.hash_match, current.downloads):
+            best[match.language] = match
+    return best
+
+
+class SubtitlePipeline:
+    """
+    Post-rename subtitle stage. submit() queues a video and returns at once; a bounded
+    pool hashes it (through the HashIndex, so renamed files aren't re-read), searches,
+    and writes "<video stem>.<language><ext>" beside it, taking the file from the
+    SubtitleCache when it was downloaded before. Renames never wait on subtitles.
+    """
+
+    def __init__(self, provider, cache=None, languages=("en",), jobs=SUBTITLE_JOBS, hash_index=None):
+        self.provider = provider
+        self.cache = cache if cache is not None else SubtitleCache()
+        self.languages = tuple(languages)
+        self.hash_index = hash_index if hash_index is not None else HashIndex()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="subtitles")
+
+    def submit(self, video_path):
+        """Queue a video; the Future resolves to its result record (see fetch())."""
+        return self.pool.submit(self.fetch, video_path)
+
+    def fetch(self, video_path):
+        """
+        Fetch subtitles for one video.
+        Returns: {"path", "subtitle_status", "subtitles": {language: path}} where the status is
+        "downloaded", "cached", "exists", "none" or "error" (with "error").
+        """
+        record = {"path": video_path, "subtitles": {}}
+        stem = os.path.splitext(video_path)[0]
+        wanted = [lang for lang in self.languages if not _sidecar_exists(stem, lang)]
+        if not wanted:
+            record["subtitle_status"] = "exists"
+            return record
+        try:
+            with STATS.timer("subtitles"):
+                record["subtitle_status"] = self._fetch(video_path, stem, wanted, record["subtitles"])
+        except Exception as e:
+            record.update(subtitle_status="error", error=str(e))
+        STATS.incr(f"subtitles.{record['subtitle_status']}")
+        return record
+
+    def _fetch(self, video_path, stem, languages, written):
+        file_hash, size = self._hash(video_path)
+        parsed = filename_parser.parse(os.path.basename(stem))
+        matches = best_matches(self.provider.search(file_hash, size, parsed, languages), languages)
+        status = "none"
+        for language, match in sorted(matches.items()):
+            blob = self.cache.get(match.provider, match.file_id)
+            if blob is not None:
+                status = "cached" if status == "none" else status
+            else:
+                data = self.provider.download(match)
+                if not data:
+                    continue
+                ext = os.path.splitext(match.file_name)[1].lower()
+                blob = self.cache.put(match.provider, match.file_id, data,
+                                      ext if ext in SUBTITLE_EXTENSIONS else ".srt")
+                status = "downloaded"
+            target = f"{stem}.{language}{os.path.splitext(blob)[1]}"
+            shutil.copyfile(blob, target)
+            written[language] = target
+        return status
+
+    def _hash(self, video_path):
+        st = os.stat(video_path)
+        file_hash = self.hash_index.get(st)
+        if file_hash is None:
+            file_hash = opensubtitles_hash(video_path)
+            if file_hash is not None:
+                self.hash_index.put_many([(st, file_hash)])
+        return file_hash, st.st_size
+
+    def close(self):
+        """Wait for running fetches; queued ones that haven't started are dropped."""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.cache.close()
+        self.hash_index.close()
+
+
+def _sidecar_exists(stem, language):
+    return any(os.path.exists(f"{stem}.{language}{ext}") for ext in SUBTITLE_EXTENSIONS)
@@ -0,0 +1,169 @@
+# Naming templates
+"""
+Naming templates turn metadata into a file name, e.g.
+
+    {Title} - S{Season:02d}E{Episode:02d}< - {EpisodeTitle}>{Extension}
+    {Title}/Season {Season:02d}/{Title} - {Season}x{Episode:02d}{Extension}
+
+{Field} or {Field:spec} inserts a field using a str.format spec. Text in <...> is kept only
+if every field inside it has a value, so "< ({Year})>" disappears when the year is
+unknown; a field outside <...> with no value is left empty. "/" starts a new directory.
+{{ and }} are literal braces.
+
+Fields: Title, Year, Season, Episode, EpisodeTitle, Quality, Extension, Original.
+"""
+import re
+
+from filename_parser import quality
+
+FIELDS = ("Title", "Year", "Season", "Episode", "EpisodeTitle", "Quality", "Extension", "Original")
+
+# A value of each field's type (see fields_for), used to check format specs when a template is compiled
+SAMPLE_VALUES = {"Title": "Title", "Year": 2000, "Season": 1, "Episode": 1, "EpisodeTitle": "Episode",
+                 "Quality": "1080p", "Extension": ".mkv", "Original": "Original"}
+
+DEFAULT_TV_TEMPLATE = "{Title} - S{Season:02d}E{Episode:02d}< - {EpisodeTitle}>{Extension}"
+DEFAULT_MOVIE_TEMPLATE = "{Title}< ({Year})>{Extension}"
+
+TOKEN_PATTERN = re.compile(r"\{\{|\}\}|\{(?P<field>\w+)(?::(?P<spec>[^{}]*))?\}|(?P<open><)|(?P<close>>)|(?P<sep>/)|[{}]")
+
+# Characters that can't appear in a file name on common filesystems
+UNSAFE_PATTERN = re.compile(r'[\\/:*?"<>|]')
+UNSAFE_CHARS = str.maketrans({"/": "-", "\\": "-", ":": " -", "*": "", "?": "", '"': "'", "<": "", ">": "", "|": "-"})
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _text(value):
+    """Filesystem-safe text, or None for a missing value."""
+    if value is None or value == "":
+        return None
+    value = str(value)
+    if UNSAFE_PATTERN.search(value) is None:
+        return value
+    return " ".join(value.translate(UNSAFE_CHARS).split())
+
+
+def _number(value, digits=None):
+    """Int for numeric format specs (years like "2010-2013" keep their first digits), or None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value[:digits] if digits else value)
+    except ValueError:
+        return None
+
+
+class NameTemplate:
+    """
+    A pattern parsed once and compiled into a single Python function. format() is
+    then one function call per record, with no parsing or branching on the pattern.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.fields = set()
+        source = self._compile(pattern)
+        namespace = {}
+        exec(f"def render(v):\n    return {source}\n", namespace)
+        self._render = namespace["render"]
+
+    def _compile(self, pattern):
+        """Translate the pattern into a Python expression over the field dict v."""
+        # Each open <...> group collects (parts, fields) until its closing >
+        stack = [([], set())]
+        position = 0
+        for match in TOKEN_PATTERN.finditer(pattern):
+            if match.start() > position:
+                stack[-1][0].append(repr(pattern[position:match.start()]))
+            position = match.end()
+            token = match.group(0)
+            if token in ("{{", "}}"):
+                stack[-1][0].append(repr(token[0]))
+            elif match.group("field"):
+                field = match.group("field")
+                if field not in FIELDS:
+                    raise TemplateError(f"Unknown field {{{field}}} in template {pattern!r}")
+                self.fields.add(field)
+                stack[-1][1].add(field)
+                spec = match.group("spec")
+                if spec:
+                    try:
+                        format(SAMPLE_VALUES[field], spec)
+                    except (TypeError, ValueError) as e:
+                        raise TemplateError(f"Bad format spec {{{field}:{spec}}} in template {pattern!r}: {e}")
+                value = f"format(v[{field!r}], {spec!r})" if spec else f"str(v[{field!r}])"
+                # Inside <...> the group is dropped when the field is missing; elsewhere it is left empty
+                stack[-1][0].append(f"('' if v[{field!r}] is None else {value})")
+            elif match.group("open"):
+                stack.append(([], set()))
+            elif match.group("close"):
+                if len(stack) == 1:
+                    raise TemplateError(f"Unmatched '>' in template {pattern!r}")
+                parts, fields = stack.pop()
+                condition = " and ".join(f"v[{field!r}] is not None" for field in sorted(fields)) or "True"
+                stack[-1][0].append(f"(({' + '.join(parts) or repr('')}) if {condition} else '')")
+                stack[-1][1].update(fields)
+            elif match.group("sep"):
+                stack[-1][0].append("'/'")
+            else:
+                raise TemplateError(f"Unmatched '{token}' in template {pattern!r}")
+        if len(stack) != 1:
+            raise TemplateError(f"Unclosed '<' in template {pattern!r}")
+        if position < len(pattern):
+            stack[0][0].append(repr(pattern[position:]))
+        return " + ".join(stack[0][0]) or repr("")
+
+    def format(self, values):
+        """
+        Render a dict of field values (see fields_for). Missing fields are None.
+        Returns a relative path using "/" between directories.
+        """
+        try:
+            return self._render(values)
+        except (TypeError, ValueError) as e:
+            raise TemplateError(f"Cannot format {self.pattern!r}: {e}") from None
+
+    def __repr__(self):
+        return f"NameTemplate({self.pattern!r})"
+
+
+def fields_for(title, year=None, season=None, episode=None, episode_title=None, ext="", original="",
+               fields=FIELDS):
+    """
+    Build the field dict for NameTemplate.format(). Text values are made filesystem-safe;
+    Year/Season/Episode become ints so they take numeric format specs. Quality and
+    Original are only filled in when the template uses them (listed in fields).
+    """
+    return {
+        "Title": _text(title),
+        "Year": _number(year, 4),
+        "Season": _number(season),
+        "Episode": _number(episode),
+        "EpisodeTitle": _text(episode_title),
+        "Quality": quality(original) if original and "Quality" in fields else None,
+        "Extension": ext,
+        "Original": _text(original) if "Original" in fields else None,
+    }
+
+
+class NamingScheme:
+    """The TV and movie templates used together, as configured in config.json."""
+
+    def __init__(self, tv_template=DEFAULT_TV_TEMPLATE, movie_template=DEFAULT_MOVIE_TEMPLATE):
+        self.tv = NameTemplate(tv_template)
+        self.movie = NameTemplate(movie_template)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("tv_template") or DEFAULT_TV_TEMPLATE,
+                   config.get("movie_template") or DEFAULT_MOVIE_TEMPLATE)
+
+    def format(self, title, year=None, season=None, episode=None, episode_title=None, ext="", original=""):
+        """Render with the TV template when season/episode are known, else the movie template."""
+        template = self.tv if season not in (None, "") and episode not in (None, "") else self.movie
+        return template.format(fields_for(title, year, season, episode, episode_title, ext, original, template.fields))
@@ -0,0 +1,192 @@
+# Download folder watcher
+import os
+import time
+import threading
+
+from scanner import VIDEO_EXTENSIONS, iter_video_files
+
+SETTLE_SECONDS = 10.0   # A file must keep the same size and mtime this long before it is processed
+BATCH_WINDOW = 3.0      # Ready files are held this long for more arrivals before a batch is emitted
+POLL_INTERVAL = 2.0     # Directory polling interval when watchdog is not installed
+TICK = 0.5
+IGNORE_SECONDS = 60.0   # Events for files we just renamed ourselves are ignored this long
+
+
+def _watchdog_observer(watcher):
+    """Return a watchdog Observer feeding watcher.notify(), or None if watchdog isn't installed."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:  # Optional: fall back to polling directory mtimes
+        return None
+
+    class EventHandler(FileSystemEventHandler):
+        def on_created(self, event):
+            watcher.notify(event.src_path, event.is_directory)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                watcher.notify(event.src_path)
+
+        def on_moved(self, event):
+            watcher.notify(event.dest_path, event.is_directory)
+
+    observer = Observer()
+    handler = EventHandler()
+    for path in watcher.paths:
+        observer.schedule(handler, path, recursive=True)
+    return observer
+
+
+class DownloadWatcher:
+    """
+    Watches directories for new video files and hands them out in batches.
+
+    Events come from watchdog (inotify/FSEvents/ReadDirectoryChangesW) when it is installed;
+    otherwise directories are polled, and only directories whose mtime changed are listed.
+    A file counts as finished once its size and mtime have been stable for `settle` seconds,
+    so downloads and unpacks still in progress are left alone. Finished files are grouped
+    for `batch_window` seconds so a season pack is resolved and renamed in one cycle.
+    """
+
+    def __init__(self, paths, extensions=VIDEO_EXTENSIONS, settle=SETTLE_SECONDS,
+                 batch_window=BATCH_WINDOW, poll_interval=POLL_INTERVAL, use_watchdog=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.extensions = extensions
+        self.settle = settle
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.candidates = {}    # path -> (size, mtime_ns, last_change)
+        self.ready = []
+        self.ready_since = None
+        self.ignored = {}       # path -> expiry
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.dir_mtimes = {}
+        self.observer = _watchdog_observer(self) if use_watchdog else None
+        if self.observer is None:
+            for path in self.paths:
+                self._poll_tree(path, notify=False)
+        self.last_poll = time.monotonic()
+
+    @property
+    def backend(self):
+        return "watchdog" if self.observer is not None else "polling"
+
+    def start(self):
+        if self.observer is not None:
+            self.observer.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+    def notify(self, path, is_directory=False):
+        """Register a created/changed path. Directories (moved-in folders) are walked once."""
+        if is_directory:
+            for file_path in iter_video_files(path, self.extensions):
+                self.notify(file_path)
+            return
+        if not path.lower().endswith(self.extensions):
+            return
+        with self.lock:
+            if path in self.ignored or path in self.ready:
+                return
+            self.candidates.setdefault(path, (None, None, time.monotonic()))
+
+    def ignore(self, paths):
+        """Don't treat these paths (e.g. our own rename targets) as new arrivals."""
+        expiry = time.monotonic() + IGNORE_SECONDS
+        with self.lock:
+            for path in paths:
+                self.ignored[os.path.abspath(path)] = expiry
+                self.candidates.pop(os.path.abspath(path), None)
+
+    def _poll_tree(self, root, notify=True):
+        """
+        Stat every directory under root; list only those whose mtime changed and notify
+        files that weren't there on the previous listing.
+        """
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                self.dir_mtimes.pop(directory, None)
+                continue
+            known = self.dir_mtimes.get(directory)
+            if known is not None and known[0] == mtime:
+                stack.extend(known[1])
+                continue
+            previous = known[2] if known is not None else set()
+            subdirs = []
+            files = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                                files.add(entry.name)
+                                if notify and entry.name not in previous:
+                                    self.notify(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            if known is not None:
+                for removed in set(known[1]) - set(subdirs):
+                    self._forget(removed)
+            self.dir_mtimes[directory] = (mtime, subdirs, files)
+            stack.extend(subdirs)
+
+    def _forget(self, directory):
+        prefix = directory + os.sep
+        for path in [path for path in self.dir_mtimes if path == directory or path.startswith(prefix)]:
+            del self.dir_mtimes[path]
+
+    def _check(self, now):
+        """Promote candidates whose size and mtime have stopped changing."""
+        with self.lock:
+            items = list(self.candidates.items())
+            self.ignored = {path: expiry for path, expiry in self.ignored.items() if expiry > now}
+        settled = []
+        for path, (size, mtime, last_change) in items:
+            try:
+                st = os.stat(path)
+            except OSError:
+                with self.lock:
+                    self.candidates.pop(path, None)
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                with self.lock:
+                    if path in self.candidates:
+                        self.candidates[path] = (st.st_size, st.st_mtime_ns, now)
+            elif st.st_size > 0 and now - last_change >= self.settle:
+                settled.append(path)
+        if settled:
+            with self.lock:
+                for path in settled:
+                    self.candidates.pop(path, None)
+                self.ready.extend(settled)
+                self.ready_since = now
+
+    def batches(self):
+        """Yield lists of finished files until stop() is called."""
+        while not self.stopped.wait(TICK):
+            now = time.monotonic()
+            if self.observer is None and now - self.last_poll >= self.poll_interval:
+                for path in self.paths:
+                    self._poll_tree(path)
+                self.last_poll = now
+            self._check(now)
+            with self.lock:
+                if not self.ready or now - self.ready_since < self.batch_window:
+                    continue
+                batch, self.ready = sorted(self.ready), []
+            yield batch
@@ -0,0 +1,111 @@
+import time
+import threading
+from itertools import islice
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QPixmap
+
+EMIT_INTERVAL = 0.05   # Seconds between batched UI updates
+CHUNK_SIZE = 64        # Items handed to the executor at a time
+
+
+class JobSignals(QObject):
+    """Signals emitted by a BatchJob. Connected slots run on the UI thread."""
+    batch = pyqtSignal(list)        # [(item, result), ...]
+    progress = pyqtSignal(int)      # items processed so far
+    error = pyqtSignal(str)
+    finished = pyqtSignal(bool)     # True if the job was cancelled
+
+
+class BatchJob(QRunnable):
+    """
+    Runs fn over items off the UI thread and emits (item, result) pairs in batches
+    at most every EMIT_INTERVAL seconds, so the event loop never sees one signal per file.
+    items may be a lazy generator (e.g. a directory walk).
+    """
+
+    def __init__(self, items, fn, executor=None, before_chunk=None,
+                 emit_interval=EMIT_INTERVAL, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.items = items
+        self.fn = fn
+        self.executor = executor
+        self.before_chunk = before_chunk
+        self.emit_interval = emit_interval
+        self.chunk_size = chunk_size
+        self.signals = JobSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Ask the job to stop after the current item."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        pending = []
+        done = 0
+        last_emit = time.monotonic()
+        iterator = iter(self.items)
+        try:
+            while not self.cancelled:
+                chunk = list(islice(iterator, self.chunk_size))
+                if not chunk:
+                    break
+                if self.before_chunk is not None:
+                    self.before_chunk(chunk)
+                results = self.executor.map(self.fn, chunk) if self.executor else map(self.fn, chunk)
+                for item, result in zip(chunk, results):
+                    pending.append((item, result))
+                    done += 1
+                    now = time.monotonic()
+                    if now - last_emit >= self.emit_interval:
+                        self.signals.batch.emit(pending)
+                        self.signals.progress.emit(done)
+                        pending = []
+                        last_emit = now
+                    if self.cancelled:
+                        break
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            if pending:
+                self.signals.batch.emit(pending)
+            self.signals.progress.emit(done)
+            self.signals.finished.emit(self.cancelled)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Poster thumbnails for table rows, loaded on demand. icon() returns a file's thumbnail
+    once it's loaded and otherwise queues it on the ArtworkFetcher's pool. Views only ask
+    for the rows they paint, so scrolling drives the loading; pixmaps are kept per title.
+    """
+    ready = pyqtSignal(str, str)   # poster key, thumbnail path ("" if there is none)
+    changed = pyqtSignal()         # a thumbnail finished loading
+
+    def __init__(self, artwork, parent=None):
+        super().__init__(parent)
+        self.artwork = artwork
+        self.pixmaps = {}   # poster key -> QPixmap, or None while loading / when there's no poster
+        self.ready.connect(self._loaded)
+
+    def icon(self, name):
+        key = self.artwork.poster_key(name)
+        if key is None:
+            return None
+        if key not in self.pixmaps:
+            self.pixmaps[key] = None
+            # Emitted from the pool's thread; Qt queues the slot onto this object's (UI) thread
+            self.artwork.submit(name).add_done_callback(
+                lambda future: self.ready.emit(key, "" if future.cancelled() or future.exception()
+                                               else future.result() or "")
+            )
+        return self.pixmaps[key]
+
+    def _loaded(self, key, path):
+        if path:
+            self.pixmaps[key] = QPixmap(path)
+            self.changed.emit()
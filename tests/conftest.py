@@ -0,0 +1,8 @@
+# Test setup: the modules live flat in src/ (as when running main.py or gui.py); the
+# synthetic name corpus is shared with the benchmarks
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
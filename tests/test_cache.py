@@ -0,0 +1,87 @@
+# Metadata cache: expiry and eviction
+import pytest
+
+import cache
+from cache import MetadataCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = MetadataCache(str(tmp_path / "cache.db"), ttl=100, negative_ttl=10, max_entries=10, memory_size=4)
+    yield store
+    store.close()
+
+
+def reopened(store):
+    """The same database without the in-memory LRU, so reads come from disk."""
+    return MetadataCache(store.path, ttl=store.ttl, negative_ttl=store.negative_ttl,
+                         max_entries=store.max_entries, memory_size=store.memory_size)
+
+
+def test_make_key_normalizes():
+    assert make_key("OMDb", "The.Office", None, "02", "1") == make_key("omdb", "the office", None, 2, 1)
+
+
+def test_positive_entry_expires_after_ttl(store, clock):
+    store.put("k", {"Title": "Heat"})
+    clock.now += 99
+    assert store.get("k") == {"Title": "Heat"}
+    assert reopened(store).get("k") == {"Title": "Heat"}
+    clock.now += 2
+    assert store.get("k") is None
+    assert reopened(store).get("k") is None
+
+
+def test_negative_entry_expires_after_negative_ttl(store, clock):
+    store.put("k", {"Response": "False"}, negative=True)
+    clock.now += 9
+    assert store.get("k") == {"Response": "False"}
+    clock.now += 2
+    assert store.get("k") is None
+    assert reopened(store).get("k") is None
+
+
+def test_replacing_an_entry_resets_its_expiry(store, clock):
+    store.put("k", {"Response": "False"}, negative=True)
+    clock.now += 5
+    store.put("k", {"Title": "Heat"})
+    clock.now += 50
+    assert store.get("k") == {"Title": "Heat"}
+
+
+def test_eviction_drops_expired_then_oldest(store, clock):
+    store.put("stale", {}, negative=True)
+    clock.now += 20   # "stale" has expired
+    for i in range(10):
+        store.put(f"k{i}", {"i": i})
+        clock.now += 1
+    # 11 rows > max_entries: the expired row goes first, which is enough
+    assert store._count == 10
+    store.put("k10", {"i": 10})
+    # Still over the limit with nothing expired: the oldest 10% (plus the excess) go
+    disk = reopened(store)
+    assert disk.get("k0") is None and disk.get("k1") is None
+    assert disk.get("k2") == {"i": 2} and disk.get("k10") == {"i": 10}
+    assert store._count <= store.max_entries
+
+
+def test_memory_lru_is_bounded(store):
+    for i in range(10):
+        store.put(f"k{i}", {"i": i})
+    assert list(store._memory) == ["k6", "k7", "k8", "k9"]
+    assert store.get("k0") == {"i": 0}   # still on disk
@@ -0,0 +1,81 @@
+# Settings (config.json)
+import json
+
+import pytest
+
+import config
+from cache import MetadataCache, DEFAULT_TTL
+from config import ConfigError, ConfigStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "config.json"
+
+
+def write(path, values):
+    path.write_text(values if isinstance(values, str) else json.dumps(values))
+
+
+def test_cached_until_the_file_changes(path, monkeypatch):
+    monkeypatch.setattr(config, "RELOAD_INTERVAL", 0)
+    write(path, {"cache_ttl": 60})
+    store = ConfigStore(path)
+    settings = store.get()
+    assert store.get() is settings
+    write(path, {"cache_ttl": 120, "tv_template": "{Title}{Extension}"})
+    assert store.get().cache_ttl == 120.0
+
+
+def test_invalid_edit_keeps_previous_settings(path, monkeypatch):
+    monkeypatch.setattr(config, "RELOAD_INTERVAL", 0)
+    write(path, {"cache_ttl": 60})
+    store = ConfigStore(path)
+    settings = store.get()
+    write(path, "{not json")
+    assert store.get() is settings
+    with pytest.raises(ConfigError):
+        ConfigStore(path).get()
+
+
+def test_null_means_default(path):
+    write(path, {"cache_ttl": None, "tmdb_api_key": None})
+    settings = ConfigStore(path).get()
+    assert settings.get("cache_ttl", DEFAULT_TTL) == DEFAULT_TTL
+    assert settings.tmdb_api_key == ""
+    assert MetadataCache.from_config(settings, ":memory:").ttl == DEFAULT_TTL
+
+
+def test_save_keeps_other_keys(path):
+    write(path, {"OMDB_API_KEY": "abc", "extra": 1})
+    store = ConfigStore(path)
+    settings = store.save(tmdb_api_key="t")
+    assert json.loads(path.read_text()) == {"extra": 1, "omdb_api_key": "abc", "tmdb_api_key": "t"}
+    assert store.get() is settings
+
+
+@pytest.mark.parametrize("contents", ["{not json", '{"cache_ttl": "x", "omdb_api_key": "abc"}', "[]"])
+def test_save_over_invalid_file(path, contents):
+    write(path, contents)
+    ConfigStore(path).save(tmdb_api_key="t")
+    saved = json.loads(path.read_text())
+    assert saved["tmdb_api_key"] == "t" and "cache_ttl" not in saved
+    assert (path.parent / "config.json.bak").read_text() == contents
+
+
+def test_save_keeps_malformed_file_contents(path):
+    contents = '{"omdb_api_key": "abc", "tmdb_api_key": "secret",}'   # trailing comma
+    write(path, contents)
+    ConfigStore(path).save(simkl_api_key="k")
+    assert (path.parent / "config.json.bak").read_text() == contents
+    assert json.loads(path.read_text()) == {"simkl_api_key": "k"}
+
+
+def test_save_over_valid_file_makes_no_backup(path):
+    write(path, {"omdb_api_key": "abc"})
+    ConfigStore(path).save(tmdb_api_key="t")
+    assert not (path.parent / "config.json.bak").exists()
+
+
+def test_default_path_is_next_to_the_module():
+    assert config.store().path == config.CONFIG_PATH
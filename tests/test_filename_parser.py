@@ -0,0 +1,65 @@
+# Filename parser: golden corpus and the batch API
+import pickle
+
+import pytest
+
+from corpus import make_corpus
+from filename_parser import ParsedName, parse_many, parse_path
+
+# name -> (title, year, season, episode, episode_title)
+GOLDEN = [
+    # TV: SxxEyy and NxNN, scene and plain
+    ("The Office S02E01.mkv", ("The Office", None, "02", "01", None)),
+    ("The.Office.S02E01.720p.HDTV.x264-NTb.mkv", ("The Office", None, "02", "01", None)),
+    ("Breaking.Bad.S01E02.Pilot.1080p.mkv", ("Breaking Bad", None, "01", "02", None)),
+    ("Breaking.Bad S03E07 720p WEBRip.mp4", ("Breaking Bad", None, "03", "07", None)),
+    ("Game_of_Thrones 3x09 HDTV.avi", ("Game of Thrones", None, "3", "09", None)),
+    ("[eztv]Doctor Who S12E03 720p.mkv", ("Doctor Who", None, "12", "03", None)),
+    ("The Expanse - S04E10 - Cibola Burn.mkv", ("The Expanse", None, "04", "10", "Cibola Burn")),
+    ("Mr. Robot S01E01 - eps1.0_hellofriend.mov", ("Mr. Robot", None, "01", "01", "eps1.0_hellofriend")),
+    ("The 100 S01E01.mkv", ("The 100", None, "01", "01", None)),
+    # TV: "102"-style numbering (season 1, episode 02), only with a show-like context
+    ("Some Show 315 HDTV.avi", ("Some Show", None, "3", "15", None)),
+    ("Some.Show.102.HDTV.x264-LOL.mkv", ("Some Show", None, "1", "02", None)),
+    ("Some Show 102 - Pilot.mkv", ("Some Show", None, "1", "02", "Pilot")),
+    # Movies: bare, dotted and bracketed years
+    ("Inception 2010 1080p BluRay x264-YIFY.mkv", ("Inception", 2010, None, None, None)),
+    ("Heat.1995.1080p.BluRay.x264-YIFY.mkv", ("Heat", 1995, None, None, None)),
+    ("Heat (1995).mkv", ("Heat", 1995, None, None, None)),
+    ("Heat (1995) [1080p].mkv", ("Heat", 1995, None, None, None)),
+    ("Ocean's 11 (2001).mkv", ("Ocean's 11", 2001, None, None, None)),
+    ("Blade Runner 2049 (2017).mkv", ("Blade Runner 2049", 2017, None, None, None)),
+    ("2001 A Space Odyssey 1968.mkv", ("2001 A Space Odyssey", 1968, None, None, None)),
+    ("Some Movie 2001 1080p Extended.mkv", ("Some Movie", 2001, None, None, None)),
+    ("Spirited Away 2001 [YTS].mp4", ("Spirited Away", 2001, None, None, None)),
+    ("The Matrix.mkv", ("The Matrix", None, None, None, None)),
+    ("1917.mkv", ("1917", None, None, None, None)),
+    # Movies whose titles end in a three-digit number
+    ("Fahrenheit 451.mkv", ("Fahrenheit 451", None, None, None, None)),
+    ("Fahrenheit.451.1080p.BluRay.x264-YIFY.mkv", ("Fahrenheit 451", None, None, None, None)),
+    ("Fahrenheit 451 (1966).mkv", ("Fahrenheit 451", 1966, None, None, None)),
+    ("Room 237.mkv", ("Room 237", None, None, None, None)),
+    ("Room 237 2012 720p.mkv", ("Room 237", 2012, None, None, None)),
+    ("Show 102.mkv", ("Show 102", None, None, None, None)),
+    # Not a video extension: the dot is part of the name
+    ("Dr. Strangelove 1964", ("Dr. Strangelove", 1964, None, None, None)),
+    # Nothing to parse
+    ("(1995).mkv", (None, None, None, None, None)),
+    ("[YTS].mkv", (None, None, None, None, None)),
+]
+
+
+@pytest.mark.parametrize("name, expected", GOLDEN, ids=[name for name, _ in GOLDEN])
+def test_golden(name, expected):
+    assert parse_path(name) == ParsedName(*expected)
+
+
+def test_parse_many_matches_parse_path():
+    """parse_many() must agree with parse_path() on every name, before and after pickling."""
+    paths = [name for name, _ in GOLDEN] + [name + ".mkv" for name in make_corpus(2000, seed=1)]
+    batch = parse_many(paths)
+    restored = pickle.loads(pickle.dumps(batch))
+    assert len(batch) == len(paths)
+    for i, path in enumerate(paths):
+        assert batch[i] == restored[i] == parse_path(path), path
+    assert list(batch) == [parse_path(path) for path in paths]
@@ -0,0 +1,70 @@
+# Metadata fetcher: retries and Retry-After
+import time
+from email.utils import formatdate
+
+import pytest
+
+import imdb_fetcher
+from imdb_fetcher import MetadataFetcher, retry_after_seconds
+
+
+class Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+
+class Session:
+    """Stands in for a requests.Session, answering with the given responses in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, *args, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(imdb_fetcher.time, "sleep", waits.append)
+    return waits
+
+
+def fetcher(*responses):
+    fetcher = MetadataFetcher(concurrency=1, backoff=0.5, max_backoff=30)
+    fetcher.sessions["omdb"] = Session(*responses)
+    return fetcher
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0), (" 3 ", 3.0), (None, None), ("", None), ("soon", None), ("-5", None),
+])
+def test_retry_after_seconds(value, expected):
+    assert retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date():
+    now = time.time()
+    assert retry_after_seconds(formatdate(now + 60, usegmt=True), now=now) == pytest.approx(60, abs=1)
+    assert retry_after_seconds(formatdate(now - 60, usegmt=True), now=now) == 0.0
+
+
+def test_short_retry_after_is_honoured(sleeps):
+    f = fetcher(Response(429, "2"), Response(200))
+    assert f.request("GET", "omdb").status_code == 200
+    assert sleeps == [2.0]
+
+
+def test_long_retry_after_fails_without_waiting(sleeps):
+    f = fetcher(Response(503, "86400"), Response(200))
+    assert f.request("GET", "omdb").status_code == 503
+    assert sleeps == [] and f.sessions["omdb"].calls == 1
+
+
+def test_unparseable_retry_after_uses_backoff(sleeps):
+    f = fetcher(Response(429, "Wed, 99 Foo"), Response(429), Response(200))
+    assert f.request("GET", "omdb").status_code == 200
+    assert sleeps == [0.5, 1.0]
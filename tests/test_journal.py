@@ -0,0 +1,90 @@
+# Job journal: reconciling renames interrupted by a crash
+import os
+import shutil
+
+import pytest
+
+from journal import DONE, RESOLVED, JobJournal
+from planner import TEMP_SUFFIX
+
+
+@pytest.fixture
+def job(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    yield journal.start("test", {})
+    journal.close()
+
+
+@pytest.fixture
+def files(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    source = library / "a.mkv"
+    source.write_bytes(b"video" * 100)
+    return str(source), str(library / "b.mkv")
+
+
+def interrupted(job, source, target):
+    """Journal source -> target as mid-rename, as rename_chunk() does before moving it."""
+    job.begin_renames([(source, target)])
+
+
+def test_untouched_source_is_planned_again(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    assert job.recover() == []
+    assert job.state(source)[0] == RESOLVED
+
+
+def test_link_without_unlink_finishes_the_rename(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    os.link(source, target)
+    assert job.recover() == [(source, target)]
+    assert not os.path.exists(source) and os.path.exists(target)
+    assert job.state(source) == (DONE, target)
+
+
+def test_staged_temp_is_moved_back(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    os.rename(source, source + ".1a2b3c4d" + TEMP_SUFFIX)
+    assert job.recover() == []
+    assert os.listdir(os.path.dirname(source)) == ["a.mkv"]
+    assert job.state(source)[0] == RESOLVED
+
+
+def test_staged_temp_linked_to_target_finishes_the_rename(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    temp = source + ".1a2b3c4d" + TEMP_SUFFIX
+    os.rename(source, temp)
+    os.link(temp, target)
+    assert job.recover() == [(source, target)]
+    assert os.listdir(os.path.dirname(source)) == ["b.mkv"]
+
+
+def test_partial_copy_is_removed_and_retried(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    with open(target + TEMP_SUFFIX, "wb") as f:
+        f.write(b"vid")
+    assert job.recover() == []
+    assert os.listdir(os.path.dirname(source)) == ["a.mkv"]
+    assert job.state(source)[0] == RESOLVED
+
+
+def test_complete_copy_finishes_the_unlink(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    shutil.copy2(source, target)
+    assert job.recover() == [(source, target)]
+    assert os.listdir(os.path.dirname(source)) == ["b.mkv"]
+
+
+def test_missing_file_is_an_error(job, files):
+    source, target = files
+    interrupted(job, source, target)
+    os.unlink(source)
+    assert job.recover() == []
+    assert job.state(source)[0] == DONE
@@ -0,0 +1,90 @@
+# Library index: incremental scans
+import os
+
+import pytest
+
+from library_index import LibraryIndex
+
+
+def settle(directory):
+    """Backdate a directory's mtime, so the next change to it is seen whatever the clock granularity."""
+    os.utime(directory, ns=(10**18, 10**18))
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LibraryIndex(str(tmp_path / "index.db"))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "library"
+    (root / "Show").mkdir(parents=True)
+    (root / "Movie.2010.mkv").write_bytes(b"movie")
+    (root / "Show" / "Show.S01E01.mkv").write_bytes(b"episode")
+    (root / "notes.txt").write_text("not a video")
+    settle(root / "Show")
+    settle(root)
+    return root
+
+
+def scan(index, root):
+    return sorted(os.path.relpath(path, root) for path in index.scan(str(root)))
+
+
+def test_first_scan_yields_every_video(index, library):
+    assert scan(index, library) == ["Movie.2010.mkv", os.path.join("Show", "Show.S01E01.mkv")]
+    assert index.stats["dirs_listed"] == 2
+
+
+def test_unprocessed_files_are_yielded_again(index, library):
+    scan(index, library)
+    assert scan(index, library) == ["Movie.2010.mkv", os.path.join("Show", "Show.S01E01.mkv")]
+    assert index.stats["dirs_skipped"] == 2
+
+
+def test_processed_files_in_unchanged_directories_are_skipped(index, library):
+    for path in index.scan(str(library)):
+        index.mark_processed(path, {"title": os.path.basename(path)})
+    assert scan(index, library) == []
+    assert index.stats == {"dirs_listed": 0, "dirs_skipped": 2, "files_unchanged": 0, "files_pending": 0}
+
+
+def test_new_file_in_changed_directory_is_yielded(index, library):
+    for path in index.scan(str(library)):
+        index.mark_processed(path, {})
+    (library / "Show" / "Show.S01E02.mkv").write_bytes(b"episode 2")
+    assert scan(index, library) == [os.path.join("Show", "Show.S01E02.mkv")]
+    assert index.stats["dirs_listed"] == 1
+    assert index.stats["files_unchanged"] == 1
+
+
+def test_modified_file_is_yielded_when_its_directory_changes(index, library):
+    for path in index.scan(str(library)):
+        index.mark_processed(path, {})
+    movie = library / "Movie.2010.mkv"
+    movie.write_bytes(b"a longer movie")
+    (library / "other.mkv").write_bytes(b"")   # touches the directory
+    assert scan(index, library) == ["Movie.2010.mkv", "other.mkv"]
+
+
+def test_renamed_file_keeps_its_metadata(index, library):
+    for path in index.scan(str(library)):
+        index.mark_processed(path, {"title": "Movie", "year": 2010})
+    old, new = library / "Movie.2010.mkv", library / "Movie (2010).mkv"
+    os.rename(old, new)
+    assert scan(index, library) == []
+    assert index.get_metadata(str(new)) == {"title": "Movie", "year": 2010}
+    assert index.get_metadata(str(old)) is None
+
+
+def test_removed_directory_is_forgotten(index, library):
+    for path in index.scan(str(library)):
+        index.mark_processed(path, {})
+    episode = library / "Show" / "Show.S01E01.mkv"
+    episode.unlink()
+    (library / "Show").rmdir()
+    assert scan(index, library) == []
+    assert index.get_metadata(str(episode)) is None
@@ -0,0 +1,79 @@
+# Rename plans: writing, reading and applying
+import json
+import os
+
+import pytest
+
+import db
+import journal
+import main
+from plan_file import PlanReader, PlanWriter, check_planned
+
+
+@pytest.fixture
+def files(tmp_path):
+    root = tmp_path / "library"
+    root.mkdir()
+    for name in ("a.mkv", "b.mkv"):
+        (root / name).write_bytes(name.encode())
+    return root
+
+
+def write_plan(path, root, names):
+    with PlanWriter(str(path), [str(root)]) as plan:
+        plan.write_many({"path": str(root / old), "new_path": str(root / new), "status": "pending"}
+                        for old, new in names)
+    return str(path)
+
+
+def touch(path):
+    """Change a file's mtime without changing its size."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_plan_records_source_size_and_mtime(tmp_path, files):
+    plan_path = write_plan(tmp_path / "plan.jsonl", files, [("a.mkv", "A.mkv")])
+    with PlanReader(plan_path) as plan:
+        records = list(plan)
+        assert plan.summary["renames"] == 1
+    st = os.stat(files / "a.mkv")
+    assert records[0]["status"] == "would_rename"
+    assert (records[0]["size"], records[0]["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+
+
+def test_check_planned(tmp_path, files):
+    plan_path = write_plan(tmp_path / "plan.jsonl", files, [("a.mkv", "A.mkv"), ("b.mkv", "B.mkv")])
+    with PlanReader(plan_path) as plan:
+        a, b = plan.renames()
+    assert check_planned(a)["status"] == "pending"
+
+    touch(files / "b.mkv")
+    assert check_planned(b)["status"] == "stale"
+    (files / "b.mkv").unlink()
+    assert check_planned(b)["status"] == "error"
+
+
+def test_check_planned_notices_size_change(tmp_path, files):
+    plan_path = write_plan(tmp_path / "plan.jsonl", files, [("a.mkv", "A.mkv")])
+    with PlanReader(plan_path) as plan:
+        (record,) = plan.renames()
+    st = os.stat(files / "a.mkv")
+    (files / "a.mkv").write_bytes(b"a longer file")
+    os.utime(files / "a.mkv", ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert check_planned(record)["status"] == "stale"
+
+
+def test_apply_plan_skips_stale_files(tmp_path, files, monkeypatch, capsys):
+    monkeypatch.setattr(db, "HISTORY_DB_PATH", str(tmp_path / "renaming_history.db"))
+    monkeypatch.setattr(journal, "JOURNAL_DB_PATH", str(tmp_path / "jobs.db"))
+    plan_path = write_plan(tmp_path / "plan.jsonl", files, [("a.mkv", "A.mkv"), ("b.mkv", "B.mkv")])
+    touch(files / "b.mkv")
+
+    assert main.main(["--apply-plan", plan_path]) == 1
+
+    assert sorted(os.listdir(files)) == ["A.mkv", "b.mkv"]
+    records = {os.path.basename(record["path"]): record
+               for record in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert records["a.mkv"]["status"] == "renamed"
+    assert records["b.mkv"]["status"] == "stale"
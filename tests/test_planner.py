@@ -0,0 +1,70 @@
+# Rename planner
+import os
+
+import pytest
+
+from planner import execute, move_file, plan_renames
+
+
+def make(directory, *names):
+    for name in names:
+        (directory / name).write_text(name)
+
+
+def contents(directory):
+    return {path.name: path.read_text() for path in directory.iterdir()}
+
+
+def test_chain_and_swap(tmp_path):
+    make(tmp_path, "a", "b", "c")
+    pairs = [(tmp_path / "a", tmp_path / "b"), (tmp_path / "b", tmp_path / "c"), (tmp_path / "c", tmp_path / "a")]
+    results = list(execute(plan_renames(pairs)))
+    assert {r.status for r in results} == {"renamed"}
+    assert contents(tmp_path) == {"a": "c", "b": "a", "c": "b"}
+
+
+def test_blocked_move_blocks_moves_into_its_source(tmp_path):
+    # b -> c conflicts, so b stays and a -> b must not overwrite it
+    make(tmp_path, "a", "b", "c")
+    plan = plan_renames([(tmp_path / "a", tmp_path / "b"), (tmp_path / "b", tmp_path / "c")])
+    assert plan.moves == []
+    assert [r.status for r in execute(plan)] == ["conflict", "conflict"]
+    assert contents(tmp_path) == {"a": "a", "b": "b", "c": "c"}
+
+
+def test_duplicate_target_blocks_chain(tmp_path):
+    make(tmp_path, "a", "b", "x")
+    plan = plan_renames([(tmp_path / "x", tmp_path / "c"), (tmp_path / "b", tmp_path / "c"),
+                         (tmp_path / "a", tmp_path / "b")])
+    assert plan.moves == [(str(tmp_path / "x"), str(tmp_path / "c"))]
+    list(execute(plan))
+    assert contents(tmp_path) == {"a": "a", "b": "b", "c": "x"}
+
+
+def test_move_file_never_replaces(tmp_path):
+    make(tmp_path, "a", "b")
+    with pytest.raises(FileExistsError):
+        move_file(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert contents(tmp_path) == {"a": "a", "b": "b"}
+
+
+def test_target_created_after_planning_is_a_conflict(tmp_path):
+    make(tmp_path, "a")
+    plan = plan_renames([(tmp_path / "a", tmp_path / "b")])
+    make(tmp_path, "b")
+    assert [r.status for r in execute(plan)] == ["conflict"]
+    assert contents(tmp_path) == {"a": "a", "b": "b"}
+
+
+def test_closing_early_restores_staged_files(tmp_path):
+    # Neither move can run (a vanished, c appeared), so the staged b must come back,
+    # even though the caller stops reading results after the first one
+    make(tmp_path, "a", "b")
+    plan = plan_renames([(tmp_path / "a", tmp_path / "b"), (tmp_path / "b", tmp_path / "c")])
+    assert plan.staged == {str(tmp_path / "b")}
+    os.unlink(tmp_path / "a")
+    make(tmp_path, "c")
+    results = execute(plan, jobs=1)
+    next(results)
+    results.close()
+    assert contents(tmp_path) == {"b": "b", "c": "c"}
@@ -0,0 +1,32 @@
+# Startup budget: the CLI's import time and dry-run overhead (see benchmarks/check_startup.py)
+import os
+
+import pytest
+
+from check_startup import HEAVY_MODULES, IMPORT_BUDGET_MS, RUN_BUDGET_MS, measure
+
+# Timings on shared CI runners are noisy: the budgets get this much headroom here, and
+# FILENOM_SKIP_TIMING=1 skips the timing checks (the heavy-import check always runs)
+MARGIN = 2.0
+skip_timing = pytest.mark.skipif(os.environ.get("FILENOM_SKIP_TIMING") == "1",
+                                 reason="FILENOM_SKIP_TIMING=1")
+
+
+@pytest.fixture(scope="module")
+def startup():
+    direct, heavy, import_ms, baseline, dry_run = measure(runs=3)
+    return {"heavy": heavy, "import_ms": import_ms, "overhead_ms": dry_run - baseline}
+
+
+def test_no_heavy_modules_at_startup(startup):
+    assert startup["heavy"] == [], f"must stay lazy: {HEAVY_MODULES}"
+
+
+@skip_timing
+def test_import_main_within_budget(startup):
+    assert startup["import_ms"] <= IMPORT_BUDGET_MS * MARGIN
+
+
+@skip_timing
+def test_dry_run_within_budget(startup):
+    assert startup["overhead_ms"] <= RUN_BUDGET_MS * MARGIN
@@ -0,0 +1,47 @@
+# Naming templates
+import pytest
+
+from templates import NameTemplate, NamingScheme, TemplateError, fields_for
+
+
+def render(pattern, **values):
+    return NameTemplate(pattern).format(fields_for(**values))
+
+
+def test_default_templates():
+    scheme = NamingScheme()
+    assert scheme.format("The Office", None, "2", "1", "The Dundies", ".mkv") == "The Office - S02E01 - The Dundies.mkv"
+    assert scheme.format("The Office", None, "02", "01", None, ".mkv") == "The Office - S02E01.mkv"
+    assert scheme.format("Heat", 1995, ext=".mkv") == "Heat (1995).mkv"
+    assert scheme.format("Heat", ext=".mkv") == "Heat.mkv"
+
+
+def test_optional_section_needs_every_field():
+    pattern = "{Title}< ({Year}) [{Quality}]>{Extension}"
+    assert render(pattern, title="Heat", year=1995, ext=".mkv", original="Heat 1080p") == "Heat (1995) [1080p].mkv"
+    assert render(pattern, title="Heat", year=1995, ext=".mkv", original="Heat") == "Heat.mkv"
+
+
+@pytest.mark.parametrize("pattern", ["{Title} ({Year}){Extension}", "{Title} ({Year:04d}){Extension}"])
+def test_missing_field_outside_a_section_is_empty(pattern):
+    assert render(pattern, title="Heat", ext=".mkv") == "Heat ().mkv"
+
+
+def test_directories_and_unsafe_characters():
+    pattern = "{Title}/Season {Season:02d}/{Title} - {Season}x{Episode:02d}{Extension}"
+    assert render(pattern, title="Marvel's: Agents", season="1", episode="3", ext=".mkv") == \
+        "Marvel's - Agents/Season 01/Marvel's - Agents - 1x03.mkv"
+
+
+@pytest.mark.parametrize("pattern", [
+    "{Title:02d}{Extension}",      # text field, numeric spec
+    "{Season:zz}{Extension}",      # not a format spec
+    "{Year:s}{Extension}",         # int field, string spec
+    "{Show}{Extension}",           # unknown field
+    "{Title}< ({Year}){Extension}",
+    "{Title}> ({Year}){Extension}",
+    "{Title{Extension}",
+])
+def test_bad_templates_fail_when_compiled(pattern):
+    with pytest.raises(TemplateError):
+        NameTemplate(pattern)